@@ -0,0 +1 @@
+"""Benchmarks of text_reader, run them from the main directory of the repository, e.g. python -m benchmarks.tokenizers"""
@@ -0,0 +1,304 @@
+"""The module is responsible for a deterministic synthetic corpus for the benchmarks: text, PDF and Word files from 1 KB
+to 1 GB in five languages. The same seed always gives the same files, so results of different runs can be compared.
+
+Words are drawn from a small vocabulary of every language with Zipf-like frequencies, so stop words are the most
+common words as in real texts. Files are written paragraph by paragraph and never kept in memory.
+
+Example:
+python -m benchmarks.corpus --sizes 1KB 1MB 100MB --formats txt pdf docx --output /tmp/corpus
+"""
+import argparse
+import os
+import random
+import re
+from xml.sax.saxutils import escape
+import zipfile
+
+LANGUAGES = ("english", "french", "german", "spanish", "italian")
+FORMATS = ("txt", "pdf", "docx")
+SIZES = ("1KB", "100KB")
+SEED = 0
+UNITS = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+VOCABULARY = {
+    "english": "the and of to a in is that it was he for on with as his they at be this from house sea light keeper "
+               "night ship storm island lamp tower wind rock boat harbour winter morning letter window stair bread "
+               "coast wave fisherman lantern bell fog weather captain",
+    "french": "le de la et les des en un une du est que il qui dans pour maison mer phare gardien nuit navire "
+              "tempête île lampe tour vent rocher bateau port hiver matin lettre fenêtre escalier pain côte vague "
+              "pêcheur lanterne cloche brouillard été",
+    "german": "der die und in den von zu das mit sich des auf für ist im dem Haus Meer Leuchtturm Wärter Nacht Schiff "
+              "Sturm Insel Lampe Turm Wind Felsen Boot Hafen Winter Morgen Brief Fenster Treppe Brot Küste Welle "
+              "Fischer Laterne Glocke Nebel",
+    "spanish": "de la que el en y a los se del las un por con no una su casa mar faro guardián noche barco tormenta "
+               "isla lámpara torre viento roca bote puerto invierno mañana carta ventana escalera pan costa ola "
+               "pescador linterna campana niebla",
+    "italian": "di e il la che in a per un è del non una con sono casa mare faro guardiano notte nave tempesta isola "
+               "lampada torre vento scoglio barca porto inverno mattina lettera finestra scala pane costa onda "
+               "pescatore lanterna campana nebbia",
+}
+SENTENCE_WORDS = (6, 18)
+PARAGRAPH_SENTENCES = (3, 8)
+PDF_LINE_CHARS = 90
+PDF_PAGE_LINES = 50
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+
+
+def parse_size(size):
+    """Change a size like "1KB", "250MB" or "1GB" to bytes.
+
+    :param size: Number with unit B, KB, MB or GB.
+    :type: str
+    :raises ValueError: Wrong size.
+    :rtype: int
+    """
+    match = re.fullmatch(r"(\d+)\s*([KMG]?B)", size.strip().upper())
+    if match is None:
+        raise ValueError("wrong size: {}".format(size))
+    return int(match.group(1)) * UNITS[match.group(2)]
+
+
+def iter_paragraphs(language, size, seed=SEED):
+    """Generate paragraphs of random sentences until they have size bytes in UTF-8.
+
+    :param language: Language from LANGUAGES.
+    :type: str
+    :param size: Number of bytes of all paragraphs with the new lines between them.
+    :type: int
+    :param seed: Seed of the random generator.
+    :type: int
+    :return: Paragraphs without new lines, the last one is cut to the size.
+    :rtype: generator
+    """
+    words = VOCABULARY[language].split()
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    generator = random.Random("{}:{}".format(language, seed))
+    written = 0
+    while written < size:
+        sentences = []
+        for _ in range(generator.randint(*PARAGRAPH_SENTENCES)):
+            sentence = generator.choices(words, weights, k=generator.randint(*SENTENCE_WORDS))
+            sentence = " ".join(sentence)
+            sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        paragraph = " ".join(sentences)
+        encoded = paragraph.encode("utf-8")
+        if written + len(encoded) + 1 > size:
+            paragraph = encoded[:max(size - written - 1, 0)].decode("utf-8", "ignore").rstrip()
+            encoded = paragraph.encode("utf-8")
+        written += len(encoded) + 1
+        yield paragraph
+
+
+def write_txt(path, paragraphs):
+    """Write paragraphs to UTF-8 text file, they are separated by new lines.
+
+    :param path: File path.
+    :type: str
+    :param paragraphs: Text of the paragraphs.
+    :type: iterable
+    """
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for paragraph in paragraphs:
+            f.write(paragraph + "\n")
+
+
+def pdf_lines(paragraphs):
+    """Break paragraphs into lines of a PDF page, paragraphs are separated by empty lines.
+
+    :param paragraphs: Text of the paragraphs.
+    :type: iterable
+    :rtype: generator
+    """
+    for paragraph in paragraphs:
+        line = ""
+        for word in paragraph.split():
+            if line and len(line) + len(word) >= PDF_LINE_CHARS:
+                yield line
+                line = ""
+            line = line + " " + word if line else word
+        yield line
+        yield ""
+
+
+def pdf_string(line):
+    """Put a line in a PDF string, the characters are coded in WinAnsiEncoding (Latin-1 in these languages).
+
+    :param line: Text of the line.
+    :type: str
+    :rtype: bytes
+    """
+    line = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + line.encode("latin-1", "replace") + b")"
+
+
+def write_pdf(path, paragraphs):
+    """Write paragraphs to PDF file with Helvetica text, page by page, without any PDF library.
+
+    :param path: File path.
+    :type: str
+    :param paragraphs: Text of the paragraphs.
+    :type: iterable
+    """
+    offsets = {}
+    kids = []
+    with open(path, "wb") as f:
+        def add(number, body):
+            """Write an object of the file."""
+            offsets[number] = f.tell()
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        add(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        add(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        lines = []
+        number = 4
+        for line in pdf_lines(paragraphs):
+            lines.append(line)
+            if len(lines) == PDF_PAGE_LINES:
+                number = _write_pdf_page(add, number, lines, kids)
+                lines = []
+        if lines or not kids:
+            _write_pdf_page(add, number, lines, kids)
+        add(2, b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % kid for kid in kids) +
+            b"] /Count %d >>" % len(kids))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        for number in sorted(offsets):
+            f.write(b"%010d 00000 n \n" % offsets[number])
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+
+
+def _write_pdf_page(add, number, lines, kids):
+    """Write the content and the page objects of one PDF page.
+
+    :param add: Function which writes an object with the number and the body.
+    :type: callable
+    :param number: Number of the content object, the page object gets the next one.
+    :type: int
+    :param lines: Lines of the page.
+    :type: list
+    :param kids: Numbers of the page objects, the new page is added.
+    :type: list
+    :return: Number of the next free object.
+    :rtype: int
+    """
+    stream = b"BT /F1 10 Tf 12 TL 50 770 Td " + b" ".join(pdf_string(line) + b" '" for line in lines) + b" ET"
+    add(number, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    add(number + 1, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+                    b"/Contents %d 0 R >>" % number)
+    kids.append(number + 1)
+    return number + 2
+
+
+def _zip_entry(name):
+    """Make an entry of a zip archive with a fixed date, so the same content gives the same archive.
+
+    :param name: Name of the file in the archive.
+    :type: str
+    :rtype: zipfile.ZipInfo
+    """
+    entry = zipfile.ZipInfo(name, ZIP_DATE)
+    entry.compress_type = zipfile.ZIP_DEFLATED
+    return entry
+
+
+def write_docx(path, paragraphs):
+    """Write paragraphs to Word document, the XML is streamed into the zip archive.
+
+    :param path: File path.
+    :type: str
+    :param paragraphs: Text of the paragraphs.
+    :type: iterable
+    """
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    with zipfile.ZipFile(path, "w") as docx:
+        docx.writestr(_zip_entry("[Content_Types].xml"),
+                      '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/'
+                      'package/2006/content-types"><Default Extension="rels" ContentType="application/'
+                      'vnd.openxmlformats-package.relationships+xml"/><Default Extension="xml" ContentType='
+                      '"application/xml"/><Override PartName="/word/document.xml" ContentType="application/'
+                      'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        docx.writestr(_zip_entry("_rels/.rels"),
+                      '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/'
+                      'package/2006/relationships"><Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+                      'officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+                      '</Relationships>')
+        with docx.open(_zip_entry("word/document.xml"), "w", force_zip64=True) as document:
+            document.write('<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{}"><w:body>'.format(
+                namespace).encode("utf-8"))
+            for paragraph in paragraphs:
+                document.write('<w:p><w:r><w:t xml:space="preserve">{}</w:t></w:r></w:p>'.format(
+                    escape(paragraph)).encode("utf-8"))
+            document.write(b"</w:body></w:document>")
+
+
+WRITERS = {"txt": write_txt, "pdf": write_pdf, "docx": write_docx}
+
+
+def corpus_path(directory, language, size, file_format, seed=SEED):
+    """Get the path of a corpus file.
+
+    :param directory: Directory of the corpus.
+    :type: str
+    :param language: Language from LANGUAGES.
+    :type: str
+    :param size: Size like "1MB".
+    :type: str
+    :param file_format: Format from FORMATS.
+    :type: str
+    :param seed: Seed of the random generator.
+    :type: int
+    :rtype: str
+    """
+    return os.path.join(directory, "{}-{}-{}.{}".format(language, size.upper(), seed, file_format))
+
+
+def generate(directory, languages=LANGUAGES, sizes=SIZES, formats=FORMATS, seed=SEED, overwrite=False):
+    """Write the corpus files, files which exist are kept because the same seed gives the same content.
+
+    :param directory: Directory of the corpus, it is created if it doesn't exist.
+    :type: str
+    :param languages: Languages from LANGUAGES.
+    :type: iterable
+    :param sizes: Sizes of the text like "1KB" or "1GB".
+    :type: iterable
+    :param formats: Formats from FORMATS.
+    :type: iterable
+    :param seed: Seed of the random generator.
+    :type: int
+    :param overwrite: Write files which exist again.
+    :type: bool
+    :return: Tuples (language, size, format, path) of all files.
+    :rtype: list
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = []
+    for language in languages:
+        for size in sizes:
+            for file_format in formats:
+                path = corpus_path(directory, language, size, file_format, seed)
+                if overwrite or not os.path.exists(path):
+                    WRITERS[file_format](path, iter_paragraphs(language, parse_size(size), seed))
+                files.append((language, size.upper(), file_format, path))
+    return files
+
+
+def main(argv=None):
+    """Write the corpus and print paths of the files.
+
+    :param argv: Command line arguments, sys.argv is used by default.
+    :type: list
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.corpus")
+    parser.add_argument("--output", default="benchmark_corpus", help="directory of the corpus")
+    parser.add_argument("--languages", nargs="+", choices=LANGUAGES, default=LANGUAGES)
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="sizes of the text from 1KB to 1GB")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--overwrite", action="store_true", help="write files which exist again")
+    args = parser.parse_args(argv)
+    for _, _, _, path in generate(args.output, args.languages, args.sizes, args.formats, args.seed, args.overwrite):
+        print("{:>12}  {}".format(os.path.getsize(path), path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""The module is responsible for measuring the cold start of the graphical interface: import time of text_reader.ui
+(python -X importtime), heavy libraries imported before the window appears and the time to the first window.
+
+Example:
+python -m benchmarks.startup --runs 5 --budget 0.5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET = 0.5
+FIRST_WINDOW = """
+import time
+start = time.perf_counter()
+from text_reader.ui import TextReaderInterface
+app = TextReaderInterface()
+app.window.update()
+print(time.perf_counter() - start)
+app.window.destroy()
+"""
+HEAVY = "import text_reader.ui; from text_reader.lazy import loaded_heavy_modules; print(','.join(loaded_heavy_modules()))"
+
+
+def run_python(*args):
+    """Run a new Python process in the main directory of the repository.
+
+    :param args: Arguments of the interpreter.
+    :type: str
+    :return: Finished process with stdout and stderr.
+    :rtype: subprocess.CompletedProcess
+    """
+    return subprocess.run([sys.executable] + list(args), cwd=ROOT, capture_output=True, text=True)
+
+
+def import_times():
+    """Import text_reader.ui with -X importtime.
+
+    :return: Cumulative import time in seconds of every module, the slowest first.
+    :rtype: list
+    """
+    process = run_python("-X", "importtime", "-c", "import text_reader.ui")
+    if process.returncode:
+        raise RuntimeError(process.stderr)
+    times = []
+    for line in process.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and not line.endswith("imported package"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(times, reverse=True)
+
+
+def first_window():
+    """Measure the time from the start of the import to the first drawn window.
+
+    :return: Time in seconds or None if there is no display.
+    :rtype: float
+    """
+    process = run_python("-c", FIRST_WINDOW)
+    if process.returncode:
+        return None
+    return float(process.stdout.split()[-1])
+
+
+def main(argv=None):
+    """Print the cold start times and check them against the budget.
+
+    :param argv: Command line arguments, sys.argv is used by default.
+    :type: list
+    :return: Exit code, 1 if the budget is exceeded or heavy libraries are imported at start.
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup")
+    parser.add_argument("--runs", type=int, default=5, help="number of measurements, the median is used (default: 5)")
+    parser.add_argument("--budget", type=float, default=BUDGET,
+                        help="maximal time to the first window in seconds (default: {})".format(BUDGET))
+    parser.add_argument("--top", type=int, default=10, help="number of the slowest modules shown (default: 10)")
+    args = parser.parse_args(argv)
+
+    runs = [import_times() for _ in range(args.runs)]
+    total = statistics.median(dict((name, seconds) for seconds, name in run)["text_reader.ui"] for run in runs)
+    print("import text_reader.ui: {:.3f} s".format(total))
+    for seconds, name in runs[-1][:args.top]:
+        print("  {:>8.3f} s  {}".format(seconds, name))
+
+    heavy = run_python("-c", HEAVY).stdout.strip()
+    print("heavy libraries imported at start: {}".format(heavy or "none"))
+
+    windows = [first_window() for _ in range(args.runs)]
+    if None in windows:
+        print("time to first window: skipped, no display")
+        window = total
+    else:
+        window = statistics.median(windows)
+        print("time to first window: {:.3f} s".format(window))
+
+    if heavy or window > args.budget:
+        print("budget of {:.3f} s exceeded or heavy libraries imported".format(args.budget))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
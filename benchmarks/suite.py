@@ -0,0 +1,256 @@
+"""The module is responsible for the benchmark suite: time and peak memory of loading files, finding the most popular
+words, text-to-speech with an offline engine and inserts into a local SQLite database, measured on the synthetic
+corpus (benchmarks.corpus). Results are compared with stored baselines and regressions fail the run.
+
+Caches of text_reader are switched off, so every run does the whole work. Memory is the peak of Python allocations
+measured by tracemalloc in a separate run, so it doesn't slow down the timed runs.
+
+Example:
+python -m benchmarks.suite --save-baseline
+python -m benchmarks.suite --threshold 0.25
+python -m benchmarks.suite --sizes 1MB 1GB --formats txt --only load_file --baseline large.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from text_reader.database import SQLDatabase
+from text_reader.files import FilesManager
+from text_reader.languages import languages
+from text_reader.speech import SilentBackend
+from text_reader.storage import SQLiteBackend
+from text_reader.words import TOKENIZERS, ensure_nltk_resources
+from .corpus import FORMATS, LANGUAGES, SEED, SIZES, generate
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+THRESHOLD = 0.25
+MIN_SECONDS = 0.005
+MIN_BYTES = 64 * 1024
+REPEAT = 3
+RECORDS = 10000
+
+
+def measure(function, repeat=REPEAT):
+    """Measure the fastest of a few runs and the peak memory of one more run.
+
+    :param function: Function without arguments.
+    :type: callable
+    :param repeat: Number of timed runs.
+    :type: int
+    :return: Result with "seconds" and "peak_bytes".
+    :rtype: dict
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak}
+
+
+def make_manager():
+    """Make FilesManager without caches and with the offline speech engine.
+
+    :rtype: text_reader.files.FilesManager
+    """
+    manager = FilesManager()
+    manager.cache = None
+    manager.speech_cache = None
+    manager.speech_backend = SilentBackend()
+    return manager
+
+
+def make_database(directory):
+    """Make SQLite database with a table of words in the directory.
+
+    :param directory: Directory of the database file.
+    :type: str
+    :rtype: text_reader.database.SQLDatabase
+    """
+    database = SQLDatabase(SQLiteBackend(directory))
+    database.db_name = "benchmark"
+    database.create_database()
+    database.db_name = "text_reader_benchmark"
+    database.create_table("words")
+    return database
+
+
+def iter_benchmarks(files, directory, tokenizers=TOKENIZERS, records=RECORDS):
+    """Prepare the benchmarks of the corpus files.
+
+    Text is analyzed and converted once per language and size, it is the same in every format.
+
+    :param files: Tuples (language, size, format, path) from benchmarks.corpus.generate.
+    :type: list
+    :param directory: Directory for audio and database files.
+    :type: str
+    :param tokenizers: Tokenizers of find_top_5_words.
+    :type: iterable
+    :param records: Number of records inserted into the database, 0 skips the benchmark.
+    :type: int
+    :return: Pairs (name, function without arguments).
+    :rtype: generator
+    """
+    texts = set()
+    for language, size, file_format, path in files:
+        manager = make_manager()
+        yield "load_file/{}/{}/{}".format(file_format, language, size), lambda m=manager, p=path: m.load_file(p)
+        if (language, size) in texts:
+            continue
+        texts.add((language, size))
+        manager = make_manager()
+        manager.load_file(path)
+        for tokenizer in tokenizers:
+            analyzer = manager.for_text(manager.text)
+            analyzer.tokenizer = tokenizer
+            yield "find_top_5_words/{}/{}/{}".format(tokenizer, language, size), \
+                lambda m=analyzer, l=language: m.find_top_5_words(l)
+        audio = os.path.join(directory, "{}-{}.mp3".format(language, size))
+        yield "convert_text_to_mp3/silent/{}/{}".format(language, size), \
+            lambda m=manager, l=languages[language], a=audio: m.convert_text_to_mp3(l, a)
+    if records:
+        database = make_database(directory)
+        rows = [("document{}.txt".format(i), "light", "house", "sea", "keeper", "night") for i in range(records)]
+        yield "insert_items/sqlite/{}".format(records), lambda: database.insert_items(rows)
+
+
+def run(files, tokenizers=TOKENIZERS, records=RECORDS, repeat=REPEAT, only=None):
+    """Run the benchmarks and print their results.
+
+    :param files: Tuples (language, size, format, path) from benchmarks.corpus.generate.
+    :type: list
+    :param tokenizers: Tokenizers of find_top_5_words.
+    :type: iterable
+    :param records: Number of records inserted into the database.
+    :type: int
+    :param repeat: Number of timed runs of every benchmark.
+    :type: int
+    :param only: Run only benchmarks whose names contain this text.
+    :type: str
+    :return: Results by names of the benchmarks.
+    :rtype: dict
+    """
+    ensure_nltk_resources()
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, function in iter_benchmarks(files, directory, tokenizers, records):
+            if only and only not in name:
+                continue
+            results[name] = measure(function, repeat)
+            print("{:<48}{:>10.4f} s{:>10.1f} MB".format(name, results[name]["seconds"],
+                                                         results[name]["peak_bytes"] / 2 ** 20))
+    return results
+
+
+def load_baseline(path):
+    """Read stored results.
+
+    :param path: Path of the JSON file.
+    :type: str
+    :return: Results by names of the benchmarks, empty if there is no file.
+    :rtype: dict
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def save_baseline(path, results):
+    """Store results with a description of the computer, results of other benchmarks in the file are kept.
+
+    :param path: Path of the JSON file.
+    :type: str
+    :param results: Results by names of the benchmarks.
+    :type: dict
+    """
+    stored = load_baseline(path)
+    stored.update(results)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"python": platform.python_version(), "machine": platform.machine(), "system": platform.system(),
+                   "results": dict(sorted(stored.items()))}, f, indent=2)
+        f.write("\n")
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Find benchmarks which are slower or use more memory than the baseline by more than the threshold.
+
+    Very small differences (MIN_SECONDS, MIN_BYTES) are ignored, they are noise of short benchmarks.
+
+    :param results: Results by names of the benchmarks.
+    :type: dict
+    :param baseline: Stored results by names of the benchmarks.
+    :type: dict
+    :param threshold: Allowed relative growth, e.g. 0.25 for 25 %.
+    :type: float
+    :return: Tuples (name, metric, baseline value, new value) of the regressions.
+    :rtype: list
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for metric, slack in (("seconds", MIN_SECONDS), ("peak_bytes", MIN_BYTES)):
+            old, new = baseline[name][metric], result[metric]
+            if new > old * (1 + threshold) and new - old > slack:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def main(argv=None):
+    """Generate the corpus, run the benchmarks and check them against the baseline.
+
+    :param argv: Command line arguments, sys.argv is used by default.
+    :type: list
+    :return: Exit code, 1 if there are regressions.
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "text_reader_corpus"),
+                        help="directory of the corpus, files are generated once and reused")
+    parser.add_argument("--languages", nargs="+", choices=LANGUAGES, default=LANGUAGES)
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="sizes of the text from 1KB to 1GB")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS)
+    parser.add_argument("--tokenizers", nargs="+", choices=TOKENIZERS, default=TOKENIZERS)
+    parser.add_argument("--records", type=int, default=RECORDS, help="records inserted into SQLite, 0 skips it")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed runs, the fastest is used")
+    parser.add_argument("--only", help="run only benchmarks whose names contain this text")
+    parser.add_argument("--baseline", default=BASELINE, help="JSON file with stored results")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed growth of time and memory (default: {})".format(THRESHOLD))
+    parser.add_argument("--save-baseline", action="store_true", help="store the results instead of checking them")
+    parser.add_argument("--output", help="write the results to this JSON file too")
+    args = parser.parse_args(argv)
+
+    files = generate(args.corpus, args.languages, args.sizes, args.formats, SEED)
+    results = run(files, args.tokenizers, args.records, args.repeat, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print("baseline saved in {}".format(args.baseline))
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print("{} benchmarks have no baseline".format(len(missing)))
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, old, new in regressions:
+        print("regression {} {}: {:.4g} -> {:.4g} ({:+.0%})".format(name, metric, old, new, new / old - 1))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""The module is responsible for comparing the NLTK and regex tokenizers: agreement of their counts on the parity corpus
+(tests/parity) and the speed of counting words.
+
+Example:
+python -m benchmarks.tokenizers --repeat 200
+"""
+import argparse
+from collections import Counter
+import os
+import time
+from text_reader.words import count_agreement, count_words, ensure_nltk_resources, fast_tokens, iter_tokens, \
+    iter_words
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "parity")
+LANGUAGES = ("english", "french", "german", "spanish", "italian")
+
+
+def read_corpus(language):
+    """Read the parity text of the language.
+
+    :param language: Language from text_reader.languages.
+    :type: str
+    :rtype: str
+    """
+    with open(os.path.join(CORPUS_DIR, language + ".txt"), encoding="utf-8") as f:
+        return f.read()
+
+
+def agreement(language):
+    """Compare counts of all words (stop words too) found by both tokenizers in the parity text.
+
+    :param language: Language from text_reader.languages.
+    :type: str
+    :return: Result of text_reader.words.count_agreement.
+    :rtype: float
+    """
+    text = read_corpus(language)
+    return count_agreement(Counter(iter_words(iter_tokens(text))), Counter(fast_tokens(text, language)))
+
+
+def best_time(function, rounds=3):
+    """Measure the fastest of a few runs.
+
+    :param function: Function without arguments.
+    :type: callable
+    :param rounds: Number of runs.
+    :type: int
+    :return: Time in seconds.
+    :rtype: float
+    """
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    """Print agreement and speed of the tokenizers for every language.
+
+    :param argv: Command line arguments, sys.argv is used by default.
+    :type: list
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.tokenizers")
+    parser.add_argument("--repeat", type=int, default=100, help="copies of the parity text (default: 100)")
+    args = parser.parse_args(argv)
+    ensure_nltk_resources()
+
+    print("{:<10}{:>10}{:>12}{:>12}{:>10}".format("language", "agreement", "nltk [s]", "regex [s]", "speedup"))
+    for language in LANGUAGES:
+        text = "\n".join([read_corpus(language)] * args.repeat)
+        nltk_time = best_time(lambda: count_words(text, language))
+        regex_time = best_time(lambda: count_words(text, language, tokenizer="regex"))
+        print("{:<10}{:>10.3f}{:>12.4f}{:>12.4f}{:>9.1f}x".format(language, agreement(language), nltk_time,
+                                                                 regex_time, nltk_time / regex_time))
+
+
+if __name__ == '__main__':
+    main()
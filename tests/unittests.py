@@ -1,7 +1,48 @@
 """The module is responsible for unittest."""
+from collections import Counter
+import gc
+import hashlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from threading import Event, Thread
+import time
 import unittest
+from unittest import mock
+import weakref
+import zipfile
 from text_reader.files import FilesManager
-from text_reader.database import SQLDatabase
+from text_reader.database import SQLDatabase, default_backend, quote_identifier
+from text_reader.storage import SQLiteBackend
+from text_reader import batch, cache, encoding, extractors, index, jobs, sketch, speech, words
+from text_reader.lazy import lazy_import
+from text_reader.live import LiveWordCount
+from text_reader.metrics import NULL_STAGE, Metrics, metrics, timed
+from text_reader.viewer import TextStore
+from text_reader.cache import FileCache, file_digest
+from benchmarks import corpus, suite
+
+cache_directory = None
+
+
+def setUpModule():
+    """Keep the caches of FilesManager in a temporary directory, not in the cache of the user."""
+    global cache_directory
+    cache_directory = tempfile.TemporaryDirectory()
+    cache.CACHE_DIR = cache_directory.name
+    cache.default_cache.cache_clear()
+    cache.default_audio_cache.cache_clear()
+
+
+def tearDownModule():
+    """Remove the caches of FilesManager."""
+    cache.default_cache.cache_clear()
+    cache.default_audio_cache.cache_clear()
+    cache_directory.cleanup()
 
 
 class UnitTestFilesManager(unittest.TestCase):
@@ -13,6 +54,7 @@ class UnitTestFilesManager(unittest.TestCase):
 
     def setUp(self):
         self.file_m = FilesManager()
+        self.file_m.cache = None
 
     def test_load_file(self, output=text_to_test):
         """Test loading file."""
@@ -30,20 +72,777 @@ class UnitTestFilesManager(unittest.TestCase):
         self.file_m.text = text
         self.assertEqual(self.file_m.find_top_5_words('french'), words_list_fr)
 
+    def test_top_n_words_en(self, text=text_to_test):
+        """Show top n words with counts, english language."""
+        words_en = [('house', 7), ('dans', 6), ('je', 5)]
+        self.file_m.text = text
+        self.assertEqual(self.file_m.find_top_n('english', 3), words_en)
+
+    def test_top_n_words_ties(self):
+        """Words with the same count keep the order of find_top_5_words."""
+        self.file_m.text = "beta alpha beta alpha gamma"
+        self.assertEqual(self.file_m.find_top_n('other', 2), [('alpha', 2), ('beta', 2)])
+
+    def test_top_n_extra_stop_words(self, text=text_to_test):
+        """User stop words are skipped together with the language ones."""
+        self.file_m.text = text
+        self.file_m.extra_stop_words = {"House"}
+        self.assertEqual(self.file_m.find_top_n('english', 1), [('dans', 6)])
+
+    def test_top_n_parallel(self, text=text_to_test):
+        """Parallel counting gives the same words as the serial one."""
+        self.file_m.text = (text + ".\n") * 20
+        serial = self.file_m.find_top_n('french', 5)
+        self.file_m.workers = 2
+        self.file_m.chunk_size = 100
+        self.assertEqual(self.file_m.find_top_n('french', 5), serial)
+
+    def test_top_n_regex_tokenizer(self, text=text_to_test):
+        """The regex tokenizer finds the same words in a simple text."""
+        self.file_m.text = text
+        serial = self.file_m.find_top_n('english', 5)
+        self.file_m.tokenizer = "regex"
+        self.assertEqual(self.file_m.find_top_n('english', 5), serial)
+
+    def test_top_n_approximate(self, text=text_to_test):
+        """Approximate counting gives exact results when all words fit in memory, n-grams are counted too."""
+        self.file_m.text = text
+        self.file_m.cache = None
+        self.assertEqual(self.file_m.find_top_n('english', 5, approximate=True), self.file_m.find_top_n('english', 5))
+        self.file_m.memory = 0
+        hitters = self.file_m.find_heavy_hitters([text], 'english', 1)
+        self.assertEqual(hitters["words"][0][0], "house")
+        self.assertEqual(self.file_m.find_top_5_words('english', approximate=True, ngram=2)[0], "house house")
+
+    def test_top_n_in_pdf(self):
+        """PDF is analyzed page by page with progress."""
+        progress = []
+        words_pdf = self.file_m.find_top_n_in_file("pdf_file_to_tests.pdf", "english", 2,
+                                                   progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(words_pdf, [('house', 5), ('mardi', 2)])
+        self.assertEqual(progress, [(1, 3), (2, 3), (3, 3)])
+
+    def test_top_n_in_pdf_cancelled(self):
+        """Analysis stops when the cancel event is set."""
+        cancel = Event()
+        cancel.set()
+        self.assertRaises(extractors.Cancelled, self.file_m.find_top_n_in_file, "pdf_file_to_tests.pdf", "english",
+                          5, cancel=cancel)
+
     def tearDown(self):
         self.file_m = None
 
 
+class UnitTestWords(unittest.TestCase):
+    """This class can be used for testing words module.
+    """
+
+    def test_stop_words_cached(self):
+        """Stop words are read once and kept in a frozenset."""
+        stop_words = words.get_stop_words('english')
+        self.assertIsInstance(stop_words, frozenset)
+        self.assertIs(words.get_stop_words('english'), stop_words)
+        self.assertIn('our', stop_words)
+
+    def test_stop_words_other(self):
+        """Language "other" has only the user stop words."""
+        self.assertEqual(words.get_stop_words('other', ['Word']), frozenset({'word'}))
+
+    def test_chunks_keep_sentences(self):
+        """Chunks end between sentences of the whole text."""
+        text = "One two.\nThree four.\n\nFive six.\nSeven."
+        self.assertEqual(list(words.iter_chunks(text, chunk_size=3)), ["One two.\n", "Three four.\n\n", "Five six.\n",
+                                                                        "Seven."])
+        self.assertEqual(list(words.iter_chunks(text, chunk_size=100)), [text])
+
+    def test_parallel_hard_wrapped(self):
+        """Parallel counting of hard-wrapped text with abbreviations at line ends gives the same words as the serial one."""
+        text = ("Small tools, e.g.\nhammers, are heavy vs.\nscrewdrivers, said Mr.\nSmith. Large tools, i.e.\n"
+                "saws, are not.\n") * 40
+        spans = list(words._sentence_tokenizer().span_tokenize(text))
+        serial = words.count_words(text, 'english')
+        for chunk_size in (10, 45, 100):
+            chunks = list(words.iter_chunks(text, chunk_size))
+            self.assertEqual("".join(chunks), text)
+            position = 0
+            for chunk in chunks[:-1]:
+                position += len(chunk)
+                self.assertTrue(all(end <= position or start >= position for start, end in spans), position)
+            wordcount = words.count_words_parallel(text, 'english', workers=2, chunk_size=chunk_size)
+            self.assertEqual(list(wordcount.items()), list(serial.items()), chunk_size)
+
+    def test_stop_words_unknown_language(self):
+        """Unknown language raises KeyError."""
+        self.assertRaises(KeyError, words.get_stop_words, 'klingon')
+
+    def test_resources_download_failed(self):
+        """Only the Punkt model of the installed NLTK is checked and a failed download is checked again later."""
+        import nltk
+        punkt = "punkt_tab" if words._punkt_tokenizer() is not None else "punkt"
+        with mock.patch.object(nltk.data, "find", side_effect=LookupError), \
+                mock.patch.object(nltk, "download", return_value=False) as download, \
+                mock.patch.object(words, "_resources_ready", False):
+            words.ensure_nltk_resources()
+            self.assertFalse(words._resources_ready)
+            self.assertEqual([call.args[0] for call in download.call_args_list], [punkt, "stopwords"])
+
+    def test_fast_tokens_apostrophes(self):
+        """Apostrophes are handled per language and hyphenated words are kept."""
+        self.assertEqual(words.fast_tokens("I didn't see the keeper's well-known log.", "english"),
+                         ["i", "did", "n't", "see", "the", "keeper", "'s", "well-known", "log"])
+        self.assertEqual(words.fast_tokens("L’eau de l'école, aujourd'hui.", "french"),
+                         ["l", "eau", "de", "l", "école", "aujourd", "hui"])
+        self.assertEqual(words.fast_tokens("¿Es franco-argentino?", "spanish"), ["es", "franco-argentino"])
+
+    def test_fast_tokens_parity(self):
+        """The regex tokenizer counts almost the same words as NLTK in the parity corpus."""
+        for language, minimum in (("english", 0.95), ("german", 0.95), ("spanish", 0.95), ("italian", 0.9),
+                                  ("french", 0.85)):
+            with open("parity/{}.txt".format(language), encoding="utf-8") as f:
+                text = f.read()
+            nltk_count = Counter(words.iter_words(words.iter_tokens(text)))
+            regex_count = Counter(words.fast_tokens(text, language))
+            self.assertGreaterEqual(words.count_agreement(nltk_count, regex_count), minimum, language)
+
+    def test_unknown_tokenizer(self):
+        """Unknown tokenizer raises ValueError."""
+        self.assertRaises(ValueError, words.count_words, "text", "english", tokenizer="spaces")
+
+    def test_ngrams(self):
+        """N-grams don't cross punctuation and don't begin or end with stop words."""
+        text = "The keeper of lights lit the lamp. Keeper of lights, again!"
+        for tokenizer in words.TOKENIZERS:
+            self.assertEqual(list(words.iter_ngrams(text, "english", 3, tokenizer=tokenizer)),
+                             ["keeper of lights", "lit the lamp", "keeper of lights"])
+            self.assertEqual(list(words.iter_ngrams(text, "english", 2, tokenizer=tokenizer)), ["lights lit"])
+
+
+class UnitTestSketch(unittest.TestCase):
+    """This class can be used for testing sketch module.
+    """
+
+    def test_space_saving(self):
+        """Counts of a skewed stream are within the error bounds and frequent items are found."""
+        stream = []
+        for rank in range(1, 301):
+            stream.extend(["item{}".format(rank)] * (3000 // rank))
+        random.Random(0).shuffle(stream)
+        exact = Counter(stream)
+        counters = sketch.SpaceSaving(50)
+        counters.update_all(stream)
+        self.assertEqual(len(counters), 50)
+        self.assertEqual(counters.total, len(stream))
+        self.assertLessEqual(counters.error_bound(), len(stream) / 50)
+        for item, count, error in counters.top(50):
+            self.assertLessEqual(count - error, exact[item])
+            self.assertLessEqual(exact[item], count)
+        top = [item for item, _, _ in counters.top(5)]
+        self.assertEqual(top, ["item1", "item2", "item3", "item4", "item5"])
+
+
+class UnitTestIndex(unittest.TestCase):
+    """This class can be used for testing index module.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = index.WordIndex(os.path.join(self.directory.name, "index.db"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_incremental_updates(self):
+        """Document frequencies follow added, replaced and removed documents."""
+        self.index.add_counts("a.txt", Counter(light=3, house=2), "english")
+        self.index.add_counts("b.txt", Counter(light=1, sea=4), "english")
+        self.assertEqual(self.index.documents_with_word("Light"), [("a.txt", 3), ("b.txt", 1)])
+        self.index.add_counts("a.txt", Counter(keeper=5), "english")
+        self.assertEqual(self.index.documents_with_word("light"), [("b.txt", 1)])
+        self.assertEqual(self.index.documents_with_word("house"), [])
+        self.assertEqual(self.index.statistics(), (2, 5.0, 3))
+        self.assertTrue(self.index.remove("b.txt"))
+        self.assertFalse(self.index.remove("b.txt"))
+        self.assertNotIn("b.txt", self.index)
+        self.assertEqual(self.index.statistics(), (1, 5.0, 1))
+
+    def test_distinctive_words(self):
+        """Words rare in other documents score higher than common words with the same count."""
+        self.index.add("sea.txt", "The keeper lit the light. The light of the lighthouse and the sea.", "english",
+                       "regex")
+        self.index.add("house.txt", "The light of the house.", "english", "regex")
+        for scoring in index.SCORINGS:
+            scores = self.index.distinctive_words("sea.txt", 5, scoring)
+            self.assertEqual([word for word, _, _ in scores][:1], ["light"] if scoring == "tfidf" else ["keeper"])
+            self.assertEqual(dict((word, count) for word, _, count in scores),
+                             {"keeper": 1, "lit": 1, "light": 2, "lighthouse": 1, "sea": 1})
+        with self.assertRaises(KeyError):
+            self.index.distinctive_words("missing.txt")
+
+    def test_files_manager(self):
+        """Exact counts of words of a loaded file are indexed, also when they come from the cache."""
+        file_m = FilesManager()
+        file_m.cache = FileCache(self.directory.name)
+        file_m.load_file("text_file_to_tests.txt")
+        top = file_m.find_top_n("english", 2)
+        file_m.index = self.index
+        self.assertEqual(file_m.find_top_n("english", 2), top)
+        self.assertEqual(self.index.documents_with_word("house"),
+                         [(os.path.abspath("text_file_to_tests.txt"), top[0][1])])
+        file_m.for_text("sea sea").find_top_n("english", 1, approximate=True)
+        self.assertEqual(len(self.index), 1)
+
+
+class UnitTestBatch(unittest.TestCase):
+    """This class can be used for testing batch module.
+    """
+
+    def test_iter_paths(self):
+        """Directories and globs are expanded, duplicates are skipped."""
+        paths = list(batch.iter_paths([".", "*.txt", "text_file_to_tests.txt"]))
+        self.assertEqual([p for p in paths if p.endswith("text_file_to_tests.txt")], ["./text_file_to_tests.txt",
+                                                                                      "text_file_to_tests.txt"])
+
+    def test_run_batch(self):
+        """Every file gives one JSON line, errors are recorded."""
+        output = io.StringIO()
+        summary = batch.run_batch(["text_file_to_tests.txt", "missing.txt"], output, top=2, jobs=1,
+                                  use_cache=False)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(records[0]["words"], [["house", 7], ["dans", 6]])
+        self.assertIsNone(records[0]["error"])
+        self.assertIsNotNone(records[1]["error"])
+        self.assertEqual((summary["documents"], summary["errors"]), (2, 1))
+
+
+class UnitTestFileCache(unittest.TestCase):
+    """This class can be used for testing cache module.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = FileCache(self.directory.name, max_size=100)
+
+    def test_text_from_cache(self):
+        """The second load of the same file is taken from the cache."""
+        file_m = FilesManager()
+        file_m.cache = self.cache
+        text = file_m.load_file("text_file_to_tests.txt")
+        self.assertEqual(self.cache.load_text(file_digest("text_file_to_tests.txt")), text)
+        self.cache.save_text(file_digest("text_file_to_tests.txt"), "cached")
+        self.assertEqual(file_m.load_file("text_file_to_tests.txt"), "cached")
+
+    def test_words_from_cache(self):
+        """Saved words are returned for the same or smaller n."""
+        key = self.cache.words_key("text", "english", [])
+        self.cache.save_words(key, 2, [("one", 2), ("two", 1)])
+        self.assertEqual(self.cache.load_words(key, 1), [("one", 2)])
+        self.assertIsNone(self.cache.load_words(key, 3))
+
+    def test_text_digest(self):
+        """Text hashed block by block has the digest of the whole encoded text."""
+        text = "zażółć gęślą jaźń " * (cache.BLOCK_SIZE // 9)
+        self.assertEqual(cache.text_digest(text), hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+    def test_eviction(self):
+        """The least recently used values are removed first."""
+        self.cache.set("a", b"a" * 40)
+        self.cache.set("b", b"b" * 40)
+        self.cache.get("a")
+        self.cache.set("c", b"c" * 40)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertIsNotNone(self.cache.get("a"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class UnitTestExtractors(unittest.TestCase):
+    """This class can be used for testing extractors module.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def make_file(self, name, data):
+        """Create file in the temporary directory."""
+        path = os.path.join(self.directory.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_find_extractor(self):
+        """Format is found by the extension or by the first bytes."""
+        self.assertEqual(extractors.find_extractor("text_file_to_tests.txt"), "text")
+        self.assertEqual(extractors.find_extractor(self.make_file("report", b"%PDF-1.4")), "pdf")
+        self.assertEqual(extractors.find_extractor(self.make_file("notes.md", b"notes")), "other")
+
+    def test_find_extractor_zip(self):
+        """Zip archives other than Word documents are left to textract."""
+        for name, member in (("sheet.xlsx", "xl/workbook.xml"), ("book.epub", "mimetype"),
+                             ("document.docx", "word/document.xml")):
+            path = os.path.join(self.directory.name, name)
+            with zipfile.ZipFile(path, "w") as archive:
+                archive.writestr(member, "")
+            expected = "docx" if name.endswith(".docx") else "other"
+            self.assertEqual(extractors.find_extractor(path), expected, name)
+
+    def test_extract_docx(self):
+        """Word documents are read without textract."""
+        path = os.path.join(self.directory.name, "document.docx")
+        with zipfile.ZipFile(path, "w") as docx:
+            docx.writestr("word/document.xml", '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+                                               'wordprocessingml/2006/main"><w:body><w:p><w:r><w:t>house'
+                                               '</w:t></w:r></w:p></w:body></w:document>')
+        self.assertEqual(extractors.extract_text(path).strip(), "house")
+
+    def test_register_extractor(self):
+        """New formats can be added."""
+        for registry in (extractors._extractors, extractors._page_extractors, extractors._extensions):
+            self.addCleanup(registry.update, dict(registry))
+            self.addCleanup(registry.clear)
+        self.addCleanup(extractors._magic.__setitem__, slice(None), list(extractors._magic))
+        extractors.register_extractor("upper", lambda path, encoding: "UPPER", extensions=(".upper",))
+        self.assertEqual(extractors.extract_text(self.make_file("a.UPPER", b"")), "UPPER")
+
+    def test_text_chunks(self):
+        """Chunks of a text file are cut at the ends of lines and give the whole text."""
+        text = "zażółć gęślą jaźń\r\n" * 50 + "koniec"
+        path = self.make_file("big.txt", text.encode("utf-8"))
+        progress = []
+        chunks = list(extractors.iter_text_chunks(path, progress=lambda done, total: progress.append(done),
+                                                  chunk_size=64))
+        self.assertEqual("".join(chunks), extractors.extract_text(path))
+        self.assertTrue(all(chunk.endswith("\n") for chunk in chunks[:-1]))
+        self.assertEqual(progress[-1], os.path.getsize(path))
+
+    def test_chunks_with_other_encoding_later(self):
+        """Streaming and reading at once decode a text with a misleading UTF-8 beginning in the same way."""
+        data = "zażółć gęślą jaźń\n".encode("utf-8") * (encoding.MAX_SAMPLE // 24 + 1) + \
+            "Le cœur a ses raisons que la raison ne connaît point, déjà vu à la carte.\n".encode("cp1252") * 100
+        path = self.make_file("mixed.txt", data)
+        text = extractors.extract_text(path)
+        self.assertEqual("".join(extractors.iter_text_chunks(path, chunk_size=4097)), text)
+        self.assertTrue(text.endswith("déjà vu à la carte.\n"))
+        self.assertNotIn("\ufffd", text)
+
+    def test_plain_text_newlines(self):
+        """Text files are decoded once with universal newlines."""
+        path = self.make_file("windows.txt", "zażółć\r\ngęślą".encode("utf-8"))
+        self.assertEqual(extractors.extract_text(path), "zażółć\ngęślą")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class UnitTestEncoding(unittest.TestCase):
+    """This class can be used for testing encoding module.
+    """
+
+    def test_bom(self):
+        """Byte order mark decides without chardet."""
+        self.assertEqual(encoding.detect_encoding("house".encode("utf-16")), "utf-16")
+        self.assertEqual(encoding.decode(b"\xef\xbb\xbfhouse"), "house")
+
+    def test_user_encoding(self):
+        """Encoding chosen by the user is used."""
+        self.assertEqual(encoding.decode("żółw".encode("cp1250"), "cp1250"), "żółw")
+
+    def test_utf8_prefix(self):
+        """Valid UTF-8 sample is decoded as UTF-8, invalid rest of the text is detected again."""
+        self.assertEqual(encoding.detect_encoding("żółw".encode("utf-8")), "utf-8")
+        data = b"house " * 10 + "café déjà vu à la carte".encode("latin-1")
+        self.assertEqual(encoding.decode(data, None).split()[-1], "carte")
+        self.assertEqual(encoding.detect_encoding(data, max_sample=16), "utf-8")
+
+    def test_rest_after_sample(self):
+        """Text in another encoding after the sample checked for UTF-8 is detected from its own bytes."""
+        tail = "Le cœur a ses raisons que la raison ne connaît point, déjà vu à la carte. " * 200
+        data = b"house " * (encoding.MAX_SAMPLE // 3) + tail.encode("cp1252")
+        self.assertEqual(encoding.detect_encoding(data), "utf-8")
+        text = encoding.decode(data)
+        self.assertNotIn("\ufffd", text)
+        self.assertTrue(text.endswith(tail))
+
+    def test_sampled_detection(self):
+        """Only a sample of a long text is given to chardet."""
+        data = ("Le cœur a ses raisons que la raison ne connaît point. " * 2000).encode("cp1252")
+        self.assertIn(encoding.detect_encoding(data, max_sample=8192).lower(), ("windows-1252", "iso-8859-1",
+                                                                                  "cp1252"))
+
+
+class EchoBackend(speech.SpeechBackend):
+    """Text-to-speech engine which returns the text, the first attempt of each part fails."""
+    max_chars = 20
+
+    def __init__(self):
+        self.failed = set()
+
+    def synthesize(self, text, language):
+        if text not in self.failed:
+            self.failed.add(text)
+            raise ConnectionError(text)
+        return "[{}]".format(text).encode("utf-8")
+
+
+class UnitTestSpeech(unittest.TestCase):
+    """This class can be used for testing speech module.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.mp3 = os.path.join(self.directory.name, "file.mp3")
+
+    def test_split_text(self):
+        """Parts are made of whole sentences and are not too long."""
+        parts = list(speech.split_text("One two. Three four five. Six seven eight nine ten eleven twelve.", 20))
+        self.assertEqual(parts, ["One two.", "Three four five.", "Six seven eight nine", "ten eleven twelve."])
+
+    def test_convert_in_order(self):
+        """Parts are retried and written in the order of the text."""
+        text = " ".join("Sentence number {}.".format(i) for i in range(10))
+        self.assertEqual(speech.convert_text_to_mp3(text, "en", self.mp3, EchoBackend(), workers=3, backoff=0), 10)
+        with open(self.mp3, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "".join("[Sentence number {}.]".format(i) for i in range(10)))
+
+    def test_audio_cache(self):
+        """Only changed sentences are converted again."""
+        cache = FileCache(self.directory.name, name="audio")
+        backend = EchoBackend()
+        speech.convert_text_to_mp3("One. Two. Three.", "en", self.mp3, backend, backoff=0, cache=cache)
+        backend.failed.clear()
+        speech.convert_text_to_mp3("One.  Two! Three.", "en", self.mp3, backend, backoff=0, cache=cache)
+        self.assertEqual(backend.failed, {"Two!"})
+        with open(self.mp3, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "[One.][Two!][Three.]")
+
+    def test_convert_progress_and_cancel(self):
+        """Progress is reported for every part and the conversion stops when it is cancelled."""
+        steps = []
+        cancel = Event()
+
+        def progress(done, total):
+            steps.append((done, total))
+            cancel.set()
+
+        text = " ".join("Sentence number {}.".format(i) for i in range(10))
+        with self.assertRaises(extractors.Cancelled):
+            speech.convert_text_to_mp3(text, "en", self.mp3, EchoBackend(), workers=1, backoff=0, progress=progress,
+                                       cancel=cancel)
+        self.assertEqual(steps, [(1, 10)])
+
+    def test_silent_backend(self):
+        """Offline engine creates MP3 frames."""
+        file_m = FilesManager()
+        file_m.text = "house house house."
+        file_m.speech_backend = speech.SilentBackend()
+        file_m.speech_cache = None
+        file_m.convert_text_to_mp3("en", self.mp3)
+        with open(self.mp3, "rb") as f:
+            self.assertEqual(f.read(4), b"\xff\xfb\x90\x64")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class UnitTestJobs(unittest.TestCase):
+    """This class can be used for testing jobs module.
+    """
+
+    def setUp(self):
+        self.jobs = jobs.JobScheduler(workers=1)
+        self.events = []
+
+    def wait(self):
+        """Poll the scheduler like the Tk event loop until all jobs end."""
+        while self.jobs.jobs:
+            self.jobs.poll()
+
+    def test_result_and_progress(self):
+        """Results and progress are given to callbacks in the polling thread."""
+        def work(job, number):
+            job.progress(1, 2)
+            return number * 2
+
+        self.jobs.submit("work", work, 21, on_done=self.events.append,
+                         on_progress=lambda done, total: self.events.append((done, total)))
+        self.wait()
+        self.assertEqual(self.events, [(1, 2), 42])
+
+    def test_error(self):
+        """Errors are given to the error callback."""
+        self.jobs.submit("fail", lambda job: 1 / 0, on_error=self.events.append)
+        self.wait()
+        self.assertIsInstance(self.events[0], ZeroDivisionError)
+
+    def test_cancel(self):
+        """Waiting and running jobs can be cancelled."""
+        started = Event()
+
+        def work(job):
+            started.set()
+            while True:
+                job.check()
+
+        self.jobs.submit("running", work, on_cancel=lambda: self.events.append("running"))
+        self.jobs.submit("waiting", work, on_cancel=lambda: self.events.append("waiting"))
+        started.wait()
+        self.jobs.cancel_all()
+        self.wait()
+        self.assertEqual(sorted(self.events), ["running", "waiting"])
+
+    def tearDown(self):
+        self.jobs.shutdown()
+
+
+class UnitTestViewer(unittest.TestCase):
+    """This class can be used for testing viewer module.
+    """
+
+    def setUp(self):
+        self.text = "".join("Line {} of the house.\n".format(i) + ("\n" if i % 7 == 0 else "") for i in range(500))
+
+    def test_pages(self):
+        """Pages are cut at the ends of lines and together give the text."""
+        store = TextStore((self.text[i:i + 333] for i in range(0, len(self.text), 333)), page_size=1000)
+        self.assertEqual(store.text(), self.text)
+        self.assertEqual(len(store), len(self.text))
+        self.assertTrue(all(len(page) <= 1000 and page.endswith("\n") for page in store))
+        self.assertEqual(store.find_page(store.offsets[3] + 5), 3)
+
+    def test_file_pages(self):
+        """A file is put into the store chunk by chunk, the text is the same as read at once."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.text)
+            store = TextStore(extractors.iter_pages(path), page_size=1000)
+            self.assertEqual(store.text(), extractors.extract_text(path))
+            self.assertGreater(store.page_count(), 1)
+
+    def test_analysis(self):
+        """Words in the store are counted like words in the text."""
+        file = FilesManager()
+        file.cache = None
+        file.text = self.text
+        self.assertEqual(file.find_top_n_in_parts(TextStore([self.text], page_size=1000), "english", 5),
+                         file.find_top_n("english", 5))
+
+    def test_speech_parts(self):
+        """Sentences for the audio are taken from the pages."""
+        store = TextStore([self.text], page_size=1000)
+        self.assertEqual("".join(speech.split_sentences(store, 5000)).replace(" ", ""),
+                         self.text.replace("\n", "").replace(" ", ""))
+
+
+class UnitTestLive(unittest.TestCase):
+    """This class can be used for testing live module.
+    """
+
+    def test_edits(self):
+        """Counts after edits of lines are the same as counts of the edited text."""
+        lines = ["The house is big.", "Dans la maison.", "", "A house and a car."]
+        live = LiveWordCount("\n".join(lines))
+        live.replace_lines(1, 2, ["Car car car.", "The house."])
+        live.replace_lines(3, 0, ["house"])
+        lines[1:3] = ["Car car car.", "The house."]
+        lines[3:3] = ["house"]
+        expected = words.top_n(words.count_words("\n".join(lines), "english"), 2)
+        self.assertEqual(live.top("english", 2), expected)
+        self.assertEqual(live.wordcount, words.count_words("\n".join(lines), "other"))
+
+    def test_removed_words(self):
+        """Words of removed lines are forgotten."""
+        live = LiveWordCount("house\nmardi")
+        live.replace_lines(0, 2, [""])
+        self.assertEqual(live.top("other", 5), [])
+
+    def test_read_only_parts(self):
+        """Words of a large text are counted from its pages like from the whole text."""
+        text = "".join("The house {} is by the sea.\n".format(i % 7) for i in range(300))
+        live = LiveWordCount()
+        live.reset_counts(LiveWordCount.count_parts(TextStore([text], page_size=500)))
+        self.assertEqual(live.top("english", 3), LiveWordCount(text).top("english", 3))
+
+
+class UnitTestLazy(unittest.TestCase):
+    """This class can be used for testing lazy module.
+    """
+
+    def test_lazy_import(self):
+        """Module and its submodules are imported on first use."""
+        xml = lazy_import("xml")
+        self.assertEqual(xml.dom.Node.ELEMENT_NODE, 1)
+        self.assertRaises(ImportError, getattr, lazy_import("text_reader_missing_module"), "anything")
+
+    def test_cold_start(self):
+        """The graphical interface is imported without heavy libraries and the SQL layer."""
+        code = "import sys, text_reader.ui; from text_reader.lazy import loaded_heavy_modules; " \
+               "print(loaded_heavy_modules(), 'text_reader.database' in sys.modules)"
+        process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                 cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.assertEqual(process.stdout.strip(), "[] False", process.stderr)
+
+
+class UnitTestMetrics(unittest.TestCase):
+    """This class can be used for testing metrics module.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def test_stages(self):
+        """Nested stages are recorded with their data and peaks, nothing is recorded when measuring is off."""
+        registry = Metrics()
+        self.assertIs(registry.stage("off"), NULL_STAGE)
+        registry.enable(trace_memory=True)
+        try:
+            with registry.stage("outer") as outer:
+                with registry.stage("inner", kind="test") as inner:
+                    data = bytearray(1 << 20)
+                    inner.count(nbytes=len(data), tokens=10)
+                del data
+                outer.count(tokens=5)
+        finally:
+            registry.disable()
+        stats = registry.snapshot()
+        self.assertEqual(stats["inner"].bytes, 1 << 20)
+        self.assertGreaterEqual(stats["inner"].peak_bytes, 1 << 20)
+        self.assertGreaterEqual(stats["outer"].peak_bytes, 1 << 20)
+        self.assertEqual(registry.events[0]["kind"], "test")
+        self.assertIn("inner", registry.status())
+
+    def test_stages_in_threads(self):
+        """A stage of another thread doesn't reset the peak of memory of a running stage."""
+        registry = Metrics()
+
+        def second_stage():
+            with registry.stage("second"):
+                pass
+
+        registry.enable(trace_memory=True)
+        try:
+            with registry.stage("first"):
+                data = bytearray(1 << 20)
+                del data
+                thread = Thread(target=second_stage)
+                thread.start()
+                thread.join(0.2)
+            thread.join()
+        finally:
+            registry.disable()
+        self.assertGreaterEqual(registry.snapshot()["first"].peak_bytes, 1 << 20)
+        self.assertIn("second", registry.snapshot())
+
+    def test_export(self):
+        """Stages are written as JSON lines and Prometheus text."""
+        registry = Metrics()
+        registry.record("words.tokenize", 0.5, nbytes=100, tokens=20)
+        registry.record("words.tokenize", 0.5, nbytes=100, tokens=20, error="Cancelled")
+        path = os.path.join(self.directory.name, "stages.jsonl")
+        self.assertEqual(registry.write_json_lines(path), 2)
+        with open(path, encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.readline())["tokens_per_second"], 40.0)
+        path = os.path.join(self.directory.name, "stages.prom")
+        registry.write_prometheus(path)
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        self.assertIn('text_reader_stage_tokens_total{stage="words.tokenize"} 40', text)
+        self.assertIn('text_reader_stage_errors_total{stage="words.tokenize"} 1', text)
+        self.assertNotIn("peak_bytes", text)
+
+    def test_measured_analysis(self):
+        """Words are counted the same when the stages are measured."""
+        manager = FilesManager()
+        manager.cache = None
+        manager.text = UnitTestFilesManager.text_to_test
+        expected = manager.find_top_n("english", 5)
+        mark = metrics.mark()
+        metrics.enable()
+        try:
+            self.assertEqual(manager.find_top_n("english", 5), expected)
+        finally:
+            metrics.disable()
+        stats = metrics.snapshot(mark)
+        self.assertTrue({"find_top_n", "words.tokenize", "words.filter_stop_words", "words.count"} <= set(stats))
+        self.assertEqual(stats["words.tokenize"].tokens, stats["words.filter_stop_words"].tokens)
+        self.assertLess(stats["words.count"].tokens, stats["words.tokenize"].tokens)
+
+    def test_timed_generator(self):
+        """Generators are measured while they are iterated, not when they are created."""
+        @timed("test.generator")
+        def slow_items():
+            for item in range(3):
+                time.sleep(0.01)
+                yield item
+
+        mark = metrics.mark()
+        metrics.enable()
+        try:
+            items = slow_items()
+            self.assertNotIn("test.generator", metrics.snapshot(mark))
+            self.assertEqual(list(items), [0, 1, 2])
+        finally:
+            metrics.disable()
+        self.assertGreaterEqual(metrics.snapshot(mark)["test.generator"].seconds, 0.03)
+        self.assertEqual(metrics.events[-1]["items"], 3)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+class UnitTestBenchmarks(unittest.TestCase):
+    """This class can be used for testing benchmarks corpus and suite modules.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def test_corpus(self):
+        """The same seed gives the same files and every format has the same text."""
+        first = corpus.generate(os.path.join(self.directory.name, "first"), ["french"], ["2KB"])
+        second = corpus.generate(os.path.join(self.directory.name, "second"), ["french"], ["2KB"])
+        texts = []
+        for (_, _, _, path), (_, _, _, copy) in zip(first, second):
+            with open(path, "rb") as f, open(copy, "rb") as g:
+                self.assertEqual(f.read(), g.read())
+            texts.append(extractors.extract_text(path).split())
+        self.assertEqual(os.path.getsize(first[0][3]), 2048)
+        self.assertEqual(texts[0], texts[1])
+        self.assertEqual(texts[0], texts[2])
+
+    def test_compare(self):
+        """Only growth above the threshold and the noise is a regression."""
+        baseline = {"a": {"seconds": 1.0, "peak_bytes": 1 << 20}, "b": {"seconds": 0.001, "peak_bytes": 0}}
+        results = {"a": {"seconds": 1.5, "peak_bytes": 1 << 20}, "b": {"seconds": 0.002, "peak_bytes": 0},
+                   "c": {"seconds": 9.0, "peak_bytes": 0}}
+        self.assertEqual(suite.compare(results, baseline, 0.25), [("a", "seconds", 1.0, 1.5)])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
 class UnitTestSQLDatabase(unittest.TestCase):
     """This class can be used for testing database module.
     """
 
     def setUp(self):
-        self.sql = SQLDatabase()
+        self.directory = tempfile.TemporaryDirectory()
+        self.sql = SQLDatabase(self.make_backend())
+        self.sql.db_name = "sql_test"
+        self.sql.create_database()
+        self.sql.db_name = "text_reader_sql_test"
+        self.sql.create_table("test_table")
+
+    def make_backend(self):
+        """Use the configured server, SQLite files are kept in a temporary directory, not in the user data."""
+        backend = default_backend()
+        if isinstance(backend, SQLiteBackend):
+            backend = SQLiteBackend(self.directory.name)
+        return backend
 
     def test_create_db(self):
         """Test db creation."""
-        self.sql.db_name = "sql_test"
+        self.sql.db_name = "sql_test_new"
         self.assertTrue(self.sql.create_database(), "Database exists.")
 
     def test_create_existing_db(self):
@@ -51,6 +850,12 @@ class UnitTestSQLDatabase(unittest.TestCase):
         self.sql.db_name = "sql_test"
         self.assertFalse(self.sql.create_database())
 
+    def test_create_db_wrong_name(self):
+        """Test if a database with a wrong name isn't created."""
+        self.sql.db_name = "wrong/name"
+        self.assertFalse(self.sql.create_database())
+        self.assertNotIn("text_reader_wrong/name", self.sql.show_database())
+
     def test_show_db(self):
         """Test if text_reader_sql_test is on the list of dbs."""
         self.assertIn("text_reader_sql_test", self.sql.show_database(), "Database doesn't exist.")
@@ -58,7 +863,7 @@ class UnitTestSQLDatabase(unittest.TestCase):
     def test_create_table(self):
         """Test creation of table."""
         self.sql.db_name = "text_reader_sql_test"
-        self.assertTrue(self.sql.create_table('test_table'), "Can't create table.")
+        self.assertTrue(self.sql.create_table('test_table_new'), "Can't create table.")
 
     def test_show_tables(self):
         """Test if test_table is on the list of table names."""
@@ -70,5 +875,103 @@ class UnitTestSQLDatabase(unittest.TestCase):
         self.sql.table_name = "test_table"
         self.assertTrue(self.sql.insert_item('path', 'one', 'two', 'three', 'four', 'five'), "Can't insert item to db.")
 
+    def test_insert_item_with_quotes(self):
+        """Test inserting a record with quotes, values are sent as parameters."""
+        self.sql.db_name = "text_reader_sql_test"
+        self.sql.table_name = "test_table"
+        self.assertTrue(self.sql.insert_item("it's", 'l\'eau', 'two', 'three', 'four', 'five'),
+                        "Can't insert item to db.")
+
+    def test_insert_items(self):
+        """Test inserting records in batches."""
+        self.sql.db_name = "text_reader_sql_test"
+        self.sql.table_name = "test_table"
+        records = [('path_{}'.format(i), 'one', 'two') for i in range(5)]
+        results = self.sql.insert_items(records, batch_size=2)
+        self.assertEqual([result["rows"] for result in results], [2, 2, 1])
+        self.assertTrue(all(result["success"] for result in results), "Can't insert items to db.")
+
+    def test_writer(self):
+        """Test writer which inserts collected records when the batch is full and at the end."""
+        self.sql.db_name = "text_reader_sql_test"
+        self.sql.table_name = "test_table"
+        with self.sql.writer(batch_size=2) as writer:
+            for i in range(3):
+                writer.add('path_{}'.format(i), ['one', 'two', 'three', 'four', 'five'])
+            self.assertEqual(len(writer.buffer), 1)
+        self.assertEqual([result["rows"] for result in writer.results], [2, 1])
+
+    def test_word_tables(self):
+        """Test normalized tables and queries by word."""
+        self.sql.db_name = "text_reader_sql_test"
+        self.assertTrue(self.sql.create_word_tables(), "Can't create tables.")
+        doc_id = self.sql.insert_document('path', None, 'english', [('house', 7), ('dans', 6)])
+        self.assertIsNotNone(doc_id, "Can't insert document.")
+        self.assertIn((doc_id, 'path', 'english', 2, 6), list(self.sql.documents_with_word('dans')))
+        self.assertIn('house', [row[0] for row in self.sql.top_words_across_corpus(100)])
+        self.assertIn(doc_id, [row[0] for row in self.sql.list_documents(page_size=1, after_id=doc_id - 1)])
+
+    def test_insert_document_rollback(self):
+        """Test if the document isn't inserted when its words fail."""
+        self.sql.db_name = "text_reader_sql_test"
+        self.assertTrue(self.sql.create_word_tables(), "Can't create tables.")
+        self.assertIsNone(self.sql.insert_document('broken', None, 'english', [('house', 7), (None, 6)]))
+        self.assertNotIn('broken', [row[1] for row in self.sql.list_documents(page_size=1000)])
+
+    def test_metadata_invalidation(self):
+        """Test if new databases and tables are shown although the names were cached."""
+        self.sql.show_database()
+        self.sql.db_name = "metadata_test"
+        self.sql.create_database()
+        self.assertIn("text_reader_metadata_test", self.sql.show_database())
+        self.sql.show_tables("text_reader_metadata_test")
+        self.sql.db_name = "text_reader_metadata_test"
+        self.sql.create_table("metadata_table")
+        self.assertIn("metadata_table", self.sql.show_tables("text_reader_metadata_test"))
+
+    def test_load_metadata(self):
+        """Test if names of databases and tables are cached."""
+        self.sql.metadata.invalidate()
+        self.sql.load_metadata()
+        self.assertTrue(self.sql.metadata.is_fresh(("databases",)))
+        self.assertTrue(self.sql.metadata.is_fresh(("tables", "text_reader_sql_test")))
+
+    def test_metadata_invalidated_while_loading(self):
+        """Test if names loaded before invalidate are not kept in the cache."""
+        key = ("tables", "text_reader_sql_test")
+
+        def load():
+            self.sql.metadata.invalidate(key)
+            return ["old_table"]
+
+        self.assertEqual(self.sql.metadata.get(key, load), ["old_table"])
+        self.assertFalse(self.sql.metadata.is_fresh(key))
+        self.assertEqual(self.sql.metadata.get(key, lambda: ["new_table"]), ["new_table"])
+        self.assertTrue(self.sql.metadata.is_fresh(key))
+
+    def test_metadata_cache_released(self):
+        """Test if the cache of names doesn't keep the engine alive."""
+        backend = SQLiteBackend(self.directory.name)
+        database = SQLDatabase(backend)
+        self.assertIs(SQLDatabase(backend).metadata, database.metadata)
+        reference = weakref.ref(backend)
+        del backend, database
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_quote_identifier(self):
+        """Names of tables and databases are quoted."""
+        self.assertEqual(quote_identifier("my`table"), "`my``table`")
+
     def tearDown(self):
         self.sql = None
+        self.directory.cleanup()
+
+
+class UnitTestSQLiteDatabase(UnitTestSQLDatabase):
+    """This class can be used for testing database module with SQLite files, it doesn't need a server.
+    """
+
+    def make_backend(self):
+        """Keep the database files in a temporary directory."""
+        return SQLiteBackend(self.directory.name)
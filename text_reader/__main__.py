@@ -0,0 +1,79 @@
+"""This module initializes the start of the program without the graphical interface.
+
+Example:
+python -m text_reader documents/ "reports/**/*.pdf" notes.txt --jobs 4 --language french --top 10 -o words.jsonl
+python -m text_reader documents/ --no-cache --metrics stages.prom --trace-memory
+python -m text_reader corpus/ --ngram 2 --approximate --memory 64
+python -m text_reader corpus/ --index && python -m text_reader.index distinctive corpus/report.pdf
+"""
+import argparse
+import sys
+from .batch import format_summary, iter_paths, run_batch
+from .index import INDEX_PATH
+from .languages import languages
+from .metrics import metrics
+from .sketch import MEMORY
+from .words import TOKENIZERS
+
+
+def main(argv=None):
+    """Analyze files given in the command line.
+
+    :param argv: Command line arguments, sys.argv is used by default.
+    :type: list
+    :return: Exit code, 1 if any file failed.
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(prog="python -m text_reader",
+                                     description="Find the most popular words in .txt, .pdf and .docx files.")
+    parser.add_argument("paths", nargs="+", help="files, directories or glob patterns")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of processes (default: CPUs)")
+    parser.add_argument("-l", "--language", choices=tuple(languages.keys()), default="english",
+                        help="language of the stop words (default: english)")
+    parser.add_argument("-t", "--top", type=int, default=5, help="number of words per file (default: 5)")
+    parser.add_argument("-o", "--output", help="JSON lines file (default: stdout)")
+    parser.add_argument("--tokenizer", choices=TOKENIZERS, default="nltk",
+                        help="nltk (default) or regex, much faster, words can differ slightly")
+    parser.add_argument("--ngram", type=int, choices=(1, 2, 3), default=1,
+                        help="count single words (default), pairs or triples of words")
+    parser.add_argument("--approximate", action="store_true",
+                        help="count in bounded memory, records get the error bound of the counts")
+    parser.add_argument("--memory", type=int, default=MEMORY // 2 ** 20,
+                        help="memory of the approximate counting in MB per process (default: {})".format(
+                            MEMORY // 2 ** 20))
+    parser.add_argument("--index", nargs="?", const=INDEX_PATH, default=None, metavar="FILE",
+                        help="put counts of words in the index of documents, see python -m text_reader.index "
+                             "(default file: {})".format(INDEX_PATH))
+    parser.add_argument("--no-cache", action="store_true", help="don't use the cache of texts and words")
+    parser.add_argument("--metrics", help="measure the stages and write them to this file: Prometheus text if it ends "
+                                          "with .prom, JSON lines otherwise; files are analyzed in this process")
+    parser.add_argument("--trace-memory", action="store_true", help="measure peaks of memory of the stages too")
+    args = parser.parse_args(argv)
+    if args.index and (args.approximate or args.ngram != 1):
+        parser.error("--index needs exact counts of single words, don't use it with --approximate or --ngram")
+    if args.metrics:
+        if args.jobs not in (None, 1):
+            parser.error("--metrics measures only this process, use it with --jobs 1")
+        args.jobs = 1
+        metrics.enable(trace_memory=args.trace_memory)
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = run_batch(iter_paths(args.paths), output, language=args.language, top=args.top, jobs=args.jobs,
+                            use_cache=not args.no_cache, tokenizer=args.tokenizer, ngram=args.ngram,
+                            approximate=args.approximate, memory=args.memory * 2 ** 20, index=args.index)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(format_summary(summary), file=sys.stderr)
+    if args.metrics:
+        if args.metrics.endswith(".prom"):
+            metrics.write_prometheus(args.metrics)
+        else:
+            metrics.write_json_lines(args.metrics)
+        print(metrics.status(n=5), file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
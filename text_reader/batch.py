@@ -0,0 +1,165 @@
+"""The module is responsible for the analysis of many files without the graphical interface."""
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import json
+import os
+import time
+from .extractors import is_large_file, iter_pages
+from .files import FilesManager
+from .index import WordIndex
+from .sketch import MEMORY
+
+EXTENSIONS = (".txt", ".pdf", ".docx")
+
+
+def iter_paths(patterns):
+    """Find files to analyze.
+
+    :param patterns: File paths, directories (searched recursively) or glob patterns.
+    :type: iterable
+    :return: Paths of the files, each one only once.
+    :rtype: generator
+    """
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = (os.path.join(root, name) for root, _, names in os.walk(pattern) for name in sorted(names)
+                     if name.lower().endswith(EXTENSIONS))
+        elif glob.has_magic(pattern):
+            paths = (path for path in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(path))
+        else:
+            paths = (pattern,)
+        for path in paths:
+            if path not in seen:
+                seen.add(path)
+                yield path
+
+
+def analyze_file(path, language, top, use_cache=True, tokenizer="nltk", ngram=1, approximate=False, memory=MEMORY,
+                 index=None):
+    """Load the file and find its most popular words, large files are analyzed part by part without loading them.
+
+    :param path: File path.
+    :type: str
+    :param language: Language of the file.
+    :type: str
+    :param top: Number of words to find.
+    :type: int
+    :param use_cache: Use the cache shared with the graphical interface.
+    :type: bool
+    :param tokenizer: "nltk" or "regex", see text_reader.words.TOKENIZERS.
+    :type: str
+    :param ngram: Number of words in counted n-grams.
+    :type: int
+    :param approximate: Count in bounded memory, the record gets the error bound of the counts.
+    :type: bool
+    :param memory: Memory budget of the approximate counting in bytes.
+    :type: int
+    :param index: Path of text_reader.index.WordIndex which gets exact counts of single words of the file.
+    :type: str
+    :return: Record with path, language, words with counts, size, time and error.
+    :rtype: dict
+    """
+    record = {"path": path, "language": language, "words": [], "bytes": 0, "seconds": 0.0, "error": None}
+    if approximate:
+        record["error_bound"] = None
+    start = time.perf_counter()
+    try:
+        record["bytes"] = os.path.getsize(path)
+        file = FilesManager()
+        if not use_cache:
+            file.cache = None
+        file.tokenizer = tokenizer
+        file.memory = memory
+        if index is not None:
+            file.index = WordIndex(index)
+        if approximate:
+            parts = iter_pages(path, encoding=file.encoding) if is_large_file(path) else [file.load_file(path)]
+            hitters = file.find_heavy_hitters(parts, language, top, ngram)
+            record["words"] = [(word, count) for word, count, _ in hitters["words"]]
+            record["error_bound"] = hitters["error_bound"]
+        elif is_large_file(path):
+            record["words"] = file.find_top_n_in_file(path, language, top, ngram=ngram)
+        else:
+            file.load_file(path)
+            record["words"] = file.find_top_n(language, top, ngram=ngram)
+    except Exception as err:  # One broken file must not stop the whole batch.
+        record["error"] = "{}: {}".format(type(err).__name__, err)
+    record["seconds"] = round(time.perf_counter() - start, 6)
+    return record
+
+
+def run_batch(paths, output, language="english", top=5, jobs=None, use_cache=True, tokenizer="nltk", ngram=1,
+              approximate=False, memory=MEMORY, index=None):
+    """Analyze files in many processes and write one JSON line per file as soon as it is ready.
+
+    :param paths: Paths of the files.
+    :type: iterable
+    :param output: Opened text file for the records.
+    :type: io.TextIOBase
+    :param language: Language of the files.
+    :type: str
+    :param top: Number of words to find in each file.
+    :type: int
+    :param jobs: Number of processes, None means the number of CPUs, 1 runs in this process.
+    :type: int
+    :param use_cache: Use the cache shared with the graphical interface.
+    :type: bool
+    :param tokenizer: "nltk" or "regex", see text_reader.words.TOKENIZERS.
+    :type: str
+    :param ngram: Number of words in counted n-grams.
+    :type: int
+    :param approximate: Count in bounded memory, see analyze_file.
+    :type: bool
+    :param memory: Memory budget of the approximate counting in bytes, per process.
+    :type: int
+    :param index: Path of text_reader.index.WordIndex updated with every file, see analyze_file.
+    :type: str
+    :return: Number of documents, errors, bytes and seconds of the whole batch.
+    :rtype: dict
+    """
+    summary = {"documents": 0, "errors": 0, "bytes": 0, "seconds": 0.0}
+    start = time.perf_counter()
+
+    def write(record):
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        summary["documents"] += 1
+        summary["bytes"] += record["bytes"]
+        if record["error"] is not None:
+            summary["errors"] += 1
+
+    if jobs == 1:
+        for path in paths:
+            write(analyze_file(path, language, top, use_cache, tokenizer, ngram, approximate, memory, index))
+    else:
+        jobs = jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending = deque()
+            for path in paths:
+                pending.append(executor.submit(analyze_file, path, language, top, use_cache, tokenizer, ngram,
+                                               approximate, memory, index))
+                if len(pending) > 2 * jobs:
+                    write(pending.popleft().result())
+            while pending:
+                write(pending.popleft().result())
+
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def format_summary(summary):
+    """Describe the throughput of a batch.
+
+    :param summary: Result of run_batch.
+    :type: dict
+    :return: Human readable summary.
+    :rtype: str
+    """
+    seconds = summary["seconds"] or 1e-9
+    return "{documents} documents ({errors} errors), {mb:.2f} MB in {seconds:.2f} s: " \
+           "{docs_s:.2f} docs/s, {mb_s:.2f} MB/s".format(documents=summary["documents"], errors=summary["errors"],
+                                                        mb=summary["bytes"] / 1e6, seconds=summary["seconds"],
+                                                        docs_s=summary["documents"] / seconds,
+                                                        mb_s=summary["bytes"] / 1e6 / seconds)
@@ -0,0 +1,280 @@
+"""The module is responsible for the cache of extracted texts and word statistics on disk."""
+from functools import lru_cache
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+CACHE_DIR = os.environ.get("TEXT_READER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "text_reader"))
+MAX_SIZE = 512 * 1024 * 1024
+AUDIO_MAX_SIZE = 1024 * 1024 * 1024
+BLOCK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """Hash the content of the file.
+
+    :param path: File path.
+    :type: str
+    :return: SHA-256 of the file content.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_digest(text):
+    """Hash the text, it is encoded block by block, so a large text isn't copied.
+
+    :param text: Text to hash.
+    :type: str
+    :return: SHA-256 of the text encoded as UTF-8.
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    for start in range(0, len(text), BLOCK_SIZE):
+        digest.update(text[start:start + BLOCK_SIZE].encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+class FileCache:
+    """This class can be used to keep values in SQLite database with the least recently used eviction.
+    Example:
+    from cache import FileCache, file_digest
+    cache = FileCache("/tmp/text_reader")
+    cache.save_text(file_digest("text_file_to_tests.txt"), "text")
+    cache.load_text(file_digest("text_file_to_tests.txt"))
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_size=MAX_SIZE, name="cache"):
+        """Constructor method.
+
+        :param directory: Directory of the cache database, it is created if it doesn't exist.
+        :type: str
+        :param max_size: Maximal size of all values in bytes.
+        :type: int
+        :param name: Name of the database file, caches with different names don't evict each other's values.
+        :type: str
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, name + ".sqlite3")
+        self.max_size = max_size
+        conn = self.connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                             "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        finally:
+            conn.close()
+
+    def connect(self):
+        """Connect with the cache database, every thread and process uses its own connection.
+
+        :return: SQLite connection.
+        :rtype: sqlite3.Connection
+        """
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        """Get value and mark it as recently used.
+
+        :param key: Key of the value.
+        :type: str
+        :return: Value or None if it isn't in the cache.
+        :rtype: bytes
+        """
+        conn = self.connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            return bytes(row[0])
+        finally:
+            conn.close()
+
+    def set(self, key, value):
+        """Save value and remove the least recently used values if the cache is too big.
+
+        :param key: Key of the value.
+        :type: str
+        :param value: Value to save.
+        :type: bytes
+        """
+        if len(value) > self.max_size:
+            return
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                             (key, value, len(value), time.time()))
+                self.evict(conn)
+        finally:
+            conn.close()
+
+    def evict(self, conn):
+        """Remove the least recently used values until all values fit in max_size.
+
+        :param conn: SQLite connection with an open transaction.
+        :type: sqlite3.Connection
+        """
+        excess = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0] - self.max_size
+        if excess <= 0:
+            return
+        old_keys = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            old_keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", old_keys)
+
+    def clear(self):
+        """Remove all values."""
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM entries")
+        finally:
+            conn.close()
+
+    def load_text(self, digest):
+        """Get the text extracted from a file.
+
+        :param digest: Result of file_digest.
+        :type: str
+        :return: Text or None if it isn't in the cache.
+        :rtype: str
+        """
+        value = self.get("text:" + digest)
+        if value is None:
+            return None
+        return zlib.decompress(value).decode("utf-8", "surrogatepass")
+
+    def save_text(self, digest, text):
+        """Save the text extracted from a file.
+
+        :param digest: Result of file_digest.
+        :type: str
+        :param text: Text from the file.
+        :type: str
+        """
+        self.set("text:" + digest, zlib.compress(text.encode("utf-8", "surrogatepass")))
+
+    @staticmethod
+    def words_key(text, language, stop_words, tokenizer="nltk", ngram=1):
+        """Create key of word statistics.
+
+        :param text: Analyzed text.
+        :type: str
+        :param language: Language of the text.
+        :type: str
+        :param stop_words: Stop words added by the user.
+        :type: iterable
+        :param tokenizer: Tokenizer which found the words, see text_reader.words.TOKENIZERS.
+        :type: str
+        :param ngram: Number of words in counted n-grams.
+        :type: int
+        :return: Key of the statistics.
+        :rtype: str
+        """
+        key = "words:{}:{}:{}".format(text_digest(text), language, text_digest("\n".join(sorted(stop_words))))
+        # Keys of NLTK statistics of single words stay as they were before other tokenizers and n-grams were added.
+        if tokenizer != "nltk":
+            key += ":" + tokenizer
+        if ngram != 1:
+            key += ":{}gram".format(ngram)
+        return key
+
+    def load_words(self, key, n):
+        """Get the most popular words.
+
+        :param key: Result of words_key.
+        :type: str
+        :param n: Number of words.
+        :type: int
+        :return: Pairs (word, count) or None if there isn't enough words in the cache.
+        :rtype: list
+        """
+        value = self.get(key)
+        if value is None:
+            return None
+        saved = json.loads(value.decode("utf-8"))
+        if saved["n"] < n:
+            return None
+        return [tuple(pair) for pair in saved["words"][:n]]
+
+    def save_words(self, key, n, top_words):
+        """Save the most popular words.
+
+        :param key: Result of words_key.
+        :type: str
+        :param n: Number of words which were requested.
+        :type: int
+        :param top_words: Pairs (word, count).
+        :type: list
+        """
+        self.set(key, json.dumps({"n": n, "words": top_words}, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def audio_key(sentence, language, backend):
+        """Create key of the audio of a sentence, sentences which differ only in spaces have the same key.
+
+        :param sentence: Sentence to convert.
+        :type: str
+        :param language: Language code, e.g. "en".
+        :type: str
+        :param backend: Text-to-speech engine.
+        :type: text_reader.speech.SpeechBackend
+        :return: Key of the audio.
+        :rtype: str
+        """
+        return "audio:{}:{}:{}:{}".format(backend.name, backend.settings(), language,
+                                          text_digest(" ".join(sentence.split())))
+
+
+@lru_cache(maxsize=None)
+def default_cache():
+    """Open the cache shared by the graphical interface and the batch mode.
+
+    :return: Cache in CACHE_DIR or None if it is disabled with TEXT_READER_NO_CACHE or can't be created.
+    :rtype: FileCache
+    """
+    return _open_cache(MAX_SIZE, "cache")
+
+
+@lru_cache(maxsize=None)
+def default_audio_cache():
+    """Open the cache of the audio of sentences.
+
+    :return: Cache in CACHE_DIR or None if it is disabled with TEXT_READER_NO_CACHE or can't be created.
+    :rtype: FileCache
+    """
+    return _open_cache(AUDIO_MAX_SIZE, "audio")
+
+
+def _open_cache(max_size, name):
+    """Open a cache in CACHE_DIR.
+
+    :param max_size: Maximal size of all values in bytes.
+    :type: int
+    :param name: Name of the database file.
+    :type: str
+    :return: Cache or None if it is disabled with TEXT_READER_NO_CACHE or can't be created.
+    :rtype: FileCache
+    """
+    if os.environ.get("TEXT_READER_NO_CACHE"):
+        return None
+    try:
+        return FileCache(CACHE_DIR, max_size, name)
+    except (OSError, sqlite3.Error) as err:
+        print("Cache disabled: {}".format(err))
+        return None
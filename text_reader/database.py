@@ -1,88 +1,190 @@
 """The module is responsible for SQL databases."""
-import mysql.connector
-import text_reader.databaseconfig as cfg
+from functools import lru_cache
+from threading import Lock
+import time
+from weakref import WeakKeyDictionary
+from .metrics import timed
+from .storage import load_backend, quote_identifier
+
+BATCH_SIZE = 1000
+FLUSH_INTERVAL = 5.0
+METADATA_TTL = 60.0
+
+
+@lru_cache(maxsize=None)
+def default_backend():
+    """Get the storage engine chosen in databaseconfig, it is shared by all SQLDatabase objects.
+
+    :return: Storage engine.
+    :rtype: text_reader.storage.MySQLBackend or text_reader.storage.SQLiteBackend
+    """
+    return load_backend()
+
+
+class MetadataCache:
+    """This class can be used for keeping names of databases and tables for a while, so they aren't read from the
+    server every time they are shown.
+    """
+
+    def __init__(self, ttl=METADATA_TTL):
+        """Constructor method.
+
+        :param ttl: Number of seconds after which the names are read again.
+        :type: float
+        """
+        self.ttl = ttl
+        self.entries = {}
+        # Values loaded before the last invalidate of their key (or of all keys) are not stored.
+        self.generations = {}
+        self.generation = 0
+        self.lock = Lock()
+
+    def get(self, key, load):
+        """Get the value, it is loaded if it isn't in the cache or it is too old.
+
+        :param key: Key of the value, e.g. ("tables", "text_reader_books").
+        :type: tuple
+        :param load: Function which reads the value from the database.
+        :type: callable
+        :return: Cached or loaded value.
+        :rtype: list
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            generation = (self.generation, self.generations.get(key, 0))
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return list(entry[1])
+        loaded_at = time.monotonic()
+        value = load()
+        with self.lock:
+            if generation == (self.generation, self.generations.get(key, 0)):
+                self.entries[key] = (loaded_at, list(value))
+        return list(value)
+
+    def is_fresh(self, key):
+        """Check if the value is in the cache and it isn't too old.
+
+        :param key: Key of the value.
+        :type: tuple
+        :rtype: bool
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def invalidate(self, key=None):
+        """Remove the value, so it is read again next time.
+
+        :param key: Key of the value, None removes all values.
+        :type: tuple
+        """
+        with self.lock:
+            if key is None:
+                self.entries.clear()
+                self.generation += 1
+            else:
+                self.entries.pop(key, None)
+                self.generations[key] = self.generations.get(key, 0) + 1
+
+
+_metadata_caches = WeakKeyDictionary()
+_metadata_lock = Lock()
+
+
+def metadata_cache(backend):
+    """Get the cache of names of databases and tables of the engine, it is shared by all SQLDatabase objects and
+    removed together with the engine.
+
+    :param backend: Storage engine.
+    :type: text_reader.storage.MySQLBackend or text_reader.storage.SQLiteBackend
+    :rtype: MetadataCache
+    """
+    with _metadata_lock:
+        if backend not in _metadata_caches:
+            _metadata_caches[backend] = MetadataCache()
+        return _metadata_caches[backend]
+
 
 class SQLDatabase:
     """This class can be used for SQL operation on databases.
+    The data is stored by the engine chosen in databaseconfig (MySQL or SQLite), see text_reader.storage.
     """
 
-    def __init__(self):
-        """Constructor method."""
+    def __init__(self, backend=None):
+        """Constructor method.
+
+        :param backend: Storage engine, default_backend() if it is None.
+        :type: text_reader.storage.MySQLBackend or text_reader.storage.SQLiteBackend
+        """
+        self.backend = backend or default_backend()
+        self.metadata = metadata_cache(self.backend)
         self.db_name = ""
         self.all_databases = []
         self.table_name = ""
         self.all_tables = []
 
-    @staticmethod
-    def connect():
+    def connect(self, database=None):
         """Connect with database.
 
-        :return: Cursor and connector.
-        :rtype: mysql.connector.connection.MySQLConnection, mysql.connector.cursor.MySQLCursor
+        :param database: Name of the database used by the connection, None means no database.
+        :type: str
+        :raises mysql.connector.errors.ProgrammingError: Unknown database.
+        :return: Connector and cursor.
+        :rtype: mysql.connector.pooling.PooledMySQLConnection or sqlite3.Connection, cursor
         """
-        conn = mysql.connector.connect(**cfg.mysql_connect)
-        cursor = conn.cursor()
-        return conn, cursor
+        return self.backend.connect(database)
 
     @staticmethod
     def close(cursor, conn):
-        """Close connection with database.
+        """Close cursor and connection, pooled connection goes back to the pool.
 
-        :param cursor: MySQL cursor.
+        :param cursor: MySQL or SQLite cursor.
         :type cursor:  mysql.connector.cursor.MySQLCursor
-        :param conn: MySQL connector.
-        :type conn: mysql.connector.connection.MySQLConnection
+        :param conn: MySQL or SQLite connector.
+        :type conn: mysql.connector.pooling.PooledMySQLConnection
         """
         cursor.close()
         conn.close()
 
+    @timed("sql.create_database")
     def create_database(self):
-        """Create new database.
+        """Create new database, nothing is done if it already exists.
 
-        :raises mysql.connector.Error: Fail during creation database.
-        :raises mysql.connector.errors.DatabaseError: Database already exists.
+        :raises mysql.connector.Error: Fail during creation database, e.g. wrong name.
         :return: An information of success of operation.
         :rtype: bool
         """
-        conn, cursor = SQLDatabase.connect()
         success = False
+        name = "text_reader_" + self.db_name
         try:
-            cursor.execute(
-                "CREATE DATABASE text_reader_{} DEFAULT CHARACTER SET 'utf8'".format(self.db_name))
-            success = True
-        except mysql.connector.errors.DatabaseError as err:
-            print("database exists: {}".format(err))
-        except mysql.connector.Error as err:
+            if name in self.backend.list_databases():
+                print("database exists: {}".format(name))
+            else:
+                self.backend.create_database(name)
+                success = True
+        except self.backend.Error as err:
             print("Failed creating database: {}".format(err))
         finally:
-            SQLDatabase.close(cursor, conn)
+            self.metadata.invalidate(("databases",))
 
         return success
 
-    def show_database(self):
-        """Show all databases.
+    @timed("sql.show_database")
+    def show_database(self, refresh=False):
+        """Show all databases, the names are cached for METADATA_TTL seconds.
 
+        :param refresh: Read the names from the server even if they are in the cache.
+        :type: bool
         :return: All names of databases.
         :rtype: list
         """
-        conn, cursor = SQLDatabase.connect()
-        cursor.execute("SHOW DATABASES")
-        self.all_databases = [db[0] for db in cursor.fetchall() if db[0].startswith('text_reader_')]
-        SQLDatabase.close(cursor, conn)
+        if refresh:
+            self.metadata.invalidate(("databases",))
+        self.all_databases = self.metadata.get(("databases",), lambda: [
+            db for db in self.backend.list_databases() if db.startswith('text_reader_')])
         return self.all_databases
 
-    def change_database(self, cursor):
-        """Switch database.
-
-        :param cursor: MySQL cursor.
-        :type cursor:  mysql.connector.cursor.MySQLCursor
-        :raises mysql.connector.errors.ProgrammingError: Unknown database.
-        """
-        try:
-            cursor.execute("USE {}".format(self.db_name))
-        except mysql.connector.errors.ProgrammingError as err:
-            print("{}, {} -->  unknown".format(err, self.db_name))
-
+    @timed("sql.create_table")
     def create_table(self, table_name):
         """Create table in database.
 
@@ -93,47 +195,63 @@ class SQLDatabase:
         :rtype: bool
         """
         self.table_name = table_name
-        conn, cursor = SQLDatabase.connect()
-        self.change_database(cursor)
         success = False
+        try:
+            conn, cursor = self.connect(self.db_name)
+        except self.backend.ProgrammingError as err:
+            print("{}, {} -->  unknown".format(err, self.db_name))
+            return success
         try:
             cursor.execute("CREATE TABLE IF NOT EXISTS {} (\
-                        Text_ID int NOT NULL AUTO_INCREMENT PRIMARY KEY,\
+                        Text_ID {},\
                         Text_Path varchar(250) NOT NULL,\
                         Word_First varchar(250) NOT NULL, \
                         Word_Second varchar(250),\
                         Word_Third varchar(250),\
                         Word_Fourth varchar(250),\
                         Word_Fifth varchar(250));\
-                        ".format(self.table_name))
+                        ".format(quote_identifier(self.table_name), self.backend.auto_id))
             success = True
-        except mysql.connector.errors.ProgrammingError as err:
+        except self.backend.ProgrammingError as err:
             print("Failed creating table: {}".format(err))
         finally:
             SQLDatabase.close(cursor, conn)
+            self.metadata.invalidate(("tables", self.db_name))
 
         return success
 
-    def show_tables(self, name_db):
-        """Show all table names in chosen database.
+    @timed("sql.show_tables")
+    def show_tables(self, name_db, refresh=False):
+        """Show all table names in chosen database, the names are cached for METADATA_TTL seconds.
 
         :param name_db: Name of the database.
         :type name_db: str
+        :param refresh: Read the names from the server even if they are in the cache.
+        :type: bool
         :raises mysql.connector.errors.ProgrammingError: Unknown database.
         :return: Names of the tables.
         :rtype: list
         """
-        conn, cursor = SQLDatabase.connect()
+        if refresh:
+            self.metadata.invalidate(("tables", name_db))
         try:
-            cursor.execute("SHOW TABLES FROM {}".format(name_db))
-            self.all_tables = [table[0] for table in cursor.fetchall()]
-        except mysql.connector.errors.ProgrammingError as err:
+            self.all_tables = self.metadata.get(("tables", name_db), lambda: self.backend.list_tables(name_db))
+        except self.backend.ProgrammingError as err:
             print("{} : {} --> unknown".format(err, name_db))
-        finally:
-            SQLDatabase.close(cursor, conn)
 
         return self.all_tables
 
+    @timed("sql.load_metadata")
+    def load_metadata(self):
+        """Read names of databases and their tables into the cache, errors are printed."""
+        database = SQLDatabase(self.backend)
+        try:
+            for name_db in database.show_database():
+                database.show_tables(name_db)
+        except self.backend.Error as err:
+            print("Failed reading databases: {}".format(err))
+
+    @timed("sql.insert_item")
     def insert_item(self, text_path, word_first, word_second, word_third, word_fourth, word_fifth):
         """Insert new record in SQL table.
 
@@ -153,21 +271,288 @@ class SQLDatabase:
         :return: Information of success of operation.
         :rtype: bool
         """
-        conn, cursor = SQLDatabase.connect()
-        self.change_database(cursor)
         success = False
         try:
-            cursor.execute("INSERT INTO {table} (Text_Path, Word_First, Word_Second, Word_Third,\
-                                   Word_Fourth, Word_Fifth) VALUES ('{path}','{first}', '{second}',\
-                                    '{third}', '{fourth}', '{fifth}')\
-                                    ".format(table=self.table_name, path=text_path, first=word_first,
-                                             second=word_second,
-                                             third=word_third, fourth=word_fourth, fifth=word_fifth))
+            conn, cursor = self.connect(self.db_name)
+        except self.backend.ProgrammingError as err:
+            print("{}, {} -->  unknown".format(err, self.db_name))
+            return success
+        try:
+            cursor.execute(self.backend.sql(
+                "INSERT INTO {} (Text_Path, Word_First, Word_Second, Word_Third, Word_Fourth, Word_Fifth) "
+                "VALUES (%s, %s, %s, %s, %s, %s)".format(quote_identifier(self.table_name))),
+                           (text_path, word_first, word_second, word_third, word_fourth, word_fifth))
             conn.commit()
             success = True
-        except mysql.connector.errors.ProgrammingError as err:
+        except self.backend.ProgrammingError as err:
             print("{} can't insert item".format(err))
         finally:
             SQLDatabase.close(cursor, conn)
 
         return success
+
+    @timed("sql.insert_items")
+    def insert_items(self, records, batch_size=BATCH_SIZE):
+        """Insert many records in SQL table in one transaction, batch by batch.
+
+        A failed batch is rolled back to its savepoint, the other batches are committed.
+
+        :param records: Records (text_path, word_first, ..., word_fifth), missing words are saved as empty strings.
+        :type: iterable
+        :param batch_size: Number of records sent in one statement.
+        :type: int
+        :raises mysql.connector.Error: Can't insert items.
+        :return: Number of rows, success and error of every batch.
+        :rtype: list
+        """
+        results = []
+        try:
+            conn, cursor = self.connect(self.db_name)
+        except self.backend.ProgrammingError as err:
+            print("{}, {} -->  unknown".format(err, self.db_name))
+            return results
+        statement = self.backend.sql(
+            "INSERT INTO {} (Text_Path, Word_First, Word_Second, Word_Third, Word_Fourth, Word_Fifth) "
+            "VALUES (%s, %s, %s, %s, %s, %s)".format(quote_identifier(self.table_name)))
+        try:
+            self.backend.begin(conn)
+            batch = []
+            for record in records:
+                batch.append((tuple(record) + ("",) * 6)[:6])
+                if len(batch) == batch_size:
+                    results.append(self.insert_batch(cursor, statement, batch))
+                    batch = []
+            if batch:
+                results.append(self.insert_batch(cursor, statement, batch))
+            conn.commit()
+        except self.backend.Error as err:
+            print("{} can't insert items".format(err))
+            conn.rollback()
+            for result in results:
+                result["success"] = False
+                result["error"] = result["error"] or str(err)
+        finally:
+            SQLDatabase.close(cursor, conn)
+
+        return results
+
+    def insert_batch(self, cursor, statement, batch):
+        """Insert a batch of records as one multi-row INSERT, it is rolled back alone if it fails.
+
+        :param cursor: MySQL cursor in an open transaction.
+        :type cursor:  mysql.connector.cursor.MySQLCursor
+        :param statement: INSERT statement with parameters.
+        :type statement: str
+        :param batch: Records to insert.
+        :type batch: list
+        :return: Number of rows, success and error of the batch.
+        :rtype: dict
+        """
+        result = {"rows": len(batch), "success": False, "error": None}
+        cursor.execute("SAVEPOINT text_reader_batch")
+        try:
+            cursor.executemany(statement, batch)
+            result["success"] = True
+        except self.backend.DatabaseError as err:
+            cursor.execute("ROLLBACK TO SAVEPOINT text_reader_batch")
+            result["error"] = str(err)
+        return result
+
+    @timed("sql.create_word_tables")
+    def create_word_tables(self):
+        """Create normalized tables: documents and their words with ranks and counts, indexed by word and document.
+
+        :raises mysql.connector.errors.ProgrammingError: Can't create tables.
+        :return: Information of success of operation.
+        :rtype: bool
+        """
+        success = False
+        try:
+            conn, cursor = self.connect(self.db_name)
+        except self.backend.ProgrammingError as err:
+            print("{}, {} -->  unknown".format(err, self.db_name))
+            return success
+        try:
+            for statement in self.backend.word_tables():
+                cursor.execute(statement)
+            success = True
+        except self.backend.ProgrammingError as err:
+            print("Failed creating tables: {}".format(err))
+        finally:
+            SQLDatabase.close(cursor, conn)
+
+        return success
+
+    @timed("sql.insert_document")
+    def insert_document(self, path, digest, language, top_words):
+        """Insert document and its most popular words in normalized tables in one transaction, nothing is inserted if
+        any of the words fails.
+
+        :param path: The path to the text file.
+        :type path: str
+        :param digest: SHA-256 of the file content or None.
+        :type digest: str
+        :param language: Language of the text.
+        :type language: str
+        :param top_words: Pairs (word, count), the most popular first.
+        :type top_words: list
+        :raises mysql.connector.errors.DatabaseError: Can't insert document.
+        :return: Id of the document or None if it wasn't inserted.
+        :rtype: int
+        """
+        doc_id = None
+        try:
+            conn, cursor = self.connect(self.db_name)
+        except self.backend.ProgrammingError as err:
+            print("{}, {} -->  unknown".format(err, self.db_name))
+            return doc_id
+        try:
+            self.backend.begin(conn)
+            cursor.execute(self.backend.sql("INSERT INTO documents (path, hash, language) VALUES (%s, %s, %s)"),
+                           (path, digest, language))
+            doc_id = cursor.lastrowid
+            cursor.executemany(self.backend.sql("INSERT INTO document_words (doc_id, word, `rank`, count) "
+                                                "VALUES (%s, %s, %s, %s)"),
+                               [(doc_id, word, rank, count) for rank, (word, count) in enumerate(top_words, 1)])
+            conn.commit()
+        except self.backend.DatabaseError as err:
+            print("{} can't insert document".format(err))
+            conn.rollback()
+            doc_id = None
+        finally:
+            SQLDatabase.close(cursor, conn)
+
+        return doc_id
+
+    def stream_rows(self, statement, params=()):
+        """Read rows one by one from the server instead of fetching all of them at once.
+
+        :param statement: SELECT statement with parameters.
+        :type statement: str
+        :param params: Values of the parameters.
+        :type params: tuple
+        :raises mysql.connector.errors.ProgrammingError: Unknown database or table.
+        :return: Rows.
+        :rtype: generator
+        """
+        conn, cursor = self.connect(self.db_name)
+        try:
+            cursor.execute(self.backend.sql(statement), params)
+            yield from cursor
+        finally:
+            # Rows which weren't read must be dropped before the connection goes back to the pool.
+            self.backend.finish_reading(conn)
+            SQLDatabase.close(cursor, conn)
+
+    @timed("sql.documents_with_word")
+    def documents_with_word(self, word):
+        """Find documents which have the word among their most popular words.
+
+        :param word: The word to find.
+        :type word: str
+        :return: Rows (id, path, language, rank, count), the best rank first.
+        :rtype: generator
+        """
+        yield from self.stream_rows("SELECT d.id, d.path, d.language, w.`rank`, w.count FROM document_words w "
+                                    "JOIN documents d ON d.id = w.doc_id WHERE w.word = %s ORDER BY w.`rank`, d.id",
+                                    (word,))
+
+    @timed("sql.top_words_across_corpus")
+    def top_words_across_corpus(self, n, language=None):
+        """Find words which are the most popular in all documents together.
+
+        :param n: Number of words.
+        :type n: int
+        :param language: Only documents in this language, None means all.
+        :type language: str
+        :return: Rows (word, total count, number of documents).
+        :rtype: generator
+        """
+        if language is None:
+            yield from self.stream_rows("SELECT word, SUM(count) AS total, COUNT(*) FROM document_words "
+                                        "GROUP BY word ORDER BY total DESC, word LIMIT %s", (n,))
+        else:
+            yield from self.stream_rows("SELECT w.word, SUM(w.count) AS total, COUNT(*) FROM document_words w "
+                                        "JOIN documents d ON d.id = w.doc_id WHERE d.language = %s "
+                                        "GROUP BY w.word ORDER BY total DESC, w.word LIMIT %s", (language, n))
+
+    @timed("sql.list_documents")
+    def list_documents(self, page_size=100, after_id=0):
+        """List documents page by page, the next page starts after the last id of the previous one.
+
+        :param page_size: Number of documents on the page.
+        :type page_size: int
+        :param after_id: The last id of the previous page, 0 for the first page.
+        :type after_id: int
+        :return: Rows (id, path, hash, language, analyzed_at) ordered by id.
+        :rtype: list
+        """
+        return list(self.stream_rows("SELECT id, path, hash, language, analyzed_at FROM documents WHERE id > %s "
+                                     "ORDER BY id LIMIT %s", (after_id, page_size)))
+
+    def writer(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        """Create writer which collects records and inserts them in batches.
+
+        :param batch_size: Number of records which are inserted at once.
+        :type batch_size: int
+        :param flush_interval: Maximal time in seconds between the first collected record and its insert.
+        :type flush_interval: float
+        :return: Writer to use in with statement.
+        :rtype: SQLWriter
+        """
+        return SQLWriter(self, batch_size, flush_interval)
+
+
+class SQLWriter:
+    """This class can be used to stream records into SQL table, they are inserted in batches.
+    Example:
+    with SQLDatabase().writer(batch_size=500) as writer:
+        writer.add("path", ["one", "two", "three", "four", "five"])
+    print(writer.results)
+    """
+
+    def __init__(self, database, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        """Constructor method.
+
+        :param database: Database with chosen db_name and table_name.
+        :type database: SQLDatabase
+        :param batch_size: Number of records which are inserted at once.
+        :type batch_size: int
+        :param flush_interval: Maximal time in seconds between the first collected record and its insert.
+        :type flush_interval: float
+        """
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.first_added = None
+        self.results = []
+
+    def __enter__(self):
+        """Start collecting records."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Insert the rest of the records."""
+        self.flush()
+
+    def add(self, text_path, words):
+        """Collect a record, the records are inserted when there are batch_size of them or flush_interval passed.
+
+        :param text_path: The path to the text file.
+        :type text_path: str
+        :param words: Up to 5 most popular words in text.
+        :type words: list
+        """
+        if not self.buffer:
+            self.first_added = time.monotonic()
+        self.buffer.append([text_path] + list(words)[:5])
+        if len(self.buffer) >= self.batch_size or time.monotonic() - self.first_added >= self.flush_interval:
+            self.flush()
+
+    @timed("sql.writer_flush")
+    def flush(self):
+        """Insert all collected records."""
+        if self.buffer:
+            self.results.extend(self.database.insert_items(self.buffer, self.batch_size))
+            self.buffer = []
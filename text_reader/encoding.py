@@ -0,0 +1,168 @@
+"""The module is responsible for finding the encoding of texts."""
+import codecs
+from .lazy import lazy_import
+from .metrics import metrics, timed
+
+chardet = lazy_import("chardet")
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+BLOCK_SIZE = 4096
+MAX_SAMPLE = 1 << 20
+FALLBACK_ENCODING = "latin-1"
+
+
+def detect_bom(data):
+    """Find the encoding by the byte order mark.
+
+    :param data: Encoded text.
+    :type: bytes-like object
+    :return: Name of the encoding or None if there is no BOM.
+    :rtype: str
+    """
+    head = bytes(data[:4])
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    return None
+
+
+def is_utf8(sample, complete):
+    """Check if the sample is valid UTF-8, a character cut at the end of an incomplete sample is allowed.
+
+    :param sample: Beginning of the encoded text.
+    :type: bytes
+    :param complete: The sample is the whole text.
+    :type: bool
+    :rtype: bool
+    """
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=complete)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _detect(sample):
+    """Feed one chardet detector block by block until it is sure of the encoding or the sample ends.
+
+    :param sample: Part of the encoded text.
+    :type: memoryview
+    :return: Name of the encoding, FALLBACK_ENCODING if chardet doesn't know it.
+    :rtype: str
+    """
+    with metrics.stage("encoding.chardet") as stage:
+        detector = chardet.UniversalDetector()
+        for start in range(0, len(sample), BLOCK_SIZE):
+            detector.feed(bytes(sample[start:start + BLOCK_SIZE]))
+            stage.count(nbytes=min(BLOCK_SIZE, len(sample) - start))
+            if detector.done:
+                break
+        return detector.close()["encoding"] or FALLBACK_ENCODING
+
+
+@timed("encoding.detect")
+def detect_encoding(data, encoding=None, max_sample=MAX_SAMPLE, check_utf8=True):
+    """Find the encoding of the text looking at as few bytes as possible.
+
+    The user encoding, BOM and UTF-8 are checked first. Then chardet gets the text block by block until it is sure of
+    the encoding or max_sample bytes were checked.
+
+    :param data: Encoded text, e.g. bytes or memory-mapped file.
+    :type: bytes-like object
+    :param encoding: Encoding chosen by the user, it is returned without checking.
+    :type: str
+    :param max_sample: Maximal number of bytes given to chardet.
+    :type: int
+    :param check_utf8: Return "utf-8" if the first max_sample bytes are valid UTF-8.
+    :type: bool
+    :return: Name of the encoding.
+    :rtype: str
+    """
+    if encoding:
+        return encoding
+    bom = detect_bom(data)
+    if bom is not None:
+        return bom
+    data = memoryview(data)
+    if check_utf8 and is_utf8(data[:max_sample], complete=len(data) <= max_sample):
+        return "utf-8"
+    return _detect(data[:max_sample])
+
+
+def detect_rest_encoding(data, start, max_sample=MAX_SAMPLE):
+    """Find the encoding of the rest of the text which isn't in the detected encoding, e.g. a file with a long ASCII
+    beginning and Latin-1 text after it. The sample is taken from the first wrong byte, not from the beginning which
+    misled the detection.
+
+    :param data: Encoded text.
+    :type: bytes-like object
+    :param start: Position of the first byte which couldn't be decoded.
+    :type: int
+    :param max_sample: Maximal number of bytes given to chardet.
+    :type: int
+    :return: Name of the encoding.
+    :rtype: str
+    """
+    return _detect(memoryview(data)[start:start + max_sample])
+
+
+def iter_decode(data, encoding=None, chunk_size=MAX_SAMPLE):
+    """Decode the text chunk by chunk like decode, so its result doesn't depend on reading the text at once or in
+    chunks. Newlines aren't changed.
+
+    :param data: Encoded text, e.g. memory-mapped file.
+    :type: bytes-like object
+    :param encoding: Encoding chosen by the user.
+    :type: str
+    :param chunk_size: Number of bytes decoded at once.
+    :type: int
+    :return: Pairs (number of bytes decoded so far, text of the chunk).
+    :rtype: generator
+    """
+    data = memoryview(data)
+    size = len(data)
+    name = detect_encoding(data, encoding)
+    decoder = codecs.getincrementaldecoder(name)("replace" if encoding else "strict")
+    start = 0
+    while start < size:
+        end = min(start + chunk_size, size)
+        pending = len(decoder.getstate()[0])
+        try:
+            text = decoder.decode(data[start:end], final=end == size)
+        except UnicodeDecodeError as err:
+            # The same as in decode: the text from the first wrong byte is in another encoding. Positions of the
+            # error count the bytes kept by the decoder from the previous chunk too.
+            position = start - pending + err.start
+            yield position, str(data[start - pending:position], name)
+            decoder = codecs.getincrementaldecoder(detect_rest_encoding(data, position))("replace")
+            start = position
+            continue
+        yield end, text
+        start = end
+
+
+def decode(data, encoding=None):
+    """Decode the text with its encoding, newlines are changed to "\\n". If the detected encoding fails later in the
+    text, the rest from the first wrong byte is decoded with the encoding detected there.
+
+    :param data: Encoded text.
+    :type: bytes
+    :param encoding: Encoding chosen by the user.
+    :type: str
+    :return: Text.
+    :rtype: str
+    """
+    name = detect_encoding(data, encoding)
+    try:
+        text = str(data, name, "replace" if encoding else "strict")
+    except UnicodeDecodeError as err:
+        # The sample was misleading, the text from the first wrong byte is in another encoding.
+        data = memoryview(data)
+        text = str(data[:err.start], name) + str(data[err.start:], detect_rest_encoding(data, err.start), "replace")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
@@ -0,0 +1,262 @@
+"""The module is responsible for the extraction of text from files of different formats."""
+from io import StringIO
+import mmap
+import os
+from .encoding import decode, is_utf8, iter_decode
+from .lazy import lazy_import
+
+docx2txt = lazy_import("docx2txt")
+pdfminer = lazy_import("pdfminer")
+textract = lazy_import("textract")
+
+MAGIC_SIZE = 8
+CHUNK_SIZE = 1 << 20
+LARGE_FILE_SIZE = 64 * 1024 * 1024
+
+_extractors = {}
+_page_extractors = {}
+_extensions = {}
+_magic = []
+
+
+class Cancelled(Exception):
+    """The operation was stopped by the user."""
+
+
+def register_extractor(name, function, extensions=(), magic=(), pages=None):
+    """Register a function which extracts text from files of some format.
+
+    :param name: Name of the format.
+    :type: str
+    :param function: Function which takes a file path and an encoding chosen by the user or None and returns the text.
+    :type: callable
+    :param extensions: File extensions of the format, e.g. ".pdf".
+    :type: iterable
+    :param magic: First bytes of the files of the format, e.g. b"%PDF-".
+    :type: iterable
+    :param pages: Function like iter_pdf_pages which takes a file path, progress, cancel and encoding and yields the
+        text part by part.
+    :type: callable
+    """
+    _extractors[name] = function
+    if pages is not None:
+        _page_extractors[name] = pages
+    for extension in extensions:
+        _extensions[extension.lower()] = name
+    for prefix in magic:
+        _magic.append((prefix, name))
+
+
+def find_extractor(path):
+    """Choose the extractor by the extension of the file, or by its first bytes if the extension is not registered.
+
+    :param path: File path.
+    :type: str
+    :return: Name of the format, "other" if it is unknown.
+    :rtype: str
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in _extensions:
+        return _extensions[extension]
+    with open(path, "rb") as f:
+        header = f.read(MAGIC_SIZE)
+    names = {name for prefix, name in _magic if header.startswith(prefix)}
+    if len(names) == 1:
+        return names.pop()
+    return "other"
+
+
+def extract_text(path, encoding=None):
+    """Extract text from the file with the extractor of its format.
+
+    :param path: File path.
+    :type: str
+    :param encoding: Encoding of text files chosen by the user, None means it is detected.
+    :type: str
+    :return: Text from the file.
+    :rtype: str
+    """
+    return _extractors[find_extractor(path)](path, encoding)
+
+
+def is_large_file(path):
+    """Check if the file should be analyzed part by part instead of being loaded at once.
+
+    :param path: File path.
+    :type: str
+    :rtype: bool
+    """
+    return os.path.getsize(path) > LARGE_FILE_SIZE
+
+
+def iter_pages(path, progress=None, cancel=None, encoding=None):
+    """Extract text from the file part by part (pages, chunks of text files) if its format allows it, otherwise as
+    one part.
+
+    :param path: File path.
+    :type: str
+    :param progress: Function called with the number of done and all parts (pages, bytes) after each part.
+    :type: callable
+    :param cancel: Event which stops the extraction when it is set.
+    :type: threading.Event
+    :param encoding: Encoding of text files chosen by the user, None means it is detected.
+    :type: str
+    :raises Cancelled: The cancel event was set.
+    :return: Text of the parts.
+    :rtype: generator
+    """
+    name = find_extractor(path)
+    if name in _page_extractors:
+        yield from _page_extractors[name](path, progress, cancel, encoding)
+        return
+    if cancel is not None and cancel.is_set():
+        raise Cancelled(path)
+    yield _extractors[name](path, encoding)
+    if progress is not None:
+        progress(1, 1)
+
+
+def extract_plain_text(path, encoding=None):
+    """Read a text file.
+
+    :param path: File path.
+    :type: str
+    :param encoding: Encoding chosen by the user, None means it is detected.
+    :type: str
+    :return: Text from the file.
+    :rtype: str
+    """
+    with open(path, "rb") as f:
+        return decode(f.read(), encoding)
+
+
+def iter_text_chunks(path, progress=None, cancel=None, encoding=None, chunk_size=CHUNK_SIZE):
+    """Read a text file through a memory map and decode it chunk by chunk, cut at the ends of lines (or at spaces
+    in very long lines).
+
+    Only one chunk of the decoded text is kept in memory, so files larger than the memory can be analyzed.
+
+    :param path: File path.
+    :type: str
+    :param progress: Function called with the number of read and all bytes after each chunk.
+    :type: callable
+    :param cancel: Event which stops the reading when it is set.
+    :type: threading.Event
+    :param encoding: Encoding chosen by the user, None means it is detected from a sample.
+    :type: str
+    :param chunk_size: Number of bytes decoded at once.
+    :type: int
+    :raises Cancelled: The cancel event was set.
+    :return: Text of the chunks, together the same as extract_plain_text gives.
+    :rtype: generator
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            rest = ""
+            for end, chunk in iter_decode(data, encoding, chunk_size):
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled(path)
+                text = rest + chunk
+                if end == size:
+                    cut = len(text)
+                else:
+                    cut = text.rfind("\n") + 1 or text.rfind(" ") + 1
+                rest = text[cut:]
+                if cut:
+                    yield text[:cut].replace("\r\n", "\n").replace("\r", "\n")
+                if progress is not None:
+                    progress(end, size)
+
+
+def extract_docx(path, encoding=None):
+    """Read text of a Word document.
+
+    :param path: File path.
+    :type: str
+    :param encoding: Not used, Word documents know their encoding.
+    :type: str
+    :return: Text from the file.
+    :rtype: str
+    """
+    return docx2txt.process(path)
+
+
+def extract_pdf(path, encoding=None):
+    """Read text of a PDF document.
+
+    :param path: File path.
+    :type: str
+    :param encoding: Not used, PDF documents know their encoding.
+    :type: str
+    :return: Text from the file.
+    :rtype: str
+    """
+    return pdfminer.high_level.extract_text(path)
+
+
+def iter_pdf_pages(path, progress=None, cancel=None, encoding=None):
+    """Read text of a PDF document page by page, only one page is kept in memory.
+
+    :param path: File path.
+    :type: str
+    :param progress: Function called with the number of done and all pages after each page.
+    :type: callable
+    :param cancel: Event which stops the extraction when it is set.
+    :type: threading.Event
+    :param encoding: Not used, PDF documents know their encoding.
+    :type: str
+    :raises Cancelled: The cancel event was set.
+    :return: Text of the pages, the same as extract_pdf gives for them.
+    :rtype: generator
+    """
+    with open(path, "rb") as f:
+        # The document is parsed once, it gives the number of pages and the pages.
+        document = pdfminer.pdfdocument.PDFDocument(pdfminer.pdfparser.PDFParser(f))
+        try:
+            total = pdfminer.pdftypes.resolve1(document.catalog["Pages"])["Count"]
+        except (KeyError, TypeError):
+            total = None
+        manager = pdfminer.pdfinterp.PDFResourceManager()
+        output = StringIO()
+        converter = pdfminer.converter.TextConverter(manager, output, laparams=pdfminer.layout.LAParams())
+        try:
+            interpreter = pdfminer.pdfinterp.PDFPageInterpreter(manager, converter)
+            for done, page in enumerate(pdfminer.pdfpage.PDFPage.create_pages(document), start=1):
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled(path)
+                interpreter.process_page(page)
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+                if progress is not None:
+                    progress(done, total)
+        finally:
+            converter.close()
+
+
+def extract_other(path, encoding=None):
+    """Read a file of unknown format as text or with textract.
+
+    :param path: File path.
+    :type: str
+    :param encoding: Encoding chosen by the user, None means it is detected.
+    :type: str
+    :raises textract.exceptions.ShellError: Error with file.
+    :return: Text from the file.
+    :rtype: str
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if encoding or is_utf8(data, complete=True):
+        return decode(data, encoding)
+    return decode(textract.process(path))
+
+
+register_extractor("text", extract_plain_text, extensions=(".txt",), pages=iter_text_chunks)
+# Many formats (.docx, .xlsx, .epub) are zip archives, so the zip prefix does not tell the format of a file.
+register_extractor("docx", extract_docx, extensions=(".docx",))
+register_extractor("pdf", extract_pdf, extensions=(".pdf",), magic=(b"%PDF-",), pages=iter_pdf_pages)
+register_extractor("other", extract_other)
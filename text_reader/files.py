@@ -1,13 +1,14 @@
 """The module is responsible for the operations on files."""
-from collections import OrderedDict
-import string
-import chardet
-import pdfminer.high_level
-import textract
-from gtts import gTTS
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from collections import Counter
+import copy
+import os
+from .cache import default_audio_cache, default_cache, file_digest
+from .extractors import extract_text, iter_pages
+from .metrics import metrics, timed
+from .sketch import MEMORY, SpaceSaving, capacity_for
+from .speech import WORKERS, GTTSBackend, convert_text_to_mp3
+from .words import CHUNK_SIZE, count_words, count_words_in_parts, count_words_parallel, ensure_nltk_resources, \
+    iter_ngrams, top_n
 
 
 class FilesManager:
@@ -19,6 +20,19 @@ class FilesManager:
     file.convert_text_to_mp3("en","file.mp3")
     file.find_top_5_words("english")
     file.find_top_5_words("french")
+    file.find_top_n("english", 10)
+    file.find_top_n_in_file("report.pdf", "english", 10, progress=print)
+    file.workers = 4
+    file.find_top_n("english", 10)
+    file.tokenizer = "regex"
+    file.find_top_n("english", 10)
+    file.find_top_n("english", 10, approximate=True, ngram=2)
+    file.find_heavy_hitters([file.text], "english", 10)
+    file.index = WordIndex("/tmp/index.db")
+    file.load_file("report.pdf")
+    file.find_top_n("english", 10)
+    file.index.distinctive_words(os.path.abspath("report.pdf"))
+    file.cache = None
     """
 
     def __init__(self):
@@ -26,78 +40,244 @@ class FilesManager:
         """
         self.text = None
         self.top_5 = []
+        self.extra_stop_words = set()
+        self.workers = 1
+        self.chunk_size = CHUNK_SIZE
+        self.tokenizer = "nltk"
+        self.memory = MEMORY
+        self.cache = default_cache()
+        self.index = None
+        self.path = None
+        self.encoding = None
+        self.speech_backend = GTTSBackend()
+        self.speech_workers = WORKERS
+        self.speech_cache = default_audio_cache()
 
-    def load_file(self, file):
-        """Load file from computer.
+    def for_text(self, text):
+        """Make a manager with the same settings for another text, so operations running at the same time don't share
+        the text and the results.
+
+        :param text: Text used by the new manager.
+        :type: str
+        :rtype: FilesManager
+        """
+        manager = copy.copy(self)
+        manager.text = text
+        manager.top_5 = []
+        return manager
+
+    @timed("load_file")
+    def load_file(self, file, progress=None, cancel=None):
+        """Load file from computer, the text of a file which was loaded before is taken from the cache.
+
+        The format of the file is recognized by text_reader.extractors, so the file is parsed only once. Encoding of
+        text files is detected unless it is set in the encoding attribute.
 
         :param file: File path.
         :type: str
-        :raises UnicodeDecodeError: Error with text coding.
-        :raises textract.exceptions.ShellError: Error with file.
+        :param progress: Function called with the number of done and all parts (pages, bytes) after each part, the
+            file is then read part by part.
+        :type: callable
+        :param cancel: Event which stops the reading when it is set.
+        :type: threading.Event
+        :raises textract.exceptions.ShellError: Error with file of unknown format.
+        :raises text_reader.extractors.Cancelled: The cancel event was set.
         :return: Text from the file.
         :rtype: str
         """
-        try:
-            with open(file, encoding="utf-8") as f:
-                self.text = f.read()
-        except UnicodeDecodeError:
-            try:
-                text = textract.process(file)
-                file_information = chardet.detect(text)
-                self.text = text.decode(file_information["encoding"])
-            except textract.exceptions.ShellError:
-                text = pdfminer.high_level.extract_text(file)
-                self.text = text
+        self.path = file
+        digest = None
+        if self.cache is not None:
+            digest = file_digest(file) + (":" + self.encoding if self.encoding else "")
+            self.text = self.cache.load_text(digest)
+            if self.text is not None:
+                return self.text
+        with metrics.stage("load_file.extract", extension=os.path.splitext(file)[1].lower()) as stage:
+            if progress is None and cancel is None:
+                self.text = extract_text(file, self.encoding)
+            else:
+                self.text = "".join(iter_pages(file, progress, cancel, self.encoding))
+            stage.count(nbytes=os.path.getsize(file))
+        if digest is not None:
+            self.cache.save_text(digest, self.text)
         return self.text
 
-    def convert_text_to_mp3(self, language, filename):
-        """Convert text to audio.
+    def convert_text_to_mp3(self, language, filename, progress=None, cancel=None):
+        """Convert text to audio, sentences are sent to speech_backend in parts by speech_workers threads.
+
+        Audio of sentences is kept in speech_cache, so only new or changed sentences are converted again.
 
         :param language: Language of the text.
         :type: str
         :param filename: File path.
         :type: str
+        :param progress: Function called with the number of written and all parts after each part.
+        :type: callable
+        :param cancel: Event which stops the conversion when it is set.
+        :type: threading.Event
+        :raises text_reader.extractors.Cancelled: The cancel event was set.
         """
-        audio = gTTS(text=self.text, lang=language, slow=False)
-        audio.save(filename)
+        ensure_nltk_resources()
+        with metrics.stage("convert_text_to_mp3", backend=self.speech_backend.name) as stage:
+            convert_text_to_mp3(self.text, language, filename, self.speech_backend, self.speech_workers,
+                                cache=self.speech_cache, progress=progress, cancel=cancel)
+            stage.count(nbytes=len(self.text))
 
-    def find_top_5_words(self, language):
-        """Find the 5 most popular words in text with of without stop words.
+    @timed("find_top_n")
+    def find_top_n(self, language, n, approximate=False, ngram=1):
+        """Find the n most popular words or n-grams in text with or without stop words.
+
+        Words are found by tokenizer: "nltk" (nltk.word_tokenize) or much faster "regex" (text_reader.words.fast_tokens).
+        Texts longer than chunk_size are counted by NLTK in parallel when workers is not 1. Exact results are kept in
+        the cache. Approximate results are counted in the memory budget (bytes), see find_heavy_hitters. Exact counts of
+        words of a loaded file are put in index, see index_counts.
 
         :param language: Language of the file.
         :type: str
+        :param n: Number of words to find.
+        :type: int
+        :param approximate: Count in bounded memory, counts can be too big by the error bound of find_heavy_hitters.
+        :type: bool
+        :param ngram: Number of words in counted n-grams, see text_reader.words.iter_ngrams.
+        :type: int
         :raises LookupError: No tokenizers installed.
-        :return: The 5 most popular words in text.
+        :return: Pairs (word, count), the most popular first.
         :rtype: list
         """
-        del self.top_5[:]
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        finally:
-            tokens = word_tokenize(self.text)
-            tokens = [word.lower() for word in tokens]
-            tokens_without_punctuation = [word for word in tokens if word not in string.punctuation]
-
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-        finally:
-            if language == "other":
-                all_words = tokens_without_punctuation
-            else:
-                stop_words = stopwords.words(language)
-                all_words = [word for word in tokens_without_punctuation if word not in stop_words]
+        if approximate:
+            return [(word, count) for word, count, _ in self.find_heavy_hitters([self.text], language, n,
+                                                                                ngram)["words"]]
+        key = None
+        indexed = ngram != 1 or self.index is None or self.path is None or os.path.abspath(self.path) in self.index
+        if self.cache is not None:
+            key = self.cache.words_key(self.text, language, self.extra_stop_words, self.tokenizer, ngram)
+            top_words = self.cache.load_words(key, n)
+            if top_words is not None and indexed:
+                return top_words
+        ensure_nltk_resources()
+        if ngram != 1:
+            wordcount = Counter(iter_ngrams(self.text, language, ngram, self.extra_stop_words, self.tokenizer))
+        elif self.tokenizer == "nltk" and self.workers != 1 and len(self.text) > self.chunk_size:
+            wordcount = count_words_parallel(self.text, language, self.extra_stop_words, self.workers,
+                                             self.chunk_size)
+        else:
+            wordcount = count_words(self.text, language, self.extra_stop_words, self.tokenizer)
+        if ngram == 1:
+            self.index_counts(wordcount, language)
+        top_words = top_n(wordcount, n)
+        if key is not None:
+            self.cache.save_words(key, n, top_words)
+        return top_words
+
+    def find_top_n_in_file(self, file, language, n, progress=None, cancel=None, approximate=False, ngram=1):
+        """Find the n most popular words in file while it is read page by page, the whole text is never loaded.
+
+        :param file: File path.
+        :type: str
+        :param language: Language of the file.
+        :type: str
+        :param n: Number of words to find.
+        :type: int
+        :param progress: Function called with the number of done and all pages after each page.
+        :type: callable
+        :param cancel: Event which stops the analysis when it is set.
+        :type: threading.Event
+        :param approximate: Count in bounded memory, see find_top_n.
+        :type: bool
+        :param ngram: Number of words in counted n-grams.
+        :type: int
+        :raises text_reader.extractors.Cancelled: The cancel event was set.
+        :return: Pairs (word, count), the most popular first.
+        :rtype: list
+        """
+        self.path = file
+        return self.find_top_n_in_parts(iter_pages(file, progress, cancel, self.encoding), language, n, approximate,
+                                        ngram)
+
+    @timed("find_top_n_in_parts")
+    def find_top_n_in_parts(self, parts, language, n, approximate=False, ngram=1):
+        """Find the n most popular words in text given part by part, e.g. pages or text_reader.viewer.TextStore.
+
+        :param parts: Parts of the text.
+        :type: iterable
+        :param language: Language of the text.
+        :type: str
+        :param n: Number of words to find.
+        :type: int
+        :param approximate: Count in bounded memory, see find_top_n.
+        :type: bool
+        :param ngram: Number of words in counted n-grams.
+        :type: int
+        :return: Pairs (word, count), the most popular first.
+        :rtype: list
+        """
+        if approximate:
+            return [(word, count) for word, count, _ in self.find_heavy_hitters(parts, language, n, ngram)["words"]]
+        ensure_nltk_resources()
+        if ngram == 1:
+            wordcount = count_words_in_parts(parts, language, self.extra_stop_words, self.tokenizer)
+            self.index_counts(wordcount, language)
+            return top_n(wordcount, n)
+        wordcount = Counter()
+        for part in parts:
+            wordcount.update(iter_ngrams(part, language, ngram, self.extra_stop_words, self.tokenizer))
+        return top_n(wordcount, n)
+
+    def index_counts(self, wordcount, language):
+        """Put counted words of the file in path into index, the older version of the file is replaced.
+
+        Nothing is done without index or when the text doesn't come from a file.
+
+        :param wordcount: Number of occurrences of every word.
+        :type: collections.Counter
+        :param language: Language of the text.
+        :type: str
+        """
+        if self.index is not None and self.path is not None:
+            with metrics.stage("index.add", language=language) as stage:
+                self.index.add_counts(os.path.abspath(self.path), wordcount, language)
+                stage.count(tokens=len(wordcount))
+
+    @timed("find_heavy_hitters")
+    def find_heavy_hitters(self, parts, language, n, ngram=1):
+        """Find the n most popular words or n-grams with a fixed number of counters which fit in memory bytes.
 
-        wordcount = {key: 0 for key in all_words}
-        for word in all_words:
-            wordcount[word] += 1
+        The memory doesn't grow with the vocabulary, so it can be used for huge texts, many documents and n-grams.
+        Every word which is more often than total / counters is found.
 
-        ordered_wordcount = OrderedDict((key, value) for (key, value) in sorted(wordcount.items(), key=lambda x: x[1]))
+        :param parts: Parts of the text, e.g. [text], pages or texts of many documents.
+        :type: iterable
+        :param language: Language of the text.
+        :type: str
+        :param n: Number of words to find.
+        :type: int
+        :param ngram: Number of words in counted n-grams.
+        :type: int
+        :return: "words": tuples (word, count, error), the true count is between count - error and count;
+            "error_bound": the largest possible error, words which aren't found are at most so often;
+            "total": number of counted words; "counters": number of used counters.
+        :rtype: dict
+        """
+        ensure_nltk_resources()
+        sketch = SpaceSaving(capacity_for(self.memory))
+        for part in parts:
+            sketch.update_all(iter_ngrams(part, language, ngram, self.extra_stop_words, self.tokenizer))
+        return {"words": sketch.top(n), "error_bound": sketch.error_bound(), "total": sketch.total,
+                "counters": len(sketch)}
 
-        for item in list(reversed(ordered_wordcount))[:5]:
-            self.top_5.append(item)
+    def find_top_5_words(self, language, approximate=False, ngram=1):
+        """Find the 5 most popular words in text with of without stop words.
 
+        :param language: Language of the file.
+        :type: str
+        :param approximate: Count in bounded memory, see find_top_n.
+        :type: bool
+        :param ngram: Number of words in counted n-grams, e.g. 2 for pairs of words.
+        :type: int
+        :raises LookupError: No tokenizers installed.
+        :return: The 5 most popular words in text.
+        :rtype: list
+        """
+        del self.top_5[:]
+        self.top_5.extend(word for word, _ in self.find_top_n(language, 5, approximate, ngram))
         return self.top_5
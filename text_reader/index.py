@@ -0,0 +1,361 @@
+"""The module is responsible for the index of words of all analyzed documents.
+
+The index keeps in SQLite the number of documents with every word (document frequency), postings (word, document,
+count) for finding documents by word and the counts of every document as one compressed vector. Adding or replacing a
+document touches only the rows of its words, so it costs time proportional to the document, not to the index. Its words
+can then be weighted against all documents (TF-IDF or BM25) without reading any file again.
+
+Example:
+python -m text_reader.index distinctive report.pdf --top 10
+python -m text_reader.index containing lighthouse
+"""
+from array import array
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import zlib
+from functools import lru_cache
+from .storage import SQLITE_DIR
+from .words import count_words_in_parts
+
+INDEX_PATH = os.path.join(SQLITE_DIR, "index.db")
+SCORINGS = ("bm25", "tfidf")
+BM25_K1 = 1.2
+BM25_B = 0.75
+# SQLite allows 999 parameters in one statement in old versions.
+MAX_PARAMETERS = 900
+
+
+def pack_counts(pairs):
+    """Pack pairs (term id, count) into compressed bytes.
+
+    :param pairs: Pairs of integers.
+    :type: iterable
+    :rtype: bytes
+    """
+    numbers = array("I")
+    for term_id, count in pairs:
+        numbers.append(term_id)
+        numbers.append(count)
+    if sys.byteorder == "big":
+        numbers.byteswap()
+    return zlib.compress(numbers.tobytes())
+
+
+def unpack_counts(data):
+    """Unpack pairs made by pack_counts.
+
+    :param data: Compressed bytes.
+    :type: bytes
+    :return: Pairs (term id, count).
+    :rtype: list
+    """
+    numbers = array("I")
+    numbers.frombytes(zlib.decompress(data))
+    if sys.byteorder == "big":
+        numbers.byteswap()
+    return list(zip(numbers[::2], numbers[1::2]))
+
+
+def chunks(items, size=MAX_PARAMETERS):
+    """Split a list into parts which can be sent as parameters of one statement.
+
+    :param items: Items to split.
+    :type: list
+    :param size: Maximal number of items in a part.
+    :type: int
+    :rtype: generator
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class WordIndex:
+    """This class can be used for keeping counts of words of many documents and comparing the documents.
+    Example:
+    index = WordIndex("/tmp/index.db")
+    index.add("report.txt", text, "english")
+    index.distinctive_words("report.txt", 5)
+    index.documents_with_word("lighthouse")
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        """Constructor method.
+
+        :param path: Path of the index file, its directory is created if it doesn't exist.
+        :type: str
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        conn = self.connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, "
+                             "language TEXT NOT NULL, length INTEGER NOT NULL, counts BLOB NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, "
+                             "df INTEGER NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS postings (term_id INTEGER NOT NULL, doc_id INTEGER NOT NULL, "
+                             "count INTEGER NOT NULL, PRIMARY KEY (term_id, doc_id)) WITHOUT ROWID")
+        finally:
+            conn.close()
+
+    def connect(self):
+        """Connect with the index, every thread and process uses its own connection.
+
+        :return: SQLite connection.
+        :rtype: sqlite3.Connection
+        """
+        return sqlite3.connect(self.path, timeout=30)
+
+    def add(self, path, text, language, tokenizer="nltk"):
+        """Count words of the document without stop words and put them in the index.
+
+        :param path: Path of the document, it identifies the document in the index.
+        :type: str
+        :param text: Text of the document or its parts, e.g. pages.
+        :type: str or iterable
+        :param language: Language of the document.
+        :type: str
+        :param tokenizer: "nltk" or "regex", see text_reader.words.TOKENIZERS.
+        :type: str
+        :return: Id of the document.
+        :rtype: int
+        """
+        parts = [text] if isinstance(text, str) else text
+        return self.add_counts(path, count_words_in_parts(parts, language, tokenizer=tokenizer), language)
+
+    def add_counts(self, path, wordcount, language):
+        """Put counted words of the document in the index, an older version of the document is replaced.
+
+        :param path: Path of the document, it identifies the document in the index.
+        :type: str
+        :param wordcount: Number of occurrences of every word.
+        :type: collections.Counter
+        :param language: Language of the document.
+        :type: str
+        :return: Id of the document.
+        :rtype: int
+        """
+        words = [word for word, count in wordcount.items() if count > 0]
+        conn = self.connect()
+        try:
+            with conn:
+                self.remove_document(conn, path)
+                conn.executemany("INSERT INTO terms (term, df) VALUES (?, 1) "
+                                 "ON CONFLICT (term) DO UPDATE SET df = df + 1", ((word,) for word in words))
+                ids = self.term_ids(conn, words)
+                pairs = [(ids[word], wordcount[word]) for word in words]
+                cursor = conn.execute("INSERT INTO documents (path, language, length, counts) VALUES (?, ?, ?, ?)",
+                                      (path, language, sum(count for _, count in pairs), pack_counts(pairs)))
+                doc_id = cursor.lastrowid
+                conn.executemany("INSERT INTO postings (term_id, doc_id, count) VALUES (?, ?, ?)",
+                                 ((term_id, doc_id, count) for term_id, count in pairs))
+            return doc_id
+        finally:
+            conn.close()
+
+    @staticmethod
+    def term_ids(conn, words):
+        """Find ids of the words.
+
+        :param conn: SQLite connection.
+        :type: sqlite3.Connection
+        :param words: Words which are in the index.
+        :type: list
+        :return: Ids by words.
+        :rtype: dict
+        """
+        ids = {}
+        for part in chunks(words):
+            ids.update((term, term_id) for term_id, term in conn.execute(
+                "SELECT id, term FROM terms WHERE term IN ({})".format(",".join("?" * len(part))), part))
+        return ids
+
+    @staticmethod
+    def remove_document(conn, path):
+        """Remove the document and its words, words which are in no document are removed too.
+
+        :param conn: SQLite connection with an open transaction.
+        :type: sqlite3.Connection
+        :param path: Path of the document.
+        :type: str
+        :return: Information if the document was in the index.
+        :rtype: bool
+        """
+        row = conn.execute("SELECT id, counts FROM documents WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return False
+        doc_id, counts = row
+        term_ids = [(term_id,) for term_id, _ in unpack_counts(counts)]
+        conn.executemany("DELETE FROM postings WHERE term_id = ? AND doc_id = {}".format(int(doc_id)), term_ids)
+        conn.executemany("UPDATE terms SET df = df - 1 WHERE id = ?", term_ids)
+        conn.executemany("DELETE FROM terms WHERE id = ? AND df <= 0", term_ids)
+        conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+        return True
+
+    def remove(self, path):
+        """Remove the document from the index.
+
+        :param path: Path of the document.
+        :type: str
+        :return: Information if the document was in the index.
+        :rtype: bool
+        """
+        conn = self.connect()
+        try:
+            with conn:
+                return self.remove_document(conn, path)
+        finally:
+            conn.close()
+
+    def __contains__(self, path):
+        """Check if the document is in the index."""
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT 1 FROM documents WHERE path = ?", (path,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def __len__(self):
+        """Get the number of documents."""
+        return self.statistics()[0]
+
+    def statistics(self):
+        """Count documents and their words.
+
+        :return: Number of documents, their average length (number of words) and number of different words.
+        :rtype: tuple
+        """
+        conn = self.connect()
+        try:
+            documents, length = conn.execute("SELECT COUNT(*), COALESCE(AVG(length), 0) FROM documents").fetchone()
+            terms = conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+            return documents, length, terms
+        finally:
+            conn.close()
+
+    def documents_with_word(self, word, limit=None):
+        """Find documents which contain the word.
+
+        :param word: The word, it is lowercased like in the analysis.
+        :type: str
+        :param limit: Maximal number of documents, None means all.
+        :type: int
+        :return: Pairs (path, count), the most occurrences first.
+        :rtype: list
+        """
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT d.path, p.count FROM postings p JOIN documents d ON d.id = p.doc_id "
+                                "WHERE p.term_id = (SELECT id FROM terms WHERE term = ?) "
+                                "ORDER BY p.count DESC, d.path LIMIT ?", (word.lower(), -1 if limit is None else limit)
+                                ).fetchall()
+        finally:
+            conn.close()
+
+    def distinctive_words(self, path, n=5, scoring="bm25"):
+        """Find words which are typical for the document: often in it and rare in the other documents.
+
+        "tfidf": relative count * (ln((1 + documents) / (1 + df)) + 1).
+        "bm25": Okapi BM25 weight of the word with k1 = 1.2 and b = 0.75.
+
+        :param path: Path of the document.
+        :type: str
+        :param n: Number of words.
+        :type: int
+        :param scoring: "bm25" or "tfidf".
+        :type: str
+        :raises ValueError: Unknown scoring.
+        :raises KeyError: The document isn't in the index.
+        :return: Tuples (word, score, count), the highest score first.
+        :rtype: list
+        """
+        if scoring not in SCORINGS:
+            raise ValueError("Unknown scoring: {}".format(scoring))
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT length, counts FROM documents WHERE path = ?", (path,)).fetchone()
+            if row is None:
+                raise KeyError(path)
+            length, counts = row
+            documents, average = conn.execute("SELECT COUNT(*), AVG(length) FROM documents").fetchone()
+            counts = dict(unpack_counts(counts))
+            terms = []
+            for part in chunks(list(counts)):
+                terms.extend(conn.execute("SELECT id, term, df FROM terms WHERE id IN ({})".format(
+                    ",".join("?" * len(part))), part))
+        finally:
+            conn.close()
+        scores = []
+        for term_id, term, df in terms:
+            count = counts[term_id]
+            if scoring == "tfidf":
+                score = count / max(length, 1) * (math.log((1 + documents) / (1 + df)) + 1)
+            else:
+                idf = math.log(1 + (documents - df + 0.5) / (df + 0.5))
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / max(average, 1))
+                score = idf * count * (BM25_K1 + 1) / (count + norm)
+            scores.append((-score, -count, term))
+        scores.sort()
+        return [(term, -score, -count) for score, count, term in scores[:n]]
+
+
+@lru_cache(maxsize=None)
+def default_index():
+    """Open the index shared by the graphical interface and the batch mode.
+
+    :return: Index in INDEX_PATH or None if it is disabled with TEXT_READER_NO_INDEX or can't be created.
+    :rtype: WordIndex
+    """
+    if os.environ.get("TEXT_READER_NO_INDEX"):
+        return None
+    try:
+        return WordIndex(INDEX_PATH)
+    except (OSError, sqlite3.Error) as err:
+        print("Index disabled: {}".format(err))
+        return None
+
+
+def main(argv=None):
+    """Show distinctive words of a document or documents with a word.
+
+    :param argv: Command line arguments, sys.argv is used by default.
+    :type: list
+    :return: Exit code, 1 if the document isn't in the index.
+    :rtype: int
+    """
+    parser = argparse.ArgumentParser(prog="python -m text_reader.index",
+                                     description="Query the index of words of analyzed documents.")
+    parser.add_argument("--index", default=INDEX_PATH, help="path of the index (default: {})".format(INDEX_PATH))
+    commands = parser.add_subparsers(dest="command", required=True)
+    distinctive = commands.add_parser("distinctive", help="words typical for the document")
+    distinctive.add_argument("path")
+    distinctive.add_argument("-t", "--top", type=int, default=5)
+    distinctive.add_argument("--scoring", choices=SCORINGS, default="bm25")
+    containing = commands.add_parser("containing", help="documents with the word")
+    containing.add_argument("word")
+    containing.add_argument("-t", "--top", type=int, default=None)
+    commands.add_parser("stats", help="number of documents and words")
+    args = parser.parse_args(argv)
+
+    index = WordIndex(args.index)
+    if args.command == "distinctive":
+        try:
+            for word, score, count in index.distinctive_words(os.path.abspath(args.path), args.top, args.scoring):
+                print("{:<30}{:>10.4f}{:>10}".format(word, score, count))
+        except KeyError:
+            print("{} isn't in the index, analyze it with --index first".format(args.path), file=sys.stderr)
+            return 1
+    elif args.command == "containing":
+        for path, count in index.documents_with_word(args.word, args.top):
+            print("{:>10}  {}".format(count, path))
+    else:
+        print("{} documents, {:.0f} words per document, {} different words".format(*index.statistics()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""The module is responsible for running long operations of the graphical interface in the background.
+
+Jobs run in a bounded pool of threads and never touch Tk widgets. Their results, progress and errors are put in a queue
+which is read in the main thread (JobScheduler.attach polls it with window.after), so the callbacks can update widgets
+and show message boxes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
+from threading import Event
+from .extractors import Cancelled
+
+WORKERS = 2
+POLL_INTERVAL = 50
+
+
+class Job:
+    """This class can be used for following and stopping one background operation.
+    """
+
+    def __init__(self, scheduler, name, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """Constructor method.
+
+        :param scheduler: Scheduler which runs the job.
+        :type: JobScheduler
+        :param name: Name of the operation shown to the user.
+        :type: str
+        :param on_done: Function called in the main thread with the result.
+        :type: callable
+        :param on_error: Function called in the main thread with the exception.
+        :type: callable
+        :param on_progress: Function called in the main thread with the number of done and all parts.
+        :type: callable
+        :param on_cancel: Function called in the main thread when the job was stopped.
+        :type: callable
+        """
+        self.scheduler = scheduler
+        self.name = name
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self.cancel_event = Event()
+        self.future = None
+        self.done = 0
+        self.total = None
+
+    def progress(self, done, total):
+        """Report progress, it can be called from the job thread.
+
+        :param done: Number of done parts (pages, bytes, sentences).
+        :type: int
+        :param total: Number of all parts, None if it is unknown.
+        :type: int
+        """
+        self.scheduler.events.put(("progress", self, (done, total)))
+
+    def cancel(self):
+        """Stop the job, a running job stops at the next check of cancel_event."""
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self.scheduler.events.put(("cancel", self, None))
+
+    def is_cancelled(self):
+        """Check if the job was stopped.
+
+        :rtype: bool
+        """
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Stop the job if it was cancelled.
+
+        :raises text_reader.extractors.Cancelled: The job was cancelled.
+        """
+        if self.cancel_event.is_set():
+            raise Cancelled(self.name)
+
+
+class JobScheduler:
+    """This class can be used for running operations in a bounded pool of threads and for passing their results back to
+    the main thread.
+    Example:
+    jobs = JobScheduler()
+    jobs.attach(window)
+    jobs.submit("Loading file", lambda job, path: FilesManager().load_file(path, job.progress, job.cancel_event),
+                "report.pdf", on_done=show_text)
+    """
+
+    def __init__(self, workers=WORKERS):
+        """Constructor method.
+
+        :param workers: Number of jobs running at the same time, the other jobs wait.
+        :type: int
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.events = Queue()
+        self.jobs = []
+        self.on_change = None
+
+    def submit(self, name, function, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """Start the job, it must be called from the main thread.
+
+        :param name: Name of the operation shown to the user.
+        :type: str
+        :param function: Function which takes the job and args, it can report progress with job.progress and should
+            call job.check or pass job.cancel_event to the operations it uses.
+        :type: callable
+        :param on_done: Function called in the main thread with the result.
+        :type: callable
+        :param on_error: Function called in the main thread with the exception, the error is printed without it.
+        :type: callable
+        :param on_progress: Function called in the main thread with the number of done and all parts.
+        :type: callable
+        :param on_cancel: Function called in the main thread when the job was stopped.
+        :type: callable
+        :rtype: Job
+        """
+        job = Job(self, name, on_done, on_error, on_progress, on_cancel)
+        self.jobs.append(job)
+        job.future = self.executor.submit(self.run, job, function, args)
+        self.changed()
+        return job
+
+    def run(self, job, function, args):
+        """Run the job in a thread of the pool and put its result in the queue.
+
+        :param job: The job.
+        :type: Job
+        :param function: Function which takes the job and args.
+        :type: callable
+        :param args: Arguments of the function.
+        :type: tuple
+        """
+        try:
+            job.check()
+            result = function(job, *args)
+        except Cancelled:
+            self.events.put(("cancel", job, None))
+        except Exception as err:  # Errors of all kinds are shown to the user instead of killing the thread.
+            self.events.put(("error", job, err))
+        else:
+            self.events.put(("done", job, result))
+
+    def poll(self):
+        """Call the callbacks of the events which are in the queue, it must be called from the main thread.
+
+        :return: Number of handled events.
+        :rtype: int
+        """
+        handled = 0
+        while True:
+            try:
+                kind, job, value = self.events.get_nowait()
+            except Empty:
+                break
+            handled += 1
+            if kind == "progress":
+                job.done, job.total = value
+                if job.on_progress is not None:
+                    job.on_progress(*value)
+                continue
+            if job in self.jobs:
+                self.jobs.remove(job)
+            elif kind == "cancel":
+                # A job cancelled many times before it started is reported many times.
+                continue
+            if kind == "done" and job.on_done is not None:
+                job.on_done(value)
+            elif kind == "error":
+                if job.on_error is not None:
+                    job.on_error(value)
+                else:
+                    print("{} failed: {}".format(job.name, value))
+            elif kind == "cancel" and job.on_cancel is not None:
+                job.on_cancel()
+        if handled:
+            self.changed()
+        return handled
+
+    def changed(self):
+        """Tell the interface that jobs or their progress changed."""
+        if self.on_change is not None:
+            self.on_change()
+
+    def attach(self, widget, interval=POLL_INTERVAL):
+        """Poll the queue in the Tk event loop of the widget until the widget is destroyed.
+
+        :param widget: Tk window or widget.
+        :type: tkinter.Misc
+        :param interval: Time between checks in milliseconds.
+        :type: int
+        """
+        def loop():
+            self.poll()
+            widget.after(interval, loop)
+
+        widget.after(interval, loop)
+
+    def cancel_all(self):
+        """Stop all jobs."""
+        for job in list(self.jobs):
+            job.cancel()
+
+    def shutdown(self):
+        """Stop all jobs and the pool of threads."""
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,73 @@
+"""The module is responsible for loading heavy libraries on first use, so the application starts quickly."""
+import importlib
+import sys
+
+HEAVY_MODULES = ("nltk", "pdfminer", "textract", "gtts", "chardet", "docx2txt", "mysql")
+
+
+class LazyModule:
+    """This class can be used in place of an imported module, the module is imported when its attribute is used for
+    the first time. Submodules are imported too, e.g. lazy_import("pdfminer").converter.TextConverter.
+    """
+
+    def __init__(self, name):
+        """Constructor method.
+
+        :param name: Full name of the module, e.g. "nltk" or "pdfminer.high_level".
+        :type: str
+        """
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        """Import the module.
+
+        :raises ImportError: The library isn't installed.
+        :return: The module.
+        :rtype: module
+        """
+        if self._module is None:
+            try:
+                self.__dict__["_module"] = importlib.import_module(self._name)
+            except ImportError as err:
+                raise ImportError("{} is needed for this operation, install requirements.txt: {}".format(
+                    self._name, err)) from err
+        return self._module
+
+    def __getattr__(self, attribute):
+        """Get attribute of the module or its submodule."""
+        module = self._load()
+        try:
+            return getattr(module, attribute)
+        except AttributeError:
+            try:
+                return importlib.import_module("{}.{}".format(self._name, attribute))
+            except ImportError:
+                raise AttributeError("module {} has no attribute {}".format(self._name, attribute)) from None
+
+    def __setattr__(self, attribute, value):
+        """Set attribute of the module, e.g. in tests."""
+        setattr(self._load(), attribute, value)
+
+    def __repr__(self):
+        """Show if the module was imported."""
+        return "<lazy module {} ({})>".format(self._name, "loaded" if self._module is not None else "not loaded")
+
+
+def lazy_import(name):
+    """Get a module which is imported on first use.
+
+    :param name: Full name of the module.
+    :type: str
+    :rtype: LazyModule
+    """
+    return LazyModule(name)
+
+
+def loaded_heavy_modules():
+    """Check which heavy libraries were already imported.
+
+    :return: Names from HEAVY_MODULES.
+    :rtype: list
+    """
+    return [name for name in HEAVY_MODULES if name in sys.modules]
@@ -0,0 +1,168 @@
+"""The module is responsible for word statistics which are updated while the text is edited."""
+from collections import Counter
+import heapq
+import tkinter as tk
+from .words import get_stop_words, iter_tokens, iter_words
+
+DEBOUNCE = 300
+EDIT_OPERATIONS = ("insert", "delete", "replace")
+
+
+class LiveWordCount:
+    """This class can be used for counting words of a text which is edited line by line. Only changed lines are counted
+    again, so the cost of an edit depends on its size, not on the size of the text.
+    Example:
+    live = LiveWordCount("One house.\\nTwo houses.")
+    live.replace_lines(1, 1, ["Two houses and a house."])
+    live.top("english", 5)
+    """
+
+    def __init__(self, text=""):
+        """Constructor method.
+
+        :param text: Text at the beginning.
+        :type: str
+        """
+        self.lines = []
+        self.wordcount = Counter()
+        self.reset(text)
+
+    def reset(self, text):
+        """Count words of a new text.
+
+        :param text: The whole text.
+        :type: str
+        """
+        self.lines = [Counter()]
+        self.wordcount = Counter()
+        self.replace_lines(0, 1, text.split("\n"))
+
+    @classmethod
+    def count_parts(cls, parts):
+        """Count words of a text given in parts, e.g. pages of TextStore, it can run in a background thread.
+
+        :param parts: Parts of the text.
+        :type: iterable
+        :return: Number of occurrences of every word.
+        :rtype: collections.Counter
+        """
+        wordcount = Counter()
+        for part in parts:
+            wordcount.update(cls.count_line(part))
+        return wordcount
+
+    def reset_counts(self, wordcount):
+        """Use words counted by count_parts for a read-only text, its lines aren't kept.
+
+        :param wordcount: Number of occurrences of every word.
+        :type: collections.Counter
+        """
+        self.lines = [Counter()]
+        self.wordcount = wordcount
+
+    @staticmethod
+    def count_line(line):
+        """Count words in a line, stop words are counted too, they are skipped by top.
+
+        :param line: Text of the line.
+        :type: str
+        :rtype: collections.Counter
+        """
+        return Counter(iter_words(iter_tokens(line)))
+
+    def replace_lines(self, start, count, lines):
+        """Replace lines of the text with new lines.
+
+        :param start: Number of the first replaced line, from 0.
+        :type: int
+        :param count: Number of replaced lines.
+        :type: int
+        :param lines: Text of the new lines.
+        :type: list
+        """
+        for old in self.lines[start:start + count]:
+            self.wordcount.subtract(old)
+            for word in old:
+                if self.wordcount[word] <= 0:
+                    del self.wordcount[word]
+        new = [self.count_line(line) for line in lines]
+        self.lines[start:start + count] = new
+        for counted in new:
+            self.wordcount.update(counted)
+
+    def top(self, language, n, extra_stop_words=()):
+        """Find the n most popular words without stop words of the language.
+
+        :param language: Language of the text, "other" keeps stop words.
+        :type: str
+        :param n: Number of words to find.
+        :type: int
+        :param extra_stop_words: Words which should be skipped too.
+        :type: iterable
+        :return: Pairs (word, count), the most popular first.
+        :rtype: list
+        """
+        stop_words = get_stop_words(language, extra_stop_words)
+        words = ((index, pair) for index, pair in enumerate(self.wordcount.items()) if pair[0] not in stop_words)
+        return [pair for _, pair in heapq.nlargest(n, words, key=lambda item: (item[1][1], item[0]))]
+
+
+def _line(textbox, index):
+    """Get the line number of the index in the text widget.
+
+    :param textbox: Text widget.
+    :type: tkinter.Text
+    :param index: Tk text index, e.g. "insert" or "3.5".
+    :type: str
+    :return: Line number, from 1.
+    :rtype: int
+    """
+    return int(textbox.index(index).split(".")[0])
+
+
+def watch_edits(textbox, on_edit):
+    """Call a function after every insert, delete and replace in the text widget with the lines which were changed.
+
+    Tcl execution traces are used, so edits made by the user, by the program and by the clipboard are all seen and
+    errors of the widget (e.g. no selection) are raised as usual.
+
+    :param textbox: Text widget.
+    :type: tkinter.Text
+    :param on_edit: Function called with the number of the first changed line (from 0), the number of replaced lines
+        and the list of their new text.
+    :type: callable
+    """
+    pending = []
+
+    def enter(command, operation):
+        """Remember the lines which will be changed."""
+        del pending[:]
+        args = textbox.tk.splitlist(command)
+        if len(args) < 3 or args[1] not in EDIT_OPERATIONS:
+            return
+        try:
+            last_line = _line(textbox, "end-1c")
+            if args[1] == "insert":
+                indexes = [args[2]]
+            elif args[1] == "replace":
+                indexes = list(args[2:4])
+            else:
+                indexes = list(args[2:])
+                if len(indexes) % 2:
+                    indexes.append(indexes[-1] + "+1c")
+            lines = [min(_line(textbox, index), last_line) for index in indexes]
+        except tk.TclError:
+            return
+        pending.append((min(lines), max(lines), last_line))
+
+    def leave(command, code, result, operation):
+        """Give the changed lines to on_edit."""
+        if not pending or int(code) != 0:
+            return
+        first, last, last_line = pending.pop()
+        new_last = last + _line(textbox, "end-1c") - last_line
+        text = textbox.get("{}.0".format(first), "{}.end".format(new_last))
+        on_edit(first - 1, last - first + 1, text.split("\n"))
+
+    textbox.tk.call("trace", "add", "execution", textbox._w, "enter", textbox.register(enter))
+    textbox.tk.call("trace", "add", "execution", textbox._w, "leave", textbox.register(leave))
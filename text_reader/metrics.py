@@ -0,0 +1,462 @@
+"""The module is responsible for measuring the stages of reading, analysis, conversion and SQL operations.
+
+Measuring is switched off by default and then a stage costs one attribute check. When it is on, every finished stage
+records its time, processed bytes and tokens and, if memory is traced, the peak of Python allocations (tracemalloc).
+The peak is shared by the whole process, so while memory is traced only one thread at a time runs measured stages.
+The results can be written as JSON lines (one line per stage) or as a Prometheus text file.
+
+Example:
+from text_reader.metrics import metrics
+metrics.enable(trace_memory=True)
+FilesManager().load_file("report.pdf")
+print(metrics.status())
+metrics.write_prometheus("text_reader.prom")
+"""
+from collections import deque
+import functools
+import inspect
+import json
+import os
+from threading import Lock, local
+import time
+import tracemalloc
+
+MAX_EVENTS = 10000
+PREFIX = "text_reader_stage"
+PROMETHEUS_METRICS = (
+    ("calls_total", "calls", "counter", "Number of finished stages."),
+    ("seconds_total", "seconds", "counter", "Time spent in the stage."),
+    ("bytes_total", "bytes", "counter", "Bytes (characters of texts) processed by the stage."),
+    ("tokens_total", "tokens", "counter", "Tokens processed by the stage."),
+    ("errors_total", "errors", "counter", "Stages which ended with an error."),
+    ("peak_bytes", "peak_bytes", "gauge", "The biggest peak of Python allocations during the stage."),
+)
+
+
+class StageStats:
+    """This class can be used for summing up the finished runs of one stage.
+    """
+
+    def __init__(self):
+        """Constructor method."""
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.tokens = 0
+        self.errors = 0
+        self.peak_bytes = None
+
+    def add(self, event):
+        """Add a finished run.
+
+        :param event: Event made by Metrics.record.
+        :type: dict
+        """
+        self.calls += 1
+        self.seconds += event["seconds"]
+        self.bytes += event["bytes"]
+        self.tokens += event["tokens"]
+        self.errors += event["error"] is not None
+        if event["peak_bytes"] is not None:
+            self.peak_bytes = max(self.peak_bytes or 0, event["peak_bytes"])
+
+    def tokens_per_second(self):
+        """Get the speed of the stage.
+
+        :return: Tokens per second, 0 if the stage doesn't count tokens.
+        :rtype: float
+        """
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+
+class Stage:
+    """This class can be used for measuring one run of a stage, it is made by Metrics.stage.
+    """
+
+    def __init__(self, metrics, name, labels):
+        """Constructor method.
+
+        :param metrics: Registry of the results.
+        :type: Metrics
+        :param name: Name of the stage, e.g. "words.tokenize".
+        :type: str
+        :param labels: Additional information saved with the result, e.g. format of the file.
+        :type: dict
+        """
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.bytes = 0
+        self.tokens = 0
+        self.start = None
+        self.start_memory = 0
+        self.child_peak = 0
+        self.parent = None
+        self.locked = False
+
+    def count(self, nbytes=0, tokens=0):
+        """Add processed data.
+
+        :param nbytes: Number of bytes, or characters of a text.
+        :type: int
+        :param tokens: Number of tokens.
+        :type: int
+        """
+        self.bytes += nbytes
+        self.tokens += tokens
+
+    def __enter__(self):
+        """Start measuring."""
+        stack = self.metrics.stack()
+        self.parent = stack[-1] if stack else None
+        stack.append(self)
+        if tracemalloc.is_tracing():
+            if self.parent is None:
+                # Stages of other threads would reset the peak of this one.
+                self.metrics.memory_lock.acquire()
+                self.locked = True
+            # The peak is reset for every stage, so peaks of nested stages are given to the parent.
+            self.start_memory, peak = tracemalloc.get_traced_memory()
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, peak)
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop measuring and record the result."""
+        seconds = time.perf_counter() - self.start
+        peak = None
+        if tracemalloc.is_tracing():
+            absolute = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            if self.parent is not None:
+                self.parent.child_peak = max(self.parent.child_peak, absolute)
+            peak = max(absolute - self.start_memory, 0)
+        if self.locked:
+            self.metrics.memory_lock.release()
+            self.locked = False
+        stack = self.metrics.stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.metrics.record(self.name, seconds, self.bytes, self.tokens, peak,
+                            exc_type.__name__ if exc_type is not None else None, self.labels)
+
+
+class NullStage:
+    """This class can be used in place of Stage when measuring is switched off, it does nothing.
+    """
+
+    def count(self, nbytes=0, tokens=0):
+        """Ignore processed data."""
+
+    def __enter__(self):
+        """Do nothing."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Do nothing."""
+
+
+NULL_STAGE = NullStage()
+
+
+class Metrics:
+    """This class can be used for collecting results of the stages from all threads.
+    Example:
+    metrics = Metrics()
+    metrics.enable()
+    with metrics.stage("words.tokenize") as stage:
+        tokens = fast_tokens(text, "english")
+        stage.count(nbytes=len(text), tokens=len(tokens))
+    metrics.write_json_lines("stages.jsonl")
+    """
+
+    def __init__(self, max_events=MAX_EVENTS):
+        """Constructor method.
+
+        :param max_events: Number of the last results kept for status and JSON lines.
+        :type: int
+        """
+        self.enabled = False
+        self.trace_memory = False
+        self.started_tracing = False
+        self.lock = Lock()
+        self.memory_lock = Lock()
+        self.local = local()
+        self.stats = {}
+        self.events = deque(maxlen=max_events)
+        self.sequence = 0
+
+    def enable(self, trace_memory=False):
+        """Start measuring.
+
+        :param trace_memory: Measure peaks of memory with tracemalloc, it makes Python code about two times slower.
+        :type: bool
+        """
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        elif not trace_memory and self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        self.enabled = True
+
+    def disable(self):
+        """Stop measuring, the results are kept."""
+        self.enabled = False
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        self.trace_memory = False
+
+    def stage(self, name, **labels):
+        """Measure a stage in a with statement.
+
+        :param name: Name of the stage, e.g. "words.tokenize".
+        :type: str
+        :param labels: Additional information saved with the result.
+        :type: str
+        :return: Stage, or NULL_STAGE when measuring is switched off.
+        :rtype: Stage or NullStage
+        """
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, labels)
+
+    def stack(self):
+        """Get the stages running in the current thread.
+
+        :rtype: list
+        """
+        try:
+            return self.local.stack
+        except AttributeError:
+            self.local.stack = []
+            return self.local.stack
+
+    def record(self, name, seconds, nbytes=0, tokens=0, peak_bytes=None, error=None, labels=None):
+        """Save the result of a finished stage.
+
+        :param name: Name of the stage.
+        :type: str
+        :param seconds: Time of the stage.
+        :type: float
+        :param nbytes: Number of processed bytes, or characters of a text.
+        :type: int
+        :param tokens: Number of processed tokens.
+        :type: int
+        :param peak_bytes: Peak of Python allocations above the memory at the start, None if it wasn't traced.
+        :type: int
+        :param error: Name of the exception which ended the stage.
+        :type: str
+        :param labels: Additional information.
+        :type: dict
+        """
+        event = {"time": time.time(), "stage": name, "seconds": seconds, "bytes": nbytes, "tokens": tokens,
+                 "tokens_per_second": tokens / seconds if tokens and seconds else 0.0, "peak_bytes": peak_bytes,
+                 "error": error}
+        event.update(labels or {})
+        with self.lock:
+            self.sequence += 1
+            event["sequence"] = self.sequence
+            self.events.append(event)
+            self.stats.setdefault(name, StageStats()).add(event)
+
+    def reset(self):
+        """Remove all results."""
+        with self.lock:
+            self.stats = {}
+            self.events.clear()
+
+    def mark(self):
+        """Get the number of the last result, results after it can be read with since.
+
+        :rtype: int
+        """
+        return self.sequence
+
+    def snapshot(self, since=None):
+        """Sum up the results of every stage.
+
+        :param since: Only results after this mark, all results if it is None.
+        :type: int
+        :return: StageStats by names of the stages.
+        :rtype: dict
+        """
+        with self.lock:
+            if since is None:
+                return dict(self.stats)
+            stats = {}
+            for event in self.events:
+                if event["sequence"] > since:
+                    stats.setdefault(event["stage"], StageStats()).add(event)
+            return stats
+
+    def status(self, since=None, n=3):
+        """Describe the slowest stages in one line, e.g. for a status bar.
+
+        :param since: Only results after this mark, all results if it is None.
+        :type: int
+        :param n: Number of stages.
+        :type: int
+        :rtype: str
+        """
+        stats = sorted(self.snapshot(since).items(), key=lambda item: item[1].seconds, reverse=True)
+        parts = []
+        for name, stage in stats[:n]:
+            part = "{} {:.2f} s".format(name, stage.seconds)
+            if stage.tokens:
+                part += " {:.0f} tok/s".format(stage.tokens_per_second())
+            if stage.peak_bytes is not None:
+                part += " {:.1f} MB".format(stage.peak_bytes / 2 ** 20)
+            parts.append(part)
+        return " | ".join(parts)
+
+    def write_json_lines(self, path, since=None):
+        """Append the results to a JSON lines file, one result per line.
+
+        :param path: File path.
+        :type: str
+        :param since: Only results after this mark, all kept results if it is None.
+        :type: int
+        :return: Number of written lines.
+        :rtype: int
+        """
+        with self.lock:
+            events = [event for event in self.events if since is None or event["sequence"] > since]
+        with open(path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        return len(events)
+
+    def prometheus(self):
+        """Describe the sums of all results in the Prometheus text format.
+
+        :rtype: str
+        """
+        stats = sorted(self.snapshot().items())
+        lines = []
+        for suffix, attribute, kind, description in PROMETHEUS_METRICS:
+            values = [(name, getattr(stage, attribute)) for name, stage in stats
+                      if getattr(stage, attribute) is not None]
+            if not values:
+                continue
+            lines.append("# HELP {}_{} {}".format(PREFIX, suffix, description))
+            lines.append("# TYPE {}_{} {}".format(PREFIX, suffix, kind))
+            for name, value in values:
+                lines.append('{}_{}{{stage="{}"}} {}'.format(PREFIX, suffix, name.replace('"', '\\"'), value))
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the sums of all results to a Prometheus text file, e.g. for the textfile collector of node exporter.
+
+        The file is replaced at once, so the collector never reads half of it.
+
+        :param path: File path, it should end with .prom.
+        :type: str
+        """
+        temporary = path + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(temporary, path)
+
+
+metrics = Metrics()
+
+
+def timed(name):
+    """Measure every call of the function as a stage of the shared metrics, see timed_iteration for generators.
+
+    :param name: Name of the stage.
+    :type: str
+    :return: Decorator.
+    :rtype: callable
+    """
+    def decorator(function):
+        if inspect.isgeneratorfunction(function):
+            @functools.wraps(function)
+            def generator_wrapper(*args, **kwargs):
+                if not metrics.enabled:
+                    return function(*args, **kwargs)
+                return timed_iteration(name, function(*args, **kwargs))
+            return generator_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            with metrics.stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_iteration(name, iterator):
+    """Measure the time spent in making the items of the iterator, e.g. rows read from a database, the time of the
+    consumer between the items isn't counted. The stage is recorded with the number of items when the iteration ends.
+
+    :param name: Name of the stage.
+    :type: str
+    :param iterator: Measured iterator, it is closed when the iteration ends.
+    :type: iterator
+    :return: Items of the iterator.
+    :rtype: generator
+    """
+    seconds = 0.0
+    items = 0
+    error = None
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            except Exception as err:
+                error = type(err).__name__
+                raise
+            finally:
+                seconds += time.perf_counter() - start
+            items += 1
+            yield item
+    finally:
+        if hasattr(iterator, "close"):
+            iterator.close()
+        metrics.record(name, seconds, error=error, labels={"items": items})
+
+
+class IterationTimer:
+    """This class can be used for measuring one step of a pipeline of generators, the time spent in making the items
+    of the wrapped iterator (including the steps before it) is summed up, so the steps keep streaming while they are
+    measured.
+    Example:
+    tokens = IterationTimer(iter_tokens(text))
+    words = IterationTimer(iter_words(tokens, stop_words))
+    wordcount = Counter(words)
+    filtering_seconds = words.seconds - tokens.seconds
+    """
+
+    def __init__(self, iterator):
+        """Constructor method.
+
+        :param iterator: Measured iterator.
+        :type: iterable
+        """
+        self.iterator = iter(iterator)
+        self.seconds = 0.0
+        self.items = 0
+
+    def __iter__(self):
+        """Return the timer itself, it is its own iterator."""
+        return self
+
+    def __next__(self):
+        """Make the next item of the wrapped iterator and measure it."""
+        start = time.perf_counter()
+        try:
+            item = next(self.iterator)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.items += 1
+        return item
@@ -0,0 +1,120 @@
+"""The module is responsible for finding the most popular words in bounded memory.
+
+An exact Counter keeps every word of the text, so its size grows with the vocabulary: with n-grams, OCR noise or many
+documents it can be bigger than the text. SpaceSaving keeps a fixed number of counters instead and its counts have
+known error bounds (Metwally, Agrawal, El Abbadi: Efficient Computation of Frequent and Top-k Elements in Data
+Streams, 2005).
+"""
+import heapq
+
+MEMORY = 16 * 1024 * 1024
+# Memory of one counter measured with tracemalloc (peak while dictionaries grow): the word, two dictionary entries
+# and the heap entry.
+COUNTER_BYTES = 256
+MIN_CAPACITY = 16
+
+
+def capacity_for(memory):
+    """Find the number of counters which fit in the memory.
+
+    :param memory: Memory budget in bytes.
+    :type: int
+    :rtype: int
+    """
+    return max(memory // COUNTER_BYTES, MIN_CAPACITY)
+
+
+class SpaceSaving:
+    """This class can be used for counting the most popular items of a stream with a fixed number of counters.
+
+    When all counters are used, a new item takes the counter of the least counted item and starts from its count, so
+    counts are never too small: the true count of an item is between count - error and count. Every item which is more
+    often than total / capacity has a counter.
+    Example:
+    sketch = SpaceSaving(capacity_for(MEMORY))
+    sketch.update_all(iter_ngrams(text, "english", 2))
+    sketch.top(5)
+    sketch.error_bound()
+    """
+
+    def __init__(self, capacity):
+        """Constructor method.
+
+        :param capacity: Number of counters.
+        :type: int
+        """
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        # Min-heap of (count, item), one entry per counter. Counts only grow, so an entry with an old count is
+        # fixed when it comes to the top.
+        self.heap = []
+        self.total = 0
+
+    def update(self, item, weight=1):
+        """Count an item.
+
+        :param item: Counted item, e.g. a word.
+        :type: str
+        :param weight: Number of occurrences.
+        :type: int
+        """
+        self.total += weight
+        count = self.counts.get(item)
+        if count is not None:
+            self.counts[item] = count + weight
+            return
+        error = 0
+        if len(self.counts) >= self.capacity:
+            error, victim = self.pop_minimum()
+            del self.counts[victim]
+            del self.errors[victim]
+        self.counts[item] = error + weight
+        self.errors[item] = error
+        heapq.heappush(self.heap, (error + weight, item))
+
+    def update_all(self, items):
+        """Count every item once.
+
+        :param items: Counted items.
+        :type: iterable
+        """
+        for item in items:
+            self.update(item)
+
+    def pop_minimum(self):
+        """Remove the heap entry of the least counted item.
+
+        :return: Count and the item.
+        :rtype: tuple
+        """
+        while True:
+            count, item = heapq.heappop(self.heap)
+            current = self.counts[item]
+            if current == count:
+                return count, item
+            heapq.heappush(self.heap, (current, item))
+
+    def error_bound(self):
+        """Get the largest possible error of a count, it is also the largest possible count of items without a counter.
+
+        :rtype: int
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def top(self, n):
+        """Select the n most counted items, ties are broken like in text_reader.words.top_n.
+
+        :param n: Number of items.
+        :type: int
+        :return: Tuples (item, count, error), the true count is between count - error and count.
+        :rtype: list
+        """
+        items = heapq.nlargest(n, enumerate(self.counts.items()), key=lambda pair: (pair[1][1], pair[0]))
+        return [(item, count, self.errors[item]) for _, (item, count) in items]
+
+    def __len__(self):
+        """Get the number of used counters."""
+        return len(self.counts)
@@ -0,0 +1,243 @@
+"""The module is responsible for the conversion of text to speech."""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import time
+from .extractors import Cancelled
+from .lazy import lazy_import
+from .metrics import metrics
+from .words import iter_sentences
+
+gtts = lazy_import("gtts")
+
+WORKERS = 4
+RETRIES = 3
+BACKOFF = 1.0
+# One silent MPEG-1 Layer III frame: 128 kbit/s, 44.1 kHz, about 26 ms.
+SILENT_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+class SpeechBackend:
+    """This class is the interface of the engines which convert text to audio.
+    """
+    name = "backend"
+    max_chars = 5000
+
+    def settings(self):
+        """Describe the voice settings, audio of the same text with the same settings is the same.
+
+        :return: Settings of the voice.
+        :rtype: str
+        """
+        return ""
+
+    def synthesize(self, text, language):
+        """Convert text to MP3 audio.
+
+        :param text: Text not longer than max_chars.
+        :type: str
+        :param language: Language code, e.g. "en".
+        :type: str
+        :return: MP3 audio.
+        :rtype: bytes
+        """
+        raise NotImplementedError
+
+
+class GTTSBackend(SpeechBackend):
+    """This class can be used to convert text to audio with Google Translate text-to-speech.
+    """
+    name = "gtts"
+
+    def __init__(self, slow=False):
+        """Constructor method.
+
+        :param slow: Read the text slowly.
+        :type: bool
+        """
+        self.slow = slow
+
+    def settings(self):
+        """Describe the voice settings.
+
+        :return: Settings of the voice.
+        :rtype: str
+        """
+        return "slow" if self.slow else "normal"
+
+    def synthesize(self, text, language):
+        """Convert text to MP3 audio.
+
+        :param text: Text not longer than max_chars.
+        :type: str
+        :param language: Language code, e.g. "en".
+        :type: str
+        :raises gtts.tts.gTTSError: Error with the connection or the language.
+        :return: MP3 audio.
+        :rtype: bytes
+        """
+        audio = BytesIO()
+        gtts.gTTS(text=text, lang=language, slow=self.slow).write_to_fp(audio)
+        return audio.getvalue()
+
+
+class SilentBackend(SpeechBackend):
+    """This class can be used as an offline engine in tests and on computers without internet. It creates silent MP3
+    audio, about 0.3 s per word.
+    """
+    name = "silent"
+
+    def synthesize(self, text, language):
+        """Convert text to silent MP3 audio.
+
+        :param text: Text not longer than max_chars.
+        :type: str
+        :param language: Language code, not used.
+        :type: str
+        :return: MP3 audio.
+        :rtype: bytes
+        """
+        return SILENT_FRAME * (12 * max(len(text.split()), 1))
+
+
+def split_sentences(text, max_chars):
+    """Split text into sentences, sentences longer than max_chars are split at spaces.
+
+    :param text: Text to split or its parts (e.g. text_reader.viewer.TextStore), sentences don't cross the parts.
+    :type: str or iterable
+    :param max_chars: Maximal number of characters in a part.
+    :type: int
+    :return: Sentences or their parts.
+    :rtype: generator
+    """
+    for text_part in [text] if isinstance(text, str) else text:
+        for sentence in iter_sentences(text_part):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars + 1)
+                cut = cut if cut > 0 else max_chars
+                yield sentence[:cut]
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                yield sentence
+
+
+def split_text(text, max_chars):
+    """Split text into parts made of whole sentences, sentences longer than max_chars are split at spaces.
+
+    :param text: Text to split or its parts (e.g. text_reader.viewer.TextStore).
+    :type: str or iterable
+    :param max_chars: Maximal number of characters in a part.
+    :type: int
+    :return: Parts of the text.
+    :rtype: generator
+    """
+    part = ""
+    for sentence in split_sentences(text, max_chars):
+        if part and len(part) + len(sentence) + 1 > max_chars:
+            yield part
+            part = ""
+        part = part + " " + sentence if part else sentence
+    if part:
+        yield part
+
+
+def synthesize(backend, text, language, retries=RETRIES, backoff=BACKOFF, cache=None):
+    """Convert a part of text to audio, failed attempts are repeated after growing pauses.
+
+    :param backend: Text-to-speech engine.
+    :type: SpeechBackend
+    :param text: Part of the text.
+    :type: str
+    :param language: Language code, e.g. "en".
+    :type: str
+    :param retries: Number of repeated attempts.
+    :type: int
+    :param backoff: Pause in seconds before the first repeated attempt, it doubles after each one.
+    :type: float
+    :param cache: Cache of the audio, the engine is used only if the part isn't there.
+    :type: text_reader.cache.FileCache
+    :return: MP3 audio.
+    :rtype: bytes
+    """
+    key = None
+    if cache is not None:
+        key = cache.audio_key(text, language, backend)
+        audio = cache.get(key)
+        if audio is not None:
+            return audio
+    with metrics.stage("speech.synthesize", backend=backend.name) as stage:
+        for attempt in range(retries + 1):
+            try:
+                audio = backend.synthesize(text, language)
+                break
+            except Exception:  # Engines raise their own errors, e.g. gTTSError or requests errors.
+                if attempt == retries:
+                    raise
+                time.sleep(backoff * 2 ** attempt)
+        stage.count(nbytes=len(audio))
+    if key is not None:
+        cache.set(key, audio)
+    return audio
+
+
+def convert_text_to_mp3(text, language, filename, backend=None, workers=WORKERS, retries=RETRIES, backoff=BACKOFF,
+                        cache=None, progress=None, cancel=None):
+    """Convert text to MP3 file, parts of the text are converted concurrently and written in order.
+
+    With the cache every sentence is converted separately, so after an edit only new or changed sentences go to the
+    engine and the rest of the audio is taken from the cache.
+
+    :param text: Text to convert or its parts (e.g. text_reader.viewer.TextStore).
+    :type: str or iterable
+    :param language: Language code, e.g. "en".
+    :type: str
+    :param filename: Path of the MP3 file.
+    :type: str
+    :param backend: Text-to-speech engine, GTTSBackend by default.
+    :type: SpeechBackend
+    :param workers: Number of parts converted at the same time.
+    :type: int
+    :param retries: Number of repeated attempts for each part.
+    :type: int
+    :param backoff: Pause in seconds before the first repeated attempt.
+    :type: float
+    :param cache: Cache of the audio of sentences.
+    :type: text_reader.cache.FileCache
+    :param progress: Function called with the number of written and all parts after each part.
+    :type: callable
+    :param cancel: Event which stops the conversion when it is set, the file is left incomplete.
+    :type: threading.Event
+    :raises text_reader.extractors.Cancelled: The cancel event was set.
+    :return: Number of converted parts.
+    :rtype: int
+    """
+    backend = backend or GTTSBackend()
+    if cache is None:
+        parts = list(split_text(text, backend.max_chars))
+    else:
+        parts = list(split_sentences(text, backend.max_chars))
+    written = 0
+    with open(filename, "wb") as output, ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for part in parts:
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled(filename)
+                pending.append(executor.submit(synthesize, backend, part, language, retries, backoff, cache))
+                while pending and (pending[0].done() or len(pending) > 2 * workers):
+                    output.write(pending.popleft().result())
+                    written += 1
+                    if progress is not None:
+                        progress(written, len(parts))
+            while pending:
+                if cancel is not None and cancel.is_set():
+                    raise Cancelled(filename)
+                output.write(pending.popleft().result())
+                written += 1
+                if progress is not None:
+                    progress(written, len(parts))
+        except Cancelled:
+            for future in pending:
+                future.cancel()
+            raise
+    return written
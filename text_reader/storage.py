@@ -0,0 +1,353 @@
+"""The module is responsible for the engines which store data of SQL databases."""
+import os
+import sqlite3
+from threading import Lock
+import time
+
+try:
+    import text_reader.databaseconfig as cfg
+except ImportError:
+    cfg = None
+
+POOL_SIZE = 5
+HEALTH_CHECK_INTERVAL = 60
+SQLITE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "text_reader")
+
+
+def quote_identifier(name):
+    """Quote name of a database or table, so it can't break the SQL statement.
+
+    :param name: Name of the database or table.
+    :type: str
+    :return: Quoted name.
+    :rtype: str
+    """
+    return "`{}`".format(name.replace("`", "``"))
+
+
+class MySQLBackend:
+    """This class can be used to store data in MySQL server, connections are taken from pools, one pool per database.
+    """
+    name = "mysql"
+    auto_id = "int NOT NULL AUTO_INCREMENT PRIMARY KEY"
+
+    def __init__(self, config, pool_size=POOL_SIZE):
+        """Constructor method.
+
+        :param config: Arguments of mysql.connector.connect, e.g. host, user and passwd.
+        :type: dict
+        :param pool_size: Number of connections kept in each pool.
+        :type: int
+        """
+        import mysql.connector
+        import mysql.connector.pooling
+        self.mysql = mysql.connector
+        self.Error = mysql.connector.Error
+        self.DatabaseError = mysql.connector.errors.DatabaseError
+        self.ProgrammingError = mysql.connector.errors.ProgrammingError
+        self.config = config
+        self.pool_size = pool_size
+        self.pools = {}
+        self.pools_lock = Lock()
+
+    def get_pool(self, database=None):
+        """Get the pool of connections to the database, it is created on first use.
+
+        :param database: Name of the database used by the connections, None means no database.
+        :type: str
+        :raises mysql.connector.errors.ProgrammingError: Unknown database.
+        :return: Pool and the time when it was used last.
+        :rtype: list
+        """
+        with self.pools_lock:
+            if database not in self.pools:
+                config = dict(self.config)
+                if database is not None:
+                    config["database"] = database
+                pool = self.mysql.pooling.MySQLConnectionPool(
+                    pool_name="text_reader_{}_{}".format(id(self), len(self.pools)), pool_size=self.pool_size,
+                    pool_reset_session=False, **config)
+                self.pools[database] = [pool, time.monotonic()]
+            return self.pools[database]
+
+    def connect(self, database=None):
+        """Connect with database, the connection is taken from the pool and checked if it wasn't used for a while.
+
+        :param database: Name of the database used by the connection, None means no database.
+        :type: str
+        :raises mysql.connector.errors.ProgrammingError: Unknown database.
+        :return: Connector and cursor.
+        :rtype: mysql.connector.pooling.PooledMySQLConnection, mysql.connector.cursor.MySQLCursor
+        """
+        entry = self.get_pool(database)
+        try:
+            conn = entry[0].get_connection()
+            if time.monotonic() - entry[1] > HEALTH_CHECK_INTERVAL:
+                conn.ping(reconnect=True, attempts=2, delay=1)
+        except self.mysql.errors.PoolError:
+            # All connections are busy, this one won't be kept.
+            config = dict(self.config)
+            if database is not None:
+                config["database"] = database
+            conn = self.mysql.connect(**config)
+        entry[1] = time.monotonic()
+        cursor = conn.cursor()
+        return conn, cursor
+
+    @staticmethod
+    def sql(statement):
+        """Adapt SQL statement to the engine.
+
+        :param statement: Statement with %s parameters.
+        :type: str
+        :return: Statement.
+        :rtype: str
+        """
+        return statement
+
+    @staticmethod
+    def begin(conn):
+        """Start transaction.
+
+        :param conn: MySQL connector.
+        :type conn: mysql.connector.pooling.PooledMySQLConnection
+        """
+        conn.start_transaction()
+
+    @staticmethod
+    def finish_reading(conn):
+        """Drop rows which weren't read, so the connection can go back to the pool.
+
+        :param conn: MySQL connector.
+        :type conn: mysql.connector.pooling.PooledMySQLConnection
+        """
+        conn.consume_results()
+
+    def create_database(self, name):
+        """Create new database.
+
+        :param name: Name of the database.
+        :type: str
+        :raises mysql.connector.errors.DatabaseError: Database already exists.
+        """
+        conn, cursor = self.connect()
+        try:
+            cursor.execute("CREATE DATABASE {} DEFAULT CHARACTER SET 'utf8'".format(quote_identifier(name)))
+        finally:
+            cursor.close()
+            conn.close()
+
+    def list_databases(self):
+        """Show all databases.
+
+        :return: Names of databases.
+        :rtype: list
+        """
+        conn, cursor = self.connect()
+        try:
+            cursor.execute("SHOW DATABASES")
+            return [db[0] for db in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def list_tables(self, database):
+        """Show all table names in the database.
+
+        :param database: Name of the database.
+        :type: str
+        :raises mysql.connector.errors.ProgrammingError: Unknown database.
+        :return: Names of the tables.
+        :rtype: list
+        """
+        conn, cursor = self.connect()
+        try:
+            cursor.execute("SHOW TABLES FROM {}".format(quote_identifier(database)))
+            return [table[0] for table in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def word_tables():
+        """Statements which create normalized tables of documents and words.
+
+        :return: CREATE statements.
+        :rtype: list
+        """
+        return ["CREATE TABLE IF NOT EXISTS documents (\
+                    id int NOT NULL AUTO_INCREMENT PRIMARY KEY,\
+                    path varchar(1024) NOT NULL,\
+                    hash char(64),\
+                    language varchar(32) NOT NULL,\
+                    analyzed_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,\
+                    INDEX documents_hash (hash));",
+                "CREATE TABLE IF NOT EXISTS document_words (\
+                    doc_id int NOT NULL,\
+                    word varchar(250) NOT NULL,\
+                    `rank` smallint NOT NULL,\
+                    count int NOT NULL,\
+                    PRIMARY KEY (doc_id, `rank`),\
+                    INDEX document_words_word (word, doc_id),\
+                    FOREIGN KEY (doc_id) REFERENCES documents (id) ON DELETE CASCADE);"]
+
+
+class SQLiteBackend:
+    """This class can be used to store data in SQLite files, one file per database, without a server.
+    """
+    name = "sqlite"
+    auto_id = "INTEGER PRIMARY KEY AUTOINCREMENT"
+    Error = sqlite3.Error
+    DatabaseError = sqlite3.DatabaseError
+    ProgrammingError = sqlite3.OperationalError
+
+    def __init__(self, directory=SQLITE_DIR):
+        """Constructor method.
+
+        :param directory: Directory of the database files, it is created with the first database.
+        :type: str
+        """
+        self.directory = directory
+
+    def path(self, database):
+        """Find the file of the database.
+
+        :param database: Name of the database.
+        :type: str
+        :raises sqlite3.OperationalError: Wrong name of the database.
+        :return: File path.
+        :rtype: str
+        """
+        if not database or database.startswith(".") or os.sep in database or "/" in database:
+            raise sqlite3.OperationalError("Wrong database name: {}".format(database))
+        return os.path.join(self.directory, database + ".sqlite3")
+
+    def connect(self, database=None):
+        """Connect with database file in WAL mode, transactions are started with begin.
+
+        :param database: Name of the database, None means in-memory database.
+        :type: str
+        :raises sqlite3.OperationalError: Unknown database.
+        :return: Connector and cursor.
+        :rtype: sqlite3.Connection, sqlite3.Cursor
+        """
+        if database is None:
+            path = ":memory:"
+        else:
+            path = self.path(database)
+            if not os.path.exists(path):
+                raise sqlite3.OperationalError("Unknown database: {}".format(database))
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn, conn.cursor()
+
+    @staticmethod
+    def sql(statement):
+        """Adapt SQL statement to the engine.
+
+        :param statement: Statement with %s parameters.
+        :type: str
+        :return: Statement with ? parameters.
+        :rtype: str
+        """
+        return statement.replace("%s", "?")
+
+    @staticmethod
+    def begin(conn):
+        """Start transaction.
+
+        :param conn: SQLite connector.
+        :type conn: sqlite3.Connection
+        """
+        conn.execute("BEGIN")
+
+    @staticmethod
+    def finish_reading(conn):
+        """Nothing to do, SQLite connections aren't shared.
+
+        :param conn: SQLite connector.
+        :type conn: sqlite3.Connection
+        """
+
+    def create_database(self, name):
+        """Create new database file.
+
+        :param name: Name of the database.
+        :type: str
+        :raises sqlite3.DatabaseError: Database already exists.
+        """
+        path = self.path(name)
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(path):
+            raise sqlite3.DatabaseError("Can't create database '{}'; database exists".format(name))
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+
+    def list_databases(self):
+        """Show all databases.
+
+        :return: Names of databases.
+        :rtype: list
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-len(".sqlite3")] for name in os.listdir(self.directory) if name.endswith(".sqlite3"))
+
+    def list_tables(self, database):
+        """Show all table names in the database.
+
+        :param database: Name of the database.
+        :type: str
+        :raises sqlite3.OperationalError: Unknown database.
+        :return: Names of the tables.
+        :rtype: list
+        """
+        conn, cursor = self.connect(database)
+        try:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+                           "ORDER BY name")
+            return [table[0] for table in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def word_tables():
+        """Statements which create normalized tables of documents and words.
+
+        :return: CREATE statements.
+        :rtype: list
+        """
+        return ["CREATE TABLE IF NOT EXISTS documents (\
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,\
+                    path varchar(1024) NOT NULL,\
+                    hash char(64),\
+                    language varchar(32) NOT NULL,\
+                    analyzed_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP);",
+                "CREATE INDEX IF NOT EXISTS documents_hash ON documents (hash);",
+                "CREATE TABLE IF NOT EXISTS document_words (\
+                    doc_id int NOT NULL REFERENCES documents (id) ON DELETE CASCADE,\
+                    word varchar(250) NOT NULL,\
+                    `rank` smallint NOT NULL,\
+                    count int NOT NULL,\
+                    PRIMARY KEY (doc_id, `rank`));",
+                "CREATE INDEX IF NOT EXISTS document_words_word ON document_words (word, doc_id);"]
+
+
+def load_backend():
+    """Choose the engine set in databaseconfig: backend = "mysql" (default if mysql_connect is set) or "sqlite".
+
+    Without databaseconfig the data is stored in SQLite files in SQLITE_DIR.
+
+    :return: Storage engine.
+    :rtype: MySQLBackend or SQLiteBackend
+    """
+    default = "mysql" if hasattr(cfg, "mysql_connect") else "sqlite"
+    if getattr(cfg, "backend", default) == "mysql":
+        return MySQLBackend(cfg.mysql_connect, getattr(cfg, "pool_size", POOL_SIZE))
+    return SQLiteBackend(getattr(cfg, "sqlite_directory", SQLITE_DIR))
@@ -1,18 +1,28 @@
 """The module is responsible for the graphical interface of all windows in application."""
 import math
+import os
 import tkinter as tk
 from tkinter import ttk, scrolledtext, Menu
 from tkinter import messagebox as msg
-from tkinter.filedialog import asksaveasfile, askopenfile
-from threading import Thread
+from tkinter.filedialog import asksaveasfile, asksaveasfilename, askopenfilename
+from .extractors import iter_pages
 from .files import FilesManager
-from .database import SQLDatabase
+from .index import default_index
+from .jobs import POLL_INTERVAL, JobScheduler
 from .languages import languages
+from .lazy import lazy_import
+from .live import DEBOUNCE, LiveWordCount, watch_edits
+from .metrics import metrics
 from .tips import create_tip
+from .viewer import LARGE_TEXT_SIZE, LargeTextView, TextStore
+from .words import ensure_nltk_resources
 
 MAIN_FONT = ("courier new", 12)
 FONT_5_WORDS = ("courier new", 14, "bold")
 
+# The SQL layer (and MySQL connector) is loaded when the save window is opened.
+sql = lazy_import("text_reader.database")
+
 
 class TextReaderInterface:
     """This class can be used to convert text from files (*.txt , *.pdf, *.docx) to audio file (*.mp3) and to find 5
@@ -24,16 +34,24 @@ class TextReaderInterface:
         self.window = tk.Tk()
         self.style = ttk.Style()
         self.file = FilesManager()
+        self.file.index = default_index()
+        self.jobs = JobScheduler()
+        self.jobs.on_change = self.show_jobs
+        self.jobs.attach(self.window)
 
         self.window.title("Text Reader")
-        self.window.geometry("610x540")
+        self.window.geometry("610x595")
         self.window.resizable(False, False)
         self.window.iconbitmap('text_reader/favicon.ico')
 
         self.text = None
+        self.view = None
+        self.live = LiveWordCount()
+        self.live_after = None
+        self.metrics_mark = 0
+        self.busy = False
         self.file_path = None
         self.words = []
-        self.language = "english"
 
         # Styles
         self.style.configure('TFrame', background='#DEEEEA')
@@ -51,8 +69,9 @@ class TextReaderInterface:
 
         # File items in menu bar
         self.file_menu = Menu(self.menu_bar, tearoff=0)
-        self.file_menu.add_command(label="Open", command=self.open_thread)
+        self.file_menu.add_command(label="Open", command=self.open_file)
         self.file_menu.add_command(label="Save", command=self.save_text)
+        self.file_menu.add_command(label="Distinctive words", command=self.distinctive_words)
         self.file_menu.add_separator()
         self.file_menu.add_command(label="Exit", command=self.quit)
         self.menu_bar.add_cascade(label="File", menu=self.file_menu)
@@ -65,11 +84,42 @@ class TextReaderInterface:
         self.edit_menu.add_command(label="Delete", command=self.delete_text)
         self.menu_bar.add_cascade(label="Edit", menu=self.edit_menu)
 
+        # Metrics items in menu bar
+        self.metrics_enabled = tk.BooleanVar(value=False)
+        self.metrics_memory = tk.BooleanVar(value=False)
+        self.metrics_menu = Menu(self.menu_bar, tearoff=0)
+        self.metrics_menu.add_checkbutton(label="Measure stages", variable=self.metrics_enabled,
+                                          command=self.toggle_metrics)
+        self.metrics_menu.add_checkbutton(label="Trace memory", variable=self.metrics_memory,
+                                          command=self.toggle_metrics)
+        self.metrics_menu.add_separator()
+        self.metrics_menu.add_command(label="Export JSON lines", command=lambda: self.export_metrics("jsonl"))
+        self.metrics_menu.add_command(label="Export Prometheus", command=lambda: self.export_metrics("prom"))
+        self.metrics_menu.add_command(label="Reset", command=self.reset_metrics)
+        self.menu_bar.add_cascade(label="Metrics", menu=self.metrics_menu)
+
         # Help items in menu bar
         self.help_menu = Menu(self.menu_bar, tearoff=0)
         self.help_menu.add_command(label="About", command=self.msg_about)
         self.menu_bar.add_cascade(label="Help", menu=self.help_menu)
 
+        # Status bar with progress of background jobs and the slowest measured stages
+        self.metrics_label = ttk.Label(self.window, font=("courier new", 9), anchor="w")
+        self.metrics_label.pack(side=tk.BOTTOM, fill="x", padx=10)
+
+        self.status_frame = ttk.Frame(self.window)
+        self.status_frame.pack(side=tk.BOTTOM, fill="x")
+
+        self.status_label = ttk.Label(self.status_frame, width=26, font=("courier new", 10))
+        self.status_label.pack(side=tk.LEFT, padx=10, pady=5)
+
+        self.progress_bar = ttk.Progressbar(self.status_frame, length=300, mode="determinate")
+        self.progress_bar.pack(side=tk.LEFT, padx=5, pady=5)
+
+        self.cancel_button = ttk.Button(self.status_frame, text="Cancel", command=self.jobs.cancel_all,
+                                        state="disabled")
+        self.cancel_button.pack(side=tk.LEFT, padx=5, pady=5)
+
         # Tkinter Notebook
         self.tab_control = ttk.Notebook(self.window)
         self.tab_control.pack(expand=1, fill="both")
@@ -84,7 +134,7 @@ class TextReaderInterface:
         self.read_frame = ttk.LabelFrame(self.tab_read, text="Convert text to audio")
         self.read_frame.grid(column=0, row=0, padx=20, pady=20, ipady=15)
 
-        self.convert = ttk.Button(self.read_frame, text="Convert!", command=self.convert_thread)
+        self.convert = ttk.Button(self.read_frame, text="Convert!", command=self.convert_text)
         self.convert.place(x=30, y=390)
 
         self.textbox = scrolledtext.ScrolledText(self.read_frame, width=60, height=20, wrap=tk.WORD,
@@ -104,6 +154,20 @@ class TextReaderInterface:
 
         create_tip(self.language_chosen, "Choose the language of the text \nif you don't want to include stop words")
 
+        self.live_enabled = tk.BooleanVar(value=False)
+        self.live_check = ttk.Checkbutton(self.read_frame, text="Live words", variable=self.live_enabled,
+                                          command=self.toggle_live_words)
+        self.live_check.grid(column=2, row=0)
+
+        create_tip(self.live_check, "Show the most popular words \nwhile you write")
+
+        self.live_words = ttk.Label(self.read_frame, font=("courier new", 10), foreground="#BF1363")
+        self.live_words.place(x=150, y=395)
+
+        watch_edits(self.textbox, self.text_edited)
+        self.textbox.bind("<<Modified>>", self.text_modified)
+        self.language_chosen.bind("<<ComboboxSelected>>", lambda event: self.schedule_live_words())
+
         self.words_frame = ttk.LabelFrame(self.tab_words, height=452, width=433, text="5 most popular words in text")
         self.words_frame.grid_propagate(0)
         self.words_frame.grid(column=0, row=0, padx=20, pady=20, ipadx=66)
@@ -181,6 +245,7 @@ class TextReaderInterface:
         try:
             self.textbox.delete("sel.first", "sel.last")
         except tk.TclError:
+            self.close_view()
             self.textbox.delete("1.0", tk.END)
             self.text = None
             self.first_word.configure(text="")
@@ -190,28 +255,210 @@ class TextReaderInterface:
             self.fifth_word.configure(text="")
 
     def open_file(self):
-        """Load text from the computer --> option in Menu bar - File - Open."""
+        """Load text from the computer in the background --> option in Menu bar - File - Open."""
         files = [('Text Document', '*.txt'), ('PDF Document', '*.pdf'), ('Word Document', '*.docx')]
-        text_file = askopenfile(mode='r', title="Open your file", filetypes=files,
-                                defaultextension=files)
-        if text_file is not None:
-            self.file_path = text_file.name
-            text_inside = self.file.load_file(text_file.name)
-            text_file.close()
-            self.textbox.delete("1.0", tk.END)
-            self.textbox.insert("1.0", text_inside)
-            self.text = self.textbox
+        path = askopenfilename(title="Open your file", filetypes=files, defaultextension=files)
+        if path:
+            self.jobs.submit("Opening file", self.load_text, path, on_done=lambda text: self.show_text(path, text),
+                             on_error=self.show_error)
+
+    def load_text(self, job, path):
+        """Extract text from the file, it runs as a background job. Files larger than LARGE_TEXT_SIZE are read part by
+        part into TextStore.
+
+        :param job: The job, it gets the progress and can stop the extraction.
+        :type: text_reader.jobs.Job
+        :param path: File path.
+        :type: str
+        :return: Text from the file, TextStore if it is longer than LARGE_TEXT_SIZE.
+        :rtype: str or text_reader.viewer.TextStore
+        """
+        if os.path.getsize(path) > LARGE_TEXT_SIZE:
+            # Pages go straight into the store, the whole text is never joined into one string.
+            return TextStore(iter_pages(path, job.progress, job.cancel_event, self.file.encoding))
+        text = self.file.for_text(None).load_file(path, job.progress, job.cancel_event)
+        if len(text) > LARGE_TEXT_SIZE:
+            # A small compressed file (e.g. .docx) with a long text.
+            return TextStore([text])
+        return text
+
+    def show_text(self, path, text):
+        """Show text loaded from file in the textbox, large texts are shown page by page and can't be edited.
+
+        :param path: File path.
+        :type: str
+        :param text: Text from the file.
+        :type: str or text_reader.viewer.TextStore
+        """
+        self.file_path = path
+        self.close_view()
+        self.textbox.delete("1.0", tk.END)
+        if isinstance(text, TextStore):
+            # The view is set before its pages are put into the textbox, so they aren't counted as edits.
+            self.view = LargeTextView(self.textbox, text)
+            self.view.render(0)
+            if self.live_enabled.get():
+                self.count_live_words()
+        else:
+            self.textbox.insert("1.0", text)
+        self.text = self.textbox
+
+    def close_view(self):
+        """Leave the mode of large texts, the live statistics start from an empty textbox."""
+        if self.view is not None:
+            self.view.close()
+            self.view = None
+            self.live.reset("")
+
+    def toggle_live_words(self):
+        """Start or stop the live statistics of words."""
+        if self.live_enabled.get():
+            ensure_nltk_resources()
+            self.count_live_words()
+        else:
+            self.live.reset("")
+            self.live_words.configure(text="")
+
+    def count_live_words(self):
+        """Count words of the whole text for the live statistics, a large text is counted from its store in the
+        background.
+        """
+        if self.view is None:
+            self.live.reset(self.textbox.get("1.0", "end-1c"))
+            self.show_live_words()
+            return
+        store = self.view.store
+        self.live.reset("")
+
+        def show(wordcount):
+            # The text could be closed or replaced while it was counted.
+            if self.view is not None and self.view.store is store and self.live_enabled.get():
+                self.live.reset_counts(wordcount)
+                self.show_live_words()
+
+        self.jobs.submit("Counting words", lambda job: LiveWordCount.count_parts(store), on_done=show,
+                         on_error=self.show_error)
+
+    def text_edited(self, start, count, lines):
+        """Count words again in the lines changed by an edit.
+
+        :param start: Number of the first changed line, from 0.
+        :type: int
+        :param count: Number of replaced lines.
+        :type: int
+        :param lines: Text of the new lines.
+        :type: list
+        """
+        # Pages of large texts are put into the textbox while scrolling, they aren't edits.
+        if self.live_enabled.get() and self.view is None:
+            self.live.replace_lines(start, count, lines)
+
+    def text_modified(self, event):
+        """Show the live statistics after the text was modified."""
+        self.textbox.edit_modified(False)
+        self.schedule_live_words()
+
+    def schedule_live_words(self):
+        """Show the live statistics when there are no edits for DEBOUNCE milliseconds."""
+        if not self.live_enabled.get():
+            return
+        if self.live_after is not None:
+            self.window.after_cancel(self.live_after)
+        self.live_after = self.window.after(DEBOUNCE, self.show_live_words)
+
+    def show_live_words(self):
+        """Show the 5 most popular words of the edited text."""
+        self.live_after = None
+        words = self.live.top(self.language.get(), 5)
+        self.live_words.configure(text=", ".join(word for word, _ in words))
+
+    def get_text(self):
+        """Get the text to analyze or convert, large texts aren't copied from the textbox.
+
+        :return: Text from the textbox or TextStore of a large text.
+        :rtype: str or text_reader.viewer.TextStore
+        """
+        if self.view is not None:
+            return self.view.store
+        return self.textbox.get("1.0", tk.END)
+
+    def show_error(self, error):
+        """Show the error of a background job.
+
+        :param error: The error.
+        :type: Exception
+        """
+        msg.showerror(title="Error", message=str(error) or type(error).__name__)
+
+    def show_jobs(self):
+        """Show the progress of the last started background job in the status bar."""
+        if self.jobs.jobs and not self.busy:
+            self.metrics_mark = metrics.mark()
+        self.busy = bool(self.jobs.jobs)
+        if not self.jobs.jobs:
+            self.show_metrics()
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate", value=0)
+            self.status_label.configure(text="")
+            self.cancel_button.configure(state="disabled")
+            return
+        job = self.jobs.jobs[-1]
+        others = len(self.jobs.jobs) - 1
+        self.status_label.configure(text=job.name + (" (+{})".format(others) if others else ""))
+        self.cancel_button.configure(state="normal")
+        if job.total:
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate", maximum=job.total, value=job.done)
+        elif str(self.progress_bar["mode"]) != "indeterminate":
+            self.progress_bar.configure(mode="indeterminate")
+            self.progress_bar.start(POLL_INTERVAL)
+
+    def toggle_metrics(self):
+        """Switch measuring of the stages on or off."""
+        if self.metrics_enabled.get():
+            metrics.enable(trace_memory=self.metrics_memory.get())
+            self.metrics_mark = metrics.mark()
+            self.metrics_label.configure(text="Measuring stages")
+        else:
+            metrics.disable()
+            self.metrics_label.configure(text="")
+
+    def show_metrics(self):
+        """Show the slowest stages of the last background jobs in the status bar."""
+        if metrics.enabled:
+            self.metrics_label.configure(text=metrics.status(self.metrics_mark) or "Measuring stages")
+
+    def export_metrics(self, kind):
+        """Save the measured stages as JSON lines or Prometheus text file.
+
+        :param kind: "jsonl" or "prom".
+        :type: str
+        """
+        files = [('JSON Lines', '*.jsonl')] if kind == "jsonl" else [('Prometheus', '*.prom')]
+        path = asksaveasfilename(title="Export metrics", filetypes=files, defaultextension=files)
+        if not path:
+            return
+        if kind == "jsonl":
+            metrics.write_json_lines(path)
+        else:
+            metrics.write_prometheus(path)
+
+    def reset_metrics(self):
+        """Remove the measured stages."""
+        metrics.reset()
+        self.metrics_mark = metrics.mark()
+        self.show_metrics()
 
     def save_text(self):
         """Allows to save the text as txt file or in SQL base depending on the Frame."""
         if self.tab_control.index("current") == 0:
-            text = self.textbox.get("1.0", tk.END)
+            text = self.get_text()
             if text is not None:
                 files = [('Text Document', '*.txt')]
                 text_file = asksaveasfile(title="Save your text as .txt", filetypes=files,
                                           defaultextension=files)
                 if text_file is not None:
-                    text_file.write(text)
+                    text_file.writelines([text] if isinstance(text, str) else text)
                     text_file.close()
             else:
                 msg.showwarning(title="Warning", message="There is no data to save!")
@@ -221,7 +468,7 @@ class TextReaderInterface:
                 result = msg.askyesno(title="Save words", message="Do you want to save top 5 words in SQL database?")
                 if result:
                     if self.file_path is not None:
-                        TextReaderInterface.start_sql_gui(words=text, path=self.file_path)
+                        TextReaderInterface.start_sql_gui(words=text, path=self.file_path, jobs=self.jobs)
                     else:
                         msg.showwarning(message="You have to save your file as txt before saving in SQL!")
                         files = [('Text Document', '*.txt')]
@@ -231,36 +478,92 @@ class TextReaderInterface:
                             self.file_path = text_file.name
                             text_file.write(str(text))
                             text_file.close()
-                            TextReaderInterface.start_sql_gui(words=text, path=self.file_path)
+                            TextReaderInterface.start_sql_gui(words=text, path=self.file_path, jobs=self.jobs)
             else:
                 msg.showwarning(title="Warning", message="There is no data to save!")
 
     def quit(self):
         """Exit the application."""
+        self.jobs.shutdown()
         self.window.quit()
         self.window.destroy()
         exit()
 
     def convert_text(self):
-        """Convert text to audio file."""
+        """Find the 5 most popular words and convert text to audio file in background jobs."""
+        text = self.get_text()
+        language = self.language.get()
+        self.clean_5_words()
+        self.jobs.submit("Finding words", self.find_5_words, text, language, self.file_path,
+                         on_done=self.show_5_words, on_error=self.show_error)
         if msg.askyesno(message="Do you want to save audio file?"):
-            text = self.textbox.get("1.0", tk.END)
-            self.file.text = text
             files = [('Sound', '*.mp3')]
             mp3_file = asksaveasfile(title="Save your mp3 file", filetypes=files, defaultextension=files)
             if mp3_file is not None:
-                self.file.convert_text_to_mp3(languages[self.language.get()], mp3_file.name)
-            msg.showinfo(title="Text to audio", message="Done")
-
-    def find_5_words(self):
-        """Find the most 5 popular words in text."""
-        del self.words[:]
-        text = self.textbox.get("1.0", tk.END)
-        self.file.text = text
-        self.words = self.file.find_top_5_words(self.language.get())
+                mp3_file.close()
+                self.jobs.submit("Converting to audio", self.save_audio, text, languages[language], mp3_file.name,
+                                 on_done=lambda _: msg.showinfo(title="Text to audio", message="Done"),
+                                 on_error=self.show_error)
+
+    def save_audio(self, job, text, language, filename):
+        """Convert text to audio file, it runs as a background job.
+
+        :param job: The job, it gets the progress and can stop the conversion.
+        :type: text_reader.jobs.Job
+        :param text: Text to convert.
+        :type: str or text_reader.viewer.TextStore
+        :param language: Language code, e.g. "en".
+        :type: str
+        :param filename: Path of the MP3 file.
+        :type: str
+        """
+        self.file.for_text(text).convert_text_to_mp3(language, filename, job.progress, job.cancel_event)
+
+    def find_5_words(self, job, text, language, path=None):
+        """Find the most 5 popular words in text, it runs as a background job. Counts of words of a file are put in
+        the index of documents.
+
+        :param job: The job.
+        :type: text_reader.jobs.Job
+        :param text: Text to analyze.
+        :type: str or text_reader.viewer.TextStore
+        :param language: Language of the text.
+        :type: str
+        :param path: Path of the file with the text, None if it was written in the textbox.
+        :type: str
+        :return: The 5 most popular words.
+        :rtype: list
+        """
+        if isinstance(text, TextStore):
+            manager = self.file.for_text(None)
+            manager.path = path
+            return [word for word, _ in manager.find_top_n_in_parts(text, language, 5)]
+        manager = self.file.for_text(text)
+        manager.path = path
+        return manager.find_top_5_words(language)
+
+    def distinctive_words(self):
+        """Show words which are typical for the opened file compared with all analyzed files."""
+        if self.file.index is None:
+            msg.showwarning(title="Warning", message="The index of documents is disabled.")
+        elif self.file_path is None or os.path.abspath(self.file_path) not in self.file.index:
+            msg.showwarning(title="Warning", message="Open a file and find its top 5 words first.")
+        else:
+            words = self.file.index.distinctive_words(os.path.abspath(self.file_path), 10)
+            documents = len(self.file.index)
+            msg.showinfo(title="Distinctive words", message="Compared with {} documents:\n{}".format(
+                documents, "\n".join("{} ({})".format(word, count) for word, _, count in words)))
+
+    def show_5_words(self, words):
+        """Show the most 5 popular words in Top 5 words Frame.
+
+        :param words: The 5 most popular words.
+        :type: list
+        """
+        self.words = words
         words_count = len(self.words)
         if words_count == 0:
-            self.first_word.configure("All words are stop words.")
+            self.first_word.configure(text="All words are stop words.")
         if words_count >= 1:
             self.first_word.configure(text=self.words[0])
         if words_count >= 2:
@@ -281,34 +584,18 @@ class TextReaderInterface:
         self.fourth_word.configure(text="")
         self.fifth_word.configure(text="")
 
-    def convert_thread(self):
-        """Run methods in threads when convert button is clicked."""
-        thread_mp3 = Thread(target=self.convert_text)
-        thread_mp3.setDaemon(True)
-        thread_mp3.start()
-        thread_words = Thread(target=self.find_5_words)
-        thread_words.setDaemon(True)
-        thread_words.start()
-        thread_clean_5_words = Thread(target=self.clean_5_words)
-        thread_clean_5_words.setDaemon(True)
-        thread_clean_5_words.start()
-
-    def open_thread(self):
-        """Run open method in threads during file opening."""
-        thread_open_file = Thread(target=self.open_file)
-        thread_open_file.setDaemon(True)
-        thread_open_file.start()
-
     @staticmethod
-    def start_sql_gui(words, path):
+    def start_sql_gui(words, path, jobs=None):
         """Open SQL GUI.
 
         :param words: 5 top popular words in text.
         :type: list
         :param path: File path to text in computer.
         :type: str
+        :param jobs: Scheduler of background jobs of the main window.
+        :type: text_reader.jobs.JobScheduler
         """
-        sql_gui = SQLSaveInterface(words=words, path=path)
+        sql_gui = SQLSaveInterface(words=words, path=path, jobs=jobs)
         sql_gui.sql_window.mainloop()
 
 
@@ -316,7 +603,7 @@ class SQLSaveInterface(TextReaderInterface):
     """This class can be used to save 5 words in SQL database and for the creation new databases and tables.
     """
 
-    def __init__(self, words, path):
+    def __init__(self, words, path, jobs=None):
         """Constructor method."""
 
         self.sql_window = tk.Toplevel()
@@ -327,9 +614,13 @@ class SQLSaveInterface(TextReaderInterface):
         self.words_to_use = words
         self.path = path
 
-        self.sql_database = SQLDatabase()
+        self.sql_database = sql.SQLDatabase()
         self.db = ""
         self.table_db = ""
+        self.jobs = jobs
+        if self.jobs is None:
+            self.jobs = JobScheduler()
+            self.jobs.attach(self.sql_window)
 
         # Styles
         self.sql_window.configure(bg='#DEEEEA')
@@ -350,7 +641,9 @@ class SQLSaveInterface(TextReaderInterface):
         self.database = tk.StringVar()
         self.database_chosen = ttk.Combobox(self.db_frame, width=30, textvariable=self.database, font=MAIN_FONT,
                                             state="readonly")
-        self.show_db_combobox()
+        # Names of databases and tables are read in the background, so the window doesn't wait for the server.
+        self.database_chosen.set("Loading...")
+        self.load_databases(prefetch=True)
         self.database_chosen.grid(column=1, row=0, pady=5)
 
         self.label_create_db = ttk.Label(self.db_frame, text="Or create new one:")
@@ -421,16 +714,62 @@ class SQLSaveInterface(TextReaderInterface):
         self.button_words_db = ttk.Button(self.words_frame, text="Save to database", command=self.save_in_db)
         self.button_words_db.grid(column=1, row=4)
 
+    def new_database(self, db_name="", table_name=""):
+        """Make SQLDatabase for one background job, so jobs don't share the names of database and table.
+
+        :param db_name: Name of the database.
+        :type: str
+        :param table_name: Name of the table.
+        :type: str
+        :rtype: text_reader.database.SQLDatabase
+        """
+        database = sql.SQLDatabase(self.sql_database.backend)
+        database.db_name = db_name
+        database.table_name = table_name
+        return database
+
+    def load_databases(self, prefetch=False):
+        """Read names of databases in the background and show them in combobox.
+
+        :param prefetch: Then read also names of tables of all databases into the cache in another job.
+        :type: bool
+        """
+        database = self.new_database()
+
+        def show(databases):
+            self.show_db_combobox(databases)
+            if prefetch:
+                self.prefetch_tables()
+
+        self.jobs.submit("Reading databases", lambda job: database.show_database(), on_done=show,
+                         on_error=self.show_error)
+
+    def prefetch_tables(self):
+        """Read names of tables of all databases into the cache in the background, so they are shown at once."""
+        database = self.new_database()
+        self.jobs.submit("Reading tables", lambda job: database.load_metadata(), on_error=self.show_error)
+
+    def load_tables(self):
+        """Read names of tables in chosen database in the background and show them in combobox."""
+        database = self.new_database()
+        name_db = self.change_db()
+        self.jobs.submit("Reading tables", lambda job: database.show_tables(name_db),
+                         on_done=self.show_table_combobox, on_error=self.show_error)
+
     def confirm_db(self):
         """Confirm the database which will be used."""
         self.words_frame.grid_forget()
         self.table_frame.grid(column=0, row=1, padx=20, pady=20, ipadx=66)
         self.table_chosen.set("")
-        self.show_table_combobox()
+        self.load_tables()
 
-    def show_table_combobox(self):
-        """Show all tables in chosen databases in combobox."""
-        self.table_chosen["values"] = self.sql_database.show_tables(self.change_db())
+    def show_table_combobox(self, tables):
+        """Show all tables in chosen databases in combobox.
+
+        :param tables: Names of the tables.
+        :type: list
+        """
+        self.table_chosen["values"] = tables
         if len(self.table_chosen["values"]) > 0:
             self.table_chosen.current(0)
 
@@ -444,26 +783,41 @@ class SQLSaveInterface(TextReaderInterface):
         return self.db
 
     def add_db(self):
-        """Create new SQL database."""
+        """Create new SQL database in the background."""
         name_db = self.name_db.get()
         if len(name_db) > 0:
-            self.sql_database.db_name = name_db
-            if self.sql_database.create_database():
-                msg.showinfo(
-                    message="".join(
-                        [str(self.name_db.get()), " created as text_reader_", str(self.sql_database.db_name)]))
-                self.name_db.delete(0, tk.END)
-                self.show_db_combobox()
-            else:
-                msg.showinfo(message="Failed")
+            database = self.new_database(name_db)
+            self.jobs.submit("Creating database", lambda job: database.create_database(),
+                             on_done=lambda success: self.db_created(name_db, success), on_error=self.show_error)
         else:
             msg.showinfo(message="Write db name!")
 
-    def show_db_combobox(self):
-        """Show all databases in combobox."""
-        self.database_chosen["values"] = self.sql_database.show_database()
+    def db_created(self, name_db, success):
+        """Show the result of the creation of database.
+
+        :param name_db: Name of the database without text_reader_ prefix.
+        :type: str
+        :param success: The database was created.
+        :type: bool
+        """
+        if success:
+            msg.showinfo(message="".join([name_db, " created as text_reader_", name_db]))
+            self.name_db.delete(0, tk.END)
+            self.load_databases()
+        else:
+            msg.showinfo(message="Failed")
+
+    def show_db_combobox(self, databases):
+        """Show all databases in combobox.
+
+        :param databases: Names of the databases.
+        :type: list
+        """
+        self.database_chosen["values"] = databases
         if len(self.database_chosen["values"]) > 0:
             self.database_chosen.current(0)
+        else:
+            self.database_chosen.set("")
 
     def confirm_table(self):
         """Confirm the table in the database which will be used."""
@@ -475,21 +829,32 @@ class SQLSaveInterface(TextReaderInterface):
         self.db = self.database.get()
 
     def create_table_db(self):
-        """Create a new table in chosen database."""
+        """Create a new table in chosen database in the background."""
         table_name = self.name_table.get()
         if len(table_name) > 0:
             self.table_db = table_name
-            self.sql_database.db_name = self.db
-            if self.sql_database.create_table(self.table_db):
-                msg.showinfo(
-                    message="".join([str(self.table_db), " created"]))
-                self.name_table.delete(0, tk.END)
-                self.show_table_combobox()
-            else:
-                msg.showinfo(message="Failed")
+            database = self.new_database(self.db)
+            self.jobs.submit("Creating table", lambda job: database.create_table(table_name),
+                             on_done=lambda success: self.table_created(table_name, success),
+                             on_error=self.show_error)
         else:
             msg.showinfo(message="Write table name!")
 
+    def table_created(self, table_name, success):
+        """Show the result of the creation of table.
+
+        :param table_name: Name of the table.
+        :type: str
+        :param success: The table was created.
+        :type: bool
+        """
+        if success:
+            msg.showinfo(message="".join([table_name, " created"]))
+            self.name_table.delete(0, tk.END)
+            self.load_tables()
+        else:
+            msg.showinfo(message="Failed")
+
     def delete_words(self):
         """Remove 5 top words."""
         self.word_1.delete(0, tk.END)
@@ -522,11 +887,9 @@ class SQLSaveInterface(TextReaderInterface):
             self.word_5.configure(state="disabled")
 
     def save_in_db(self):
-        """Save 5 top words in chosen table."""
-        self.sql_database.table_name = self.table_db
-        self.sql_database.db_name = self.db
-        if self.sql_database.insert_item(text_path=self.path, word_first=self.word_1.get(),
-                                         word_second=self.word_2.get(),
-                                         word_third=self.word_3.get(), word_fourth=self.word_4.get(),
-                                         word_fifth=self.word_5.get()):
-            msg.showinfo(message="Done")
+        """Save 5 top words in chosen table in the background."""
+        database = self.new_database(self.db, self.table_db)
+        words = [self.word_1.get(), self.word_2.get(), self.word_3.get(), self.word_4.get(), self.word_5.get()]
+        self.jobs.submit("Saving words", lambda job: database.insert_item(self.path, *words),
+                         on_done=lambda success: msg.showinfo(message="Done") if success else None,
+                         on_error=self.show_error)
@@ -0,0 +1,248 @@
+"""The module is responsible for showing very large texts in the graphical interface.
+
+Tk text widget is slow with tens of MB of text, so large texts are kept in TextStore and LargeTextView puts only a few
+pages around the visible part into the widget. The scrollbar still shows the position in the whole text.
+"""
+import bisect
+import tkinter as tk
+
+PAGE_SIZE = 64 * 1024
+LARGE_TEXT_SIZE = 2 * 1024 * 1024
+WINDOW_PAGES = 3
+EDGE = 0.1
+
+
+class TextStore:
+    """This class can be used for keeping a large text as pages, pages are cut at the ends of paragraphs or lines.
+    Example:
+    store = TextStore(iter_pages("book.pdf"))
+    store.page(0)
+    count_words_in_parts(store, "english")
+    """
+
+    def __init__(self, parts=(), page_size=PAGE_SIZE):
+        """Constructor method.
+
+        :param parts: Parts of the text, e.g. the whole text or pages from text_reader.extractors.iter_pages.
+        :type: iterable
+        :param page_size: Maximal number of characters in a page, unless a line is longer.
+        :type: int
+        """
+        self.page_size = page_size
+        self.pages = []
+        self.offsets = []
+        self.length = 0
+        self.rest = ""
+        for part in parts:
+            self.append(part)
+        self.close()
+
+    def append(self, text):
+        """Add text at the end, the last incomplete page waits for more text or close.
+
+        :param text: Text to add.
+        :type: str
+        """
+        text = self.rest + text
+        start = 0
+        while len(text) - start > self.page_size:
+            end = self.cut(text, start, start + self.page_size)
+            self.add_page(text[start:end])
+            start = end
+        self.rest = text[start:]
+
+    def close(self):
+        """Add the last incomplete page."""
+        if self.rest:
+            self.add_page(self.rest)
+            self.rest = ""
+
+    def cut(self, text, start, end):
+        """Find the end of a page: the end of a paragraph in its second half, the end of a line or a space.
+
+        :param text: Text to cut.
+        :type: str
+        :param start: Beginning of the page.
+        :type: int
+        :param end: The furthest end of the page.
+        :type: int
+        :return: End of the page.
+        :rtype: int
+        """
+        paragraph = text.rfind("\n\n", start + (end - start) // 2, end)
+        if paragraph >= 0:
+            return paragraph + 2
+        return text.rfind("\n", start, end) + 1 or text.rfind(" ", start, end) + 1 or end
+
+    def add_page(self, page):
+        """Add a page at the end.
+
+        :param page: Text of the page.
+        :type: str
+        """
+        self.offsets.append(self.length)
+        self.pages.append(page)
+        self.length += len(page)
+
+    def page(self, number):
+        """Get text of a page.
+
+        :param number: Number of the page, from 0.
+        :type: int
+        :rtype: str
+        """
+        return self.pages[number]
+
+    def page_count(self):
+        """Get the number of pages.
+
+        :rtype: int
+        """
+        return len(self.pages)
+
+    def find_page(self, offset):
+        """Find the page which contains the character.
+
+        :param offset: Position of the character in the whole text.
+        :type: int
+        :return: Number of the page.
+        :rtype: int
+        """
+        return max(bisect.bisect_right(self.offsets, offset) - 1, 0)
+
+    def text(self):
+        """Join the pages, it makes a copy of the whole text.
+
+        :rtype: str
+        """
+        return "".join(self.pages)
+
+    def __iter__(self):
+        """Iterate over pages, so the store can be analyzed like parts of a file."""
+        return iter(self.pages)
+
+    def __len__(self):
+        """Get the number of characters."""
+        return self.length
+
+
+class LargeTextView:
+    """This class can be used for showing TextStore in a scrolled text widget, only window_pages pages are in the widget
+    and they are changed while the user scrolls. The widget is read-only in this mode.
+    Example:
+    view = LargeTextView(textbox, TextStore(iter_pages("book.pdf")))
+    view.render(0)
+    """
+
+    def __init__(self, textbox, store, window_pages=WINDOW_PAGES):
+        """Constructor method.
+
+        :param textbox: Text widget with vbar scrollbar.
+        :type: tkinter.scrolledtext.ScrolledText
+        :param store: Text to show.
+        :type: TextStore
+        :param window_pages: Number of pages in the widget.
+        :type: int
+        """
+        self.textbox = textbox
+        self.store = store
+        self.window_pages = window_pages
+        self.first = 0
+        self.rendering = False
+        self.textbox.configure(yscrollcommand=self.on_scroll)
+        self.textbox.vbar.configure(command=self.scroll)
+
+    def last(self):
+        """Get the number of the page after the window.
+
+        :rtype: int
+        """
+        return min(self.first + self.window_pages, self.store.page_count())
+
+    def window(self):
+        """Get the positions of the first and after the last character in the widget.
+
+        :rtype: tuple
+        """
+        last = self.last()
+        end = self.store.offsets[last] if last < self.store.page_count() else len(self.store)
+        return self.store.offsets[self.first] if self.store.pages else 0, end
+
+    def render(self, first):
+        """Put the pages from first into the widget.
+
+        :param first: Number of the first page.
+        :type: int
+        """
+        self.first = max(0, min(first, self.store.page_count() - self.window_pages))
+        self.rendering = True
+        try:
+            self.textbox.configure(state="normal")
+            self.textbox.delete("1.0", tk.END)
+            self.textbox.insert("1.0", "".join(self.store.page(i) for i in range(self.first, self.last())))
+            self.textbox.configure(state="disabled")
+        finally:
+            self.rendering = False
+
+    def position(self, fraction):
+        """Change a fraction of the widget to a fraction of the whole text.
+
+        :param fraction: Position in the widget, from 0 to 1.
+        :type: float
+        :rtype: float
+        """
+        start, end = self.window()
+        return (start + fraction * (end - start)) / max(len(self.store), 1)
+
+    def on_scroll(self, top, bottom):
+        """Set the scrollbar to the position in the whole text and move the window when the view is near its edge.
+
+        :param top: Fraction of the widget above the view.
+        :type: str
+        :param bottom: Fraction of the widget above the end of the view.
+        :type: str
+        """
+        top, bottom = float(top), float(bottom)
+        self.textbox.vbar.set(self.position(top), self.position(bottom))
+        if self.rendering:
+            return
+        if bottom > 1 - EDGE and self.last() < self.store.page_count():
+            self.show(self.position(top), centre=True)
+        elif top < EDGE and self.first > 0:
+            self.show(self.position(top), centre=True)
+
+    def show(self, fraction, centre=False):
+        """Scroll to the position in the whole text.
+
+        :param fraction: Position in the whole text, from 0 to 1.
+        :type: float
+        :param centre: Put the page of the position in the middle of the window even if it is in the widget.
+        :type: bool
+        """
+        offset = min(max(fraction, 0.0), 1.0) * len(self.store)
+        page = self.store.find_page(offset)
+        if centre or not self.first <= page < self.last():
+            self.render(page - self.window_pages // 2)
+        start, end = self.window()
+        self.rendering = True
+        try:
+            self.textbox.yview_moveto((offset - start) / max(end - start, 1))
+        finally:
+            self.rendering = False
+
+    def scroll(self, *args):
+        """Handle the scrollbar, dragging moves to the position in the whole text.
+
+        :param args: Arguments of yview from the scrollbar, e.g. ("moveto", "0.5") or ("scroll", "1", "units").
+        :type: tuple
+        """
+        if args[0] == "moveto":
+            self.show(float(args[1]))
+        else:
+            self.textbox.yview(*args)
+
+    def close(self):
+        """Give the widget and its scrollbar back to normal mode and remove the text."""
+        self.textbox.configure(state="normal", yscrollcommand=self.textbox.vbar.set)
+        self.textbox.vbar.configure(command=self.textbox.yview)
+        self.textbox.delete("1.0", tk.END)
@@ -0,0 +1,463 @@
+"""The module is responsible for counting words in text."""
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import heapq
+import os
+import re
+import string
+from threading import Lock
+import time
+from .languages import languages
+from .lazy import lazy_import
+from .metrics import IterationTimer, metrics, timed
+
+nltk = lazy_import("nltk")
+
+STOP_WORDS_CACHE_SIZE = 16
+CHUNK_SIZE = 1 << 20
+# Characters on both sides of a chunk boundary which Punkt reads to check it.
+SENTENCE_WINDOW = 500
+NLTK_RESOURCES = {
+    "tokenizers/punkt": "punkt",
+    "tokenizers/punkt_tab": "punkt_tab",
+    "corpora/stopwords": "stopwords",
+}
+
+TOKENIZERS = ("nltk", "regex")
+# White space where iter_chunks can end a chunk.
+SPACE = re.compile(r"\s+")
+# Text between punctuation: a phrase for n-grams of the regex tokenizer.
+PHRASE = re.compile(r"[\w\s'\u2019-]+")
+# Apostrophes in the regex tokenizer: English and German clitics are split like in nltk.word_tokenize ("do", "n't"),
+# French and Italian elisions are split from the word ("l", "eau"), as in the NLTK stop words, other languages keep
+# apostrophes inside words. Hyphenated words are kept whole in all languages.
+CLITICS = {
+    "english": r"\w+(?=n't\b)|n't\b|'(?:s|re|ve|ll|d|m)\b|",
+    "german": r"'s\b|",
+}
+ELISIONS = ("french", "italian")
+
+_resources_lock = Lock()
+_resources_ready = False
+
+
+def ensure_nltk_resources():
+    """Check the NLTK data and download missing resources, only once per process.
+
+    Only the Punkt model loaded by the installed NLTK is checked. When a download fails, e.g. offline, the check is
+    repeated on the next call.
+    """
+    global _resources_ready
+    with _resources_lock:
+        if _resources_ready:
+            return
+        ready = True
+        for path, package in NLTK_RESOURCES.items():
+            if package.startswith("punkt") and (package == "punkt_tab") != (_punkt_tokenizer() is not None):
+                continue
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                ready = nltk.download(package, quiet=True) and ready
+        _resources_ready = ready
+
+
+@lru_cache(maxsize=STOP_WORDS_CACHE_SIZE)
+def _load_stop_words(language, extra_stop_words):
+    """Read stop words of the language from the NLTK corpus.
+
+    :param language: Language from text_reader.languages.
+    :type: str
+    :param extra_stop_words: Words added by the user.
+    :type: frozenset
+    :return: Stop words.
+    :rtype: frozenset
+    """
+    if language == "other":
+        return extra_stop_words
+    return frozenset(nltk.corpus.stopwords.words(language)) | extra_stop_words
+
+
+def get_stop_words(language, extra_stop_words=()):
+    """Get cached stop words of the language, the corpus is read once per language.
+
+    :param language: Language from text_reader.languages, "other" has no stop words.
+    :type: str
+    :param extra_stop_words: Words which should be skipped too.
+    :type: iterable
+    :raises KeyError: Unknown language.
+    :return: Stop words.
+    :rtype: frozenset
+    """
+    if language not in languages:
+        raise KeyError("Unknown language: {}".format(language))
+    return _load_stop_words(language, frozenset(word.lower() for word in extra_stop_words))
+
+
+@lru_cache(maxsize=None)
+def _punkt_tokenizer():
+    """Find the class of the Punkt tokenizer which reads punkt_tab.
+
+    :return: PunktTokenizer or None in nltk < 3.8.2, which ships the pickled Punkt model instead.
+    :rtype: type
+    """
+    return getattr(nltk.tokenize, "PunktTokenizer", None)
+
+
+@lru_cache(maxsize=None)
+def _word_tokenizer():
+    """Create the Treebank word tokenizer used by nltk.word_tokenize.
+
+    :rtype: nltk.tokenize.NLTKWordTokenizer
+    """
+    return nltk.tokenize.NLTKWordTokenizer()
+
+
+@lru_cache(maxsize=None)
+def _sentence_tokenizer():
+    """Load the Punkt sentence tokenizer used by nltk.word_tokenize.
+
+    :raises LookupError: No tokenizers installed.
+    :return: English Punkt tokenizer.
+    :rtype: nltk.tokenize.punkt.PunktSentenceTokenizer
+    """
+    if _punkt_tokenizer() is not None:
+        return _punkt_tokenizer()("english")
+    return nltk.data.load("tokenizers/punkt/english.pickle")
+
+
+def iter_tokens(text):
+    """Split text into tokens the same way as nltk.word_tokenize, one sentence at a time.
+
+    :param text: Text to tokenize.
+    :type: str
+    :return: Tokens of the text.
+    :rtype: generator
+    """
+    tokenizer = _word_tokenizer()
+    for sentence in iter_sentences(text):
+        yield from tokenizer.tokenize(sentence)
+
+
+def iter_sentences(text):
+    """Split text into sentences the same way as nltk.sent_tokenize, one sentence at a time.
+
+    :param text: Text to split.
+    :type: str
+    :return: Sentences of the text.
+    :rtype: generator
+    """
+    for start, end in _sentence_tokenizer().span_tokenize(text):
+        yield text[start:end]
+
+
+@lru_cache(maxsize=None)
+def word_pattern(language):
+    """Compile the regular expression of words of the language used by the regex tokenizer.
+
+    :param language: Language from text_reader.languages.
+    :type: str
+    :rtype: re.Pattern
+    """
+    if language in ELISIONS:
+        return re.compile(r"\w+(?:-\w+)*")
+    if language in CLITICS:
+        return re.compile(CLITICS[language] + r"\w+(?:-\w+)*")
+    return re.compile(r"\w+(?:[-']\w+)*")
+
+
+def fast_tokens(text, language):
+    """Split text into lowercase words with one regular expression, much faster than NLTK. Punctuation is dropped.
+
+    :param text: Text to tokenize.
+    :type: str
+    :param language: Language of the text, it decides how apostrophes are handled.
+    :type: str
+    :return: Words of the text.
+    :rtype: list
+    """
+    return word_pattern(language).findall(text.lower().replace("\u2019", "'"))
+
+
+def iter_words(tokens, stop_words=()):
+    """Lowercase tokens and drop punctuation and stop words.
+
+    :param tokens: Tokens of the text.
+    :type: iterable
+    :param stop_words: Words which will be skipped.
+    :type: collection
+    :return: Words which should be counted.
+    :rtype: generator
+    """
+    for token in tokens:
+        word = token.lower()
+        if word not in string.punctuation and word not in stop_words:
+            yield word
+
+
+def count_words(text, language, extra_stop_words=(), tokenizer="nltk"):
+    """Count words in text with or without stop words.
+
+    :param text: Text to analyze.
+    :type: str
+    :param language: Language of the text, "other" keeps stop words.
+    :type: str
+    :param extra_stop_words: Words which should be skipped too.
+    :type: iterable
+    :param tokenizer: "nltk" (nltk.word_tokenize) or "regex" (fast_tokens).
+    :type: str
+    :raises ValueError: Unknown tokenizer.
+    :return: Number of occurrences of every word, in order of the first occurrence.
+    :rtype: collections.Counter
+    """
+    stop_words = get_stop_words(language, extra_stop_words)
+    if tokenizer not in TOKENIZERS:
+        raise ValueError("Unknown tokenizer: {}".format(tokenizer))
+    if metrics.enabled:
+        return _count_words_measured(text, language, stop_words, tokenizer)
+    if tokenizer == "regex":
+        return Counter(word for word in fast_tokens(text, language) if word not in stop_words)
+    return Counter(iter_words(iter_tokens(text), stop_words))
+
+
+def _count_words_measured(text, language, stop_words, tokenizer):
+    """Count words like count_words, with the same streaming pipeline, but tokenization, filtering and counting are
+    recorded as separate stages of text_reader.metrics.
+
+    The steps run together, so only the stage which calls count_words gets the peak of memory.
+
+    :param text: Text to analyze.
+    :type: str
+    :param language: Language of the text.
+    :type: str
+    :param stop_words: Words which will be skipped.
+    :type: collection
+    :param tokenizer: "nltk" or "regex".
+    :type: str
+    :rtype: collections.Counter
+    """
+    error = None
+    start = time.perf_counter()
+    tokens = IterationTimer(fast_tokens(text, language) if tokenizer == "regex" else iter_tokens(text))
+    if tokenizer == "regex":
+        words = IterationTimer(word for word in tokens if word not in stop_words)
+    else:
+        words = IterationTimer(iter_words(tokens, stop_words))
+    try:
+        return Counter(words)
+    except Exception as err:
+        error = type(err).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.record("words.tokenize", tokens.seconds, len(text), tokens.items, error=error,
+                       labels={"tokenizer": tokenizer})
+        metrics.record("words.filter_stop_words", words.seconds - tokens.seconds, tokens=tokens.items, error=error)
+        metrics.record("words.count", seconds - words.seconds, tokens=words.items, error=error)
+
+
+def count_words_in_parts(parts, language, extra_stop_words=(), tokenizer="nltk"):
+    """Count words in text which comes in parts, e.g. pages, only one part is kept in memory.
+
+    :param parts: Parts of the text, sentences shouldn't be split between them.
+    :type: iterable
+    :param language: Language of the text, "other" keeps stop words.
+    :type: str
+    :param extra_stop_words: Words which should be skipped too.
+    :type: iterable
+    :param tokenizer: "nltk" (nltk.word_tokenize) or "regex" (fast_tokens).
+    :type: str
+    :raises ValueError: Unknown tokenizer.
+    :return: Number of occurrences of every word, in order of the first occurrence.
+    :rtype: collections.Counter
+    """
+    wordcount = Counter()
+    for part in parts:
+        wordcount.update(count_words(part, language, extra_stop_words, tokenizer))
+    return wordcount
+
+
+def iter_phrases(text, language, tokenizer="nltk"):
+    """Split text into phrases: lists of lowercase words between punctuation, so n-grams don't cross sentences.
+
+    :param text: Text to split.
+    :type: str
+    :param language: Language of the text.
+    :type: str
+    :param tokenizer: "nltk" (nltk.word_tokenize) or "regex" (fast_tokens).
+    :type: str
+    :return: Lists of words.
+    :rtype: generator
+    """
+    if tokenizer == "regex":
+        for match in PHRASE.finditer(text):
+            words = fast_tokens(match.group(), language)
+            if words:
+                yield words
+        return
+    tokenizer = _word_tokenizer()
+    for sentence in iter_sentences(text):
+        words = []
+        for token in tokenizer.tokenize(sentence):
+            word = token.lower()
+            if word in string.punctuation or not any(character.isalnum() for character in word):
+                if words:
+                    yield words
+                words = []
+            else:
+                words.append(word)
+        if words:
+            yield words
+
+
+def iter_ngrams(text, language, n=1, extra_stop_words=(), tokenizer="nltk"):
+    """Find words (n=1) or n-grams: n words following each other in a phrase, joined by spaces.
+
+    Words are the same as in count_words. N-grams which begin or end with a stop word are skipped (e.g. "of the" or
+    "the lamp"), stop words inside them are kept (e.g. "keeper of lights").
+
+    :param text: Text to analyze.
+    :type: str
+    :param language: Language of the text, "other" keeps stop words.
+    :type: str
+    :param n: Number of words in an n-gram.
+    :type: int
+    :param extra_stop_words: Words which should be skipped too.
+    :type: iterable
+    :param tokenizer: "nltk" (nltk.word_tokenize) or "regex" (fast_tokens).
+    :type: str
+    :raises ValueError: Unknown tokenizer or n smaller than 1.
+    :return: Words or n-grams in order of the text.
+    :rtype: generator
+    """
+    if tokenizer not in TOKENIZERS:
+        raise ValueError("Unknown tokenizer: {}".format(tokenizer))
+    if n < 1:
+        raise ValueError("Wrong size of n-grams: {}".format(n))
+    stop_words = get_stop_words(language, extra_stop_words)
+    if n == 1:
+        if tokenizer == "regex":
+            yield from (word for word in fast_tokens(text, language) if word not in stop_words)
+        else:
+            yield from iter_words(iter_tokens(text), stop_words)
+        return
+    for words in iter_phrases(text, language, tokenizer):
+        for start in range(len(words) - n + 1):
+            if words[start] not in stop_words and words[start + n - 1] not in stop_words:
+                yield " ".join(words[start:start + n])
+
+
+def count_agreement(first, second):
+    """Measure how similar are two counts of the same text, e.g. made by different tokenizers.
+
+    :param first: Number of occurrences of every word.
+    :type: collections.Counter
+    :param second: Number of occurrences of every word.
+    :type: collections.Counter
+    :return: Number of occurrences counted in both divided by the larger number of all occurrences, from 0 to 1.
+    :rtype: float
+    """
+    common = sum((first & second).values())
+    return common / max(sum(first.values()), sum(second.values()), 1)
+
+
+def _is_sentence_boundary(text, position):
+    """Check if a sentence of text ends before position, Punkt decides it from the tokens around the position only.
+
+    :param text: Text to check.
+    :type: str
+    :param position: Index in text just after white space.
+    :type: int
+    :rtype: bool
+    """
+    start = max(position - SENTENCE_WINDOW, 0)
+    window = text[start:position + SENTENCE_WINDOW]
+    position -= start
+    return all(end <= position or begin >= position for begin, end in _sentence_tokenizer().span_tokenize(window))
+
+
+def iter_chunks(text, chunk_size=CHUNK_SIZE):
+    """Split text into chunks of at least chunk_size characters between sentences.
+
+    A chunk ends at the first white space after chunk_size characters where Punkt ends a sentence, so every chunk is
+    split into the same sentences as the whole text.
+
+    :param text: Text to split.
+    :type: str
+    :param chunk_size: Minimal number of characters in a chunk, the last chunk can be shorter.
+    :type: int
+    :return: Parts of the text.
+    :rtype: generator
+    """
+    start = 0
+    while start < len(text):
+        end = len(text)
+        for space in SPACE.finditer(text, start + chunk_size):
+            position = space.end()
+            if _is_sentence_boundary(text, position):
+                end = position
+                break
+        yield text[start:end]
+        start = end
+
+
+def _count_chunk(text, stop_words):
+    """Split a chunk into sentences and count its words, it runs in a worker process.
+
+    :param text: Part of the text from iter_chunks.
+    :type: str
+    :param stop_words: Words which will be skipped.
+    :type: frozenset
+    :return: Number of occurrences of every word, in order of the first occurrence.
+    :rtype: collections.Counter
+    """
+    return Counter(iter_words(iter_tokens(text), stop_words))
+
+
+@timed("words.count_parallel")
+def count_words_parallel(text, language, extra_stop_words=(), workers=None, chunk_size=CHUNK_SIZE):
+    """Count words in text using many processes, the result is the same as count_words.
+
+    :param text: Text to analyze.
+    :type: str
+    :param language: Language of the text, "other" keeps stop words.
+    :type: str
+    :param extra_stop_words: Words which should be skipped too.
+    :type: iterable
+    :param workers: Number of processes, None means the number of CPUs.
+    :type: int
+    :param chunk_size: Number of characters sent to a process at once.
+    :type: int
+    :return: Number of occurrences of every word, in order of the first occurrence.
+    :rtype: collections.Counter
+    """
+    stop_words = get_stop_words(language, extra_stop_words)
+    workers = workers or os.cpu_count() or 1
+    wordcount = Counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in iter_chunks(text, chunk_size):
+            pending.append(executor.submit(_count_chunk, chunk, stop_words))
+            if len(pending) > 2 * workers:
+                wordcount.update(pending.popleft().result())
+        while pending:
+            wordcount.update(pending.popleft().result())
+    return wordcount
+
+
+@timed("words.top_n")
+def top_n(wordcount, n):
+    """Select the n most popular words without sorting the whole vocabulary.
+
+    Ties are broken in favour of the word which appeared later in the text for the first time.
+
+    :param wordcount: Number of occurrences of every word, in order of the first occurrence.
+    :type: collections.Counter
+    :param n: Number of words to return.
+    :type: int
+    :return: Pairs (word, count), the most popular first.
+    :rtype: list
+    """
+    best = heapq.nlargest(n, enumerate(wordcount.items()), key=lambda item: (item[1][1], item[0]))
+    return [pair for _, pair in best]